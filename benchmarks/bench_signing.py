@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark of the signing engine
+
+Runs the engine against a synthetic tree of unsigned PE images with the fake
+signtool (tests/fake_signtool.py), which embeds a fake Authenticode
+signature, and the stub timestamp server (tests/stub_tsa.py), so it needs
+neither Windows, the SDK nor SimplySign, yet takes the engine's in-process
+signature check like real .exe/.dll files:
+
+    python -m benchmarks.bench_signing --files 2000 --sign-delay 0.01
+    python -m benchmarks.bench_signing --json result.json
+    python -m benchmarks.bench_signing --baseline result.json --max-regression 0.2
+
+Measured are the phases behind the GUI's "Add Folder" (folder scan),
+log output (AsyncLogger) and "Sign All Files" (SigningEngine.sign_files):
+
+- scan: seconds and files/s for scanning the tree
+- log: lines/s through AsyncLogger into a log file
+- sign: files/s, p50/p99 latency per file (from "signing" to the final
+  status), timings per stage (RunMetrics) and peak memory
+
+With --baseline the result is compared to an earlier --json result; the
+exit code is 1 if a throughput figure dropped by more than --max-regression.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src import signing_engine
+from src.artifact_cache import ArtifactCache
+from src.file_registry import STATUS_SIGNING, STATUS_VERIFIED, STATUS_FAILED
+from src.log_pipeline import AsyncLogger
+from tests.fake_signtool import write_launcher
+from tests.pe_samples import SECTION_ALIGNMENT, build_pe
+from tests.stub_tsa import StubTSA
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FILES_PER_FOLDER = 100
+# Throughput figures compared against a baseline (higher is better)
+THROUGHPUT_KEYS = (("scan", "files_per_second"), ("log", "lines_per_second"), ("sign", "files_per_second"))
+
+
+def make_tree(root, files, size=4096):
+    """Create files unsigned PE images (unique content) in folders of FILES_PER_FOLDER
+
+    The images are well-formed (tests/pe_samples.build_pe), so the engine's
+    in-process Authenticode check runs on them as on real .exe/.dll files.
+    size is the size of an image; the headers take SECTION_ALIGNMENT bytes,
+    smaller sizes give the smallest image.
+
+    Returns:
+        list: The created paths
+    """
+    paths = []
+    extensions = (".exe", ".dll")
+    for index in range(files):
+        folder = os.path.join(root, f"pkg{index // FILES_PER_FOLDER:04d}")
+        if index % FILES_PER_FOLDER == 0:
+            os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"module{index:06d}{extensions[index % 2]}")
+        payload = index.to_bytes(4, "little")
+        with open(path, "wb") as f:
+            f.write(build_pe(payload + bytes(max(0, size - SECTION_ALIGNMENT - len(payload)))))
+        paths.append(path)
+    # Noise the scanner has to skip
+    for index in range(0, files, 10):
+        with open(os.path.join(root, f"pkg{index // FILES_PER_FOLDER:04d}", f"readme{index}.txt"), "w") as f:
+            f.write("not signable")
+    return paths
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (0 for no values)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(q * len(values) + 0.5)) - 1))]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def bench_scan(root, expected):
+    started = time.perf_counter()
+    found = signing_engine.find_signable_files(root, recursive=True)
+    elapsed = time.perf_counter() - started
+    if len(found) != expected:
+        raise RuntimeError(f"scan found {len(found)} files, expected {expected}")
+    return {"files": len(found), "seconds": round(elapsed, 4),
+            "files_per_second": round(len(found) / elapsed, 1) if elapsed else 0.0}
+
+
+def bench_log(log_file, lines, block=20):
+    """Push lines through AsyncLogger in blocks, like the signing workers do"""
+    logger = AsyncLogger(log_file, ui_enabled=True)
+    started = time.perf_counter()
+    for start in range(0, lines, block):
+        logger.log_block([(f"line {index}: Successfully signed: C:\\build\\module{index:06d}.dll", False)
+                          for index in range(start, min(lines, start + block))])
+        logger.drain_ui()
+    logger.flush()
+    elapsed = time.perf_counter() - started
+    logger.close()
+    return {"lines": lines, "seconds": round(elapsed, 4),
+            "lines_per_second": round(lines / elapsed, 1) if elapsed else 0.0}
+
+
+class _Latencies:
+    """status_callback that measures each file from "signing" to its final status"""
+
+    def __init__(self):
+        self.started = {}
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def __call__(self, file_paths, status):
+        now = time.perf_counter()
+        with self._lock:
+            for file_path in file_paths:
+                if status == STATUS_SIGNING:
+                    self.started.setdefault(file_path, now)
+                elif status in (STATUS_VERIFIED, STATUS_FAILED) and file_path in self.started:
+                    self.latencies.append(now - self.started.pop(file_path))
+
+
+def bench_sign(paths, work_dir, args, tsa_url):
+    settings = signing_engine.default_settings(log_file=os.path.join(work_dir, "signer.log"))
+    settings.update({
+        "signing_command": write_launcher(work_dir),
+        "timestamp_server": tsa_url,
+        "max_workers": args.workers,
+        "verify_workers": args.verify_workers,
+        "batch_size": args.batch_size,
+        "sign_mode": "digest" if args.digest else "direct",
+        "skip_unchanged": False,
+        "retry_base_delay": 0.01,
+    })
+    logger = AsyncLogger(settings["log_file"], ui_enabled=False)
+    latencies = _Latencies()
+    engine = signing_engine.SigningEngine(settings, logger, ArtifactCache(os.path.join(work_dir, "cache.json")),
+                                          status_callback=latencies)
+    started = time.perf_counter()
+    summary = engine.sign_files(paths)
+    elapsed = time.perf_counter() - started
+    logger.close()
+
+    stages = {
+        stage: {key: data[key] for key in ("count", "sum", "p50", "p95", "p99", "max")}
+        for stage, data in summary.metrics.to_dict()["stages"].items()
+    }
+    return {
+        "files": summary.total,
+        "verified": summary.verified,
+        "failed": summary.failed,
+        "seconds": round(elapsed, 3),
+        "files_per_second": round(summary.total / elapsed, 2) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies.latencies, 0.50), 4),
+        "latency_p99": round(percentile(latencies.latencies, 0.99), 4),
+        "retries": summary.metrics.counters.get("sign_retries", 0),
+        "stages": stages,
+    }
+
+
+def run_benchmark(args):
+    """Run all phases and return the result dict"""
+    work_dir = tempfile.mkdtemp(prefix="certum-bench-")
+    environment = {
+        "FAKE_SIGNTOOL_DELAY": str(args.sign_delay),
+        "FAKE_SIGNTOOL_STARTUP": str(args.startup),
+        "FAKE_SIGNTOOL_VERIFY_DELAY": str(args.verify_delay),
+        "FAKE_SIGNTOOL_FAIL_RATE": str(args.fail_rate),
+        "FAKE_SIGNTOOL_OUTPUT": args.output,
+        "FAKE_SIGNTOOL_TSA": "1",
+    }
+    saved = {key: os.environ.get(key) for key in environment}
+    os.environ.update(environment)
+    try:
+        tree = os.path.join(work_dir, "tree")
+        started = time.perf_counter()
+        paths = make_tree(tree, args.files, size=args.size)
+        result = {
+            "config": {key: getattr(args, key) for key in ("files", "size", "workers", "verify_workers",
+                                                           "batch_size", "digest", "sign_delay", "startup",
+                                                           "verify_delay", "fail_rate", "tsa_delay", "output")},
+            "tree_seconds": round(time.perf_counter() - started, 3),
+            "scan": bench_scan(tree, len(paths)),
+            "log": bench_log(os.path.join(work_dir, "bench.log"), args.log_lines),
+        }
+        with StubTSA(delay=args.tsa_delay) as tsa:
+            result["sign"] = bench_sign(paths, work_dir, args, tsa.url)
+            result["sign"]["tsa_requests"] = tsa.requests
+        result["peak_rss_mb"] = peak_rss_mb()
+        return result
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def compare(result, baseline, max_regression):
+    """Return a message for every throughput figure that regressed too far"""
+    regressions = []
+    for phase, key in THROUGHPUT_KEYS:
+        before = baseline.get(phase, {}).get(key)
+        after = result.get(phase, {}).get(key)
+        if before and after is not None and after < before * (1 - max_regression):
+            regressions.append(f"{phase} {key}: {after:g} vs. {before:g} ({after / before - 1:+.0%})")
+    return regressions
+
+
+def format_result(result):
+    sign = result["sign"]
+    lines = [
+        f"Scan:  {result['scan']['files']} files in {result['scan']['seconds']:.3f}s "
+        f"({result['scan']['files_per_second']:.0f} files/s)",
+        f"Log:   {result['log']['lines']} lines in {result['log']['seconds']:.3f}s "
+        f"({result['log']['lines_per_second']:.0f} lines/s)",
+        f"Sign:  {sign['files']} files in {sign['seconds']:.2f}s ({sign['files_per_second']:.1f} files/s), "
+        f"{sign['verified']} verified, {sign['failed']} failed, {sign['retries']} retries, "
+        f"{sign['tsa_requests']} TSA requests",
+        f"       latency per file p50 {sign['latency_p50']:.3f}s, p99 {sign['latency_p99']:.3f}s",
+    ]
+    for stage, data in sign["stages"].items():
+        lines.append(f"       {stage}: {data['count']} spans, p50 {data['p50']:.3f}s, p99 {data['p99']:.3f}s")
+    if result["peak_rss_mb"] is not None:
+        lines.append(f"Peak memory: {result['peak_rss_mb']:.1f} MB")
+    return "\n".join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="bench_signing", description=__doc__.split("\n\n")[1])
+    parser.add_argument("--files", type=int, default=1000, help="number of PE files (default: %(default)s)")
+    parser.add_argument("--size", type=int, default=4096, help="bytes per file (default: %(default)s)")
+    parser.add_argument("-j", "--workers", type=int, default=signing_engine.DEFAULT_MAX_WORKERS,
+                        help="sign workers (default: %(default)s)")
+    parser.add_argument("--verify-workers", type=int, default=4, help="verify workers (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=20, help="files per signtool call (default: %(default)s)")
+    parser.add_argument("--digest", action="store_true", help="use the digest workflow")
+    parser.add_argument("--sign-delay", type=float, default=0.0, help="fake signtool: seconds per signed file")
+    parser.add_argument("--startup", type=float, default=0.0, help="fake signtool: seconds per call")
+    parser.add_argument("--verify-delay", type=float, default=0.0, help="fake signtool: seconds per verified file")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="fake signtool: probability of a transient failure per file")
+    parser.add_argument("--output", choices=["verbose", "quiet"], default="verbose",
+                        help="fake signtool output format")
+    parser.add_argument("--tsa-delay", type=float, default=0.0, help="stub timestamp server: seconds per request")
+    parser.add_argument("--log-lines", type=int, default=100000, help="lines for the log benchmark")
+    parser.add_argument("--json", metavar="FILE", help="write the result as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with an earlier --json result")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed throughput drop against the baseline (default: %(default)s)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary tree and log files")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    result = run_benchmark(args)
+    print(format_result(result))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        for message in regressions:
+            print(f"REGRESSION: {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+Signing the binaries inside ZIP-based packages (.zip, .nupkg, .vsix)
+
+Signing a package used to mean unpacking it completely, signing the
+binaries and packing everything again - decompressing and recompressing
+every entry of what can be a multi-GB archive. Here:
+
+- list_signable_members() reads only the central directory
+- extract_members() extracts just the signable members, in parallel (one
+  ZipFile handle per worker), to a local directory where the normal sign
+  and verify pipeline signs them
+- rewrite_archive() writes the new archive next to the original: the
+  compressed bytes of every unchanged entry (local header, data and data
+  descriptor) are copied verbatim, only the signed members are compressed
+  again, and the central directory is rebuilt with the new offsets (ZIP64
+  where needed). The result replaces the original atomically.
+
+Memory use is bounded by the copy buffer, whatever the size of the archive.
+Whatever goes wrong with an archive - I/O, a damaged member, an unsupported
+compression method - is raised as ArchiveError, so the caller can fail that
+archive alone.
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+ARCHIVE_EXTENSIONS = ['.zip', '.nupkg', '.vsix']
+_ARCHIVE_SUFFIXES = frozenset(ARCHIVE_EXTENSIONS)
+# Package signatures that would no longer match once a member is changed
+SIGNED_PACKAGE_MARKERS = (".signature.p7s", "package/services/digital-signature/")
+
+DEFAULT_ARCHIVE_WORKERS = 4
+COPY_BUFFER_SIZE = 1024 * 1024
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_ZIP64_END_RECORD = struct.Struct("<IQHHIIQQQQ")
+_ZIP64_LOCATOR = struct.Struct("<IIQI")
+_LOCAL_SIGNATURE = 0x04034b50
+_CENTRAL_SIGNATURE = 0x02014b50
+_END_SIGNATURE = 0x06054b50
+_ZIP64_END_SIGNATURE = 0x06064b50
+_ZIP64_LOCATOR_SIGNATURE = 0x07064b50
+_DESCRIPTOR_SIGNATURE = 0x08074b50
+_ZIP64_EXTRA = 0x0001
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DESCRIPTOR = 0x08
+_LIMIT_32 = 0xFFFFFFFF
+_LIMIT_16 = 0xFFFF
+
+
+class ArchiveError(OSError):
+    """An archive cannot be read or rewritten"""
+
+
+# Raised by zipfile and zlib for damaged or unsupported members (e.g. Deflate64)
+_ARCHIVE_ERRORS = (OSError, EOFError, NotImplementedError, RuntimeError, ValueError, struct.error, zlib.error,
+                   zipfile.BadZipFile, zipfile.LargeZipFile)
+
+
+def is_archive(file_name):
+    """Check whether a file name has one of the archive extensions"""
+    return os.path.splitext(file_name)[1].lower() in _ARCHIVE_SUFFIXES
+
+
+def _split_extra(extra):
+    """[(tag, data)] of an extra field"""
+    fields = []
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, size = struct.unpack_from("<HH", extra, pos)
+        fields.append((tag, extra[pos + 4:pos + 4 + size]))
+        pos += 4 + size
+    return fields
+
+
+def _without_zip64(extra):
+    return b"".join(struct.pack("<HH", tag, len(data)) + data
+                    for tag, data in _split_extra(extra) if tag != _ZIP64_EXTRA)
+
+
+class _Entry:
+    """One central directory record, with the ZIP64 values resolved"""
+
+    def __init__(self, fixed, name, extra, comment):
+        (_, self.made_by, self.version, self.flags, self.method, self.time, self.date, self.crc,
+         csize, usize, _, _, _, _, self.internal_attr, self.external_attr, offset) = fixed
+        self.name = name
+        self.extra = _without_zip64(extra)
+        self.comment = comment
+        values = []
+        for tag, data in _split_extra(extra):
+            if tag == _ZIP64_EXTRA:
+                values = list(struct.unpack_from(f"<{len(data) // 8}Q", data))
+        self.usize = values.pop(0) if usize == _LIMIT_32 and values else usize
+        self.csize = values.pop(0) if csize == _LIMIT_32 and values else csize
+        self.offset = values.pop(0) if offset == _LIMIT_32 and values else offset
+
+    @property
+    def filename(self):
+        return self.name.decode("utf-8" if self.flags & 0x800 else "cp437")
+
+
+def _read_directory(f):
+    """Read the central directory of an open archive
+
+    Returns:
+        tuple: (list of _Entry, archive comment)
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    tail_size = min(size, _END_RECORD.size + _LIMIT_16)
+    f.seek(size - tail_size)
+    tail = f.read(tail_size)
+    pos = tail.rfind(struct.pack("<I", _END_SIGNATURE))
+    if pos < 0 or pos + _END_RECORD.size > len(tail):
+        raise ArchiveError("not a ZIP archive (no end of central directory)")
+    _, _, _, _, count, cd_size, cd_offset, comment_length = _END_RECORD.unpack_from(tail, pos)
+    comment = tail[pos + _END_RECORD.size:pos + _END_RECORD.size + comment_length]
+    end_offset = size - tail_size + pos
+    if _LIMIT_16 == count or _LIMIT_32 in (cd_size, cd_offset):
+        f.seek(end_offset - _ZIP64_LOCATOR.size)
+        signature, _, zip64_offset, _ = _ZIP64_LOCATOR.unpack(f.read(_ZIP64_LOCATOR.size))
+        if signature != _ZIP64_LOCATOR_SIGNATURE:
+            raise ArchiveError("broken ZIP64 archive (no locator)")
+        f.seek(zip64_offset)
+        record = _ZIP64_END_RECORD.unpack(f.read(_ZIP64_END_RECORD.size))
+        if record[0] != _ZIP64_END_SIGNATURE:
+            raise ArchiveError("broken ZIP64 archive (no end record)")
+        count, cd_size, cd_offset = record[7], record[8], record[9]
+
+    f.seek(cd_offset)
+    entries = []
+    for _ in range(count):
+        header = f.read(_CENTRAL_HEADER.size)
+        if len(header) != _CENTRAL_HEADER.size:
+            raise ArchiveError("truncated central directory")
+        fixed = _CENTRAL_HEADER.unpack(header)
+        if fixed[0] != _CENTRAL_SIGNATURE:
+            raise ArchiveError("broken central directory")
+        name_length, extra_length, comment_length = fixed[10], fixed[11], fixed[12]
+        name = f.read(name_length)
+        extra = f.read(extra_length)
+        entries.append(_Entry(fixed, name, extra, f.read(comment_length)))
+    return entries, comment
+
+
+def list_signable_members(archive_path, is_signable):
+    """Names of the members that is_signable(name) accepts
+
+    Directories and encrypted members are left out.
+
+    Raises:
+        ArchiveError: If the archive cannot be read, or carries a package
+            signature (.nupkg/.vsix) that changing a member would break
+    """
+    try:
+        with open(archive_path, 'rb') as f:
+            entries, _ = _read_directory(f)
+    except ArchiveError:
+        raise
+    except _ARCHIVE_ERRORS as e:
+        raise ArchiveError(f"cannot read archive: {e}") from e
+    for name in (entry.filename for entry in entries):
+        if name.lower().startswith(SIGNED_PACKAGE_MARKERS):
+            raise ArchiveError(f"package is signed ({name}); signing its members would invalidate it")
+    return [entry.filename for entry in entries
+            if not entry.filename.endswith("/") and not entry.flags & _FLAG_ENCRYPTED
+            and is_signable(os.path.basename(entry.filename))]
+
+
+def extract_members(archive_path, names, target_dir, workers=DEFAULT_ARCHIVE_WORKERS):
+    """Extract members in parallel, each to its own subdirectory of target_dir
+
+    Member paths are not used as file system paths, only their base names.
+
+    Returns:
+        dict: {member name: extracted path}
+
+    Raises:
+        ArchiveError: If a member cannot be extracted
+    """
+    local = threading.local()
+    handles = []
+    handles_lock = threading.Lock()
+    jobs = [(name, os.path.join(target_dir, str(index), os.path.basename(name))) for index, name in enumerate(names)]
+
+    def extract(job):
+        name, path = job
+        archive = getattr(local, "archive", None)
+        if archive is None:
+            archive = local.archive = zipfile.ZipFile(archive_path)
+            with handles_lock:
+                handles.append(archive)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with archive.open(name) as src, open(path, 'wb') as out:
+            shutil.copyfileobj(src, out, COPY_BUFFER_SIZE)
+        return name, path
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs) or 1)),
+                                thread_name_prefix="certum-archive") as pool:
+            return dict(pool.map(extract, jobs))
+    except ArchiveError:
+        raise
+    except _ARCHIVE_ERRORS as e:
+        raise ArchiveError(f"cannot extract from archive: {e}") from e
+    finally:
+        for archive in handles:
+            archive.close()
+
+
+def _copy_range(src, out, start, length):
+    src.seek(start)
+    while length > 0:
+        chunk = src.read(min(COPY_BUFFER_SIZE, length))
+        if not chunk:
+            raise ArchiveError("archive is truncated")
+        out.write(chunk)
+        length -= len(chunk)
+
+
+def _local_record_length(src, entry):
+    """Length of an entry's local header, data and data descriptor"""
+    src.seek(entry.offset)
+    header = src.read(_LOCAL_HEADER.size)
+    if len(header) != _LOCAL_HEADER.size or _LOCAL_HEADER.unpack(header)[0] != _LOCAL_SIGNATURE:
+        raise ArchiveError(f"broken local header of {entry.filename}")
+    name_length, extra_length = _LOCAL_HEADER.unpack(header)[9:11]
+    length = _LOCAL_HEADER.size + name_length + extra_length + entry.csize
+    if entry.flags & _FLAG_DESCRIPTOR:
+        # The descriptor has 8-byte sizes if the local header has a ZIP64 field
+        src.seek(name_length, os.SEEK_CUR)
+        zip64 = any(tag == _ZIP64_EXTRA for tag, data in _split_extra(src.read(extra_length)))
+        src.seek(entry.offset + length)
+        signed = src.read(4) == struct.pack("<I", _DESCRIPTOR_SIGNATURE)
+        length += (4 if signed else 0) + (20 if zip64 else 12)
+    return length
+
+
+def _local_extra(src, entry):
+    src.seek(entry.offset)
+    name_length, extra_length = _LOCAL_HEADER.unpack(src.read(_LOCAL_HEADER.size))[9:11]
+    src.seek(name_length, os.SEEK_CUR)
+    return _without_zip64(src.read(extra_length))
+
+
+def _write_member(out, entry, local_extra, path):
+    """Write a replaced member (compressed like the original, or deflated)"""
+    method = entry.method if entry.method in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) else zipfile.ZIP_DEFLATED
+    flags = entry.flags & ~(_FLAG_DESCRIPTOR | _FLAG_ENCRYPTED)
+    version = max(entry.version if entry.version < 45 else 20, 20)
+    header_offset = out.tell()
+    out.write(_LOCAL_HEADER.pack(_LOCAL_SIGNATURE, version, flags, method, entry.time, entry.date,
+                                 0, 0, 0, len(entry.name), len(local_extra)))
+    out.write(entry.name)
+    out.write(local_extra)
+
+    crc = 0
+    usize = csize = 0
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15) \
+        if method == zipfile.ZIP_DEFLATED else None
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            usize += len(chunk)
+            data = compressor.compress(chunk) if compressor else chunk
+            csize += len(data)
+            out.write(data)
+    if compressor:
+        data = compressor.flush()
+        csize += len(data)
+        out.write(data)
+    if max(usize, csize) >= _LIMIT_32:
+        raise ArchiveError(f"{entry.filename} is too large to replace (4 GB or more)")
+
+    end = out.tell()
+    out.seek(header_offset + 14)
+    out.write(struct.pack("<III", crc, csize, usize))
+    out.seek(end)
+    entry.version, entry.flags, entry.method = version, flags, method
+    entry.crc, entry.csize, entry.usize = crc, csize, usize
+
+
+def _central_record(entry, offset):
+    zip64 = []
+    usize, csize, field_offset = entry.usize, entry.csize, offset
+    if usize >= _LIMIT_32:
+        zip64.append(usize)
+        usize = _LIMIT_32
+    if csize >= _LIMIT_32:
+        zip64.append(csize)
+        csize = _LIMIT_32
+    if offset >= _LIMIT_32:
+        zip64.append(offset)
+        field_offset = _LIMIT_32
+    extra = entry.extra
+    version = entry.version
+    if zip64:
+        extra = struct.pack("<HH", _ZIP64_EXTRA, 8 * len(zip64)) + struct.pack(f"<{len(zip64)}Q", *zip64) + extra
+        version = max(version, 45)
+    return _CENTRAL_HEADER.pack(
+        _CENTRAL_SIGNATURE, entry.made_by, version, entry.flags, entry.method, entry.time, entry.date,
+        entry.crc, csize, usize, len(entry.name), len(extra), len(entry.comment), 0,
+        entry.internal_attr, entry.external_attr, field_offset
+    ) + entry.name + extra + entry.comment
+
+
+def rewrite_archive(archive_path, replacements):
+    """Replace members of an archive without recompressing the others
+
+    Args:
+        replacements: {member name: path of the new content}
+
+    Returns:
+        tuple: (entries copied verbatim, entries replaced)
+
+    Raises:
+        ArchiveError: If the archive is broken, a member is missing or the
+            new archive cannot be written; the original is left untouched
+    """
+    try:
+        return _rewrite_archive(archive_path, replacements)
+    except ArchiveError:
+        raise
+    except _ARCHIVE_ERRORS as e:
+        raise ArchiveError(f"cannot rewrite archive: {e}") from e
+
+
+def _rewrite_archive(archive_path, replacements):
+    directory = os.path.dirname(os.path.abspath(archive_path))
+    handle, temp_path = tempfile.mkstemp(prefix=".certum-", suffix=".tmp", dir=directory)
+    try:
+        with open(archive_path, 'rb') as src, os.fdopen(handle, 'w+b') as out:
+            entries, comment = _read_directory(src)
+            missing = set(replacements) - set(entry.filename for entry in entries)
+            if missing:
+                raise ArchiveError(f"members not in archive: {', '.join(sorted(missing))}")
+            offsets = []
+            copied = 0
+            for entry in sorted(entries, key=lambda entry: entry.offset):
+                offsets.append((entry, out.tell()))
+                path = replacements.get(entry.filename)
+                if path is None:
+                    _copy_range(src, out, entry.offset, _local_record_length(src, entry))
+                    copied += 1
+                else:
+                    _write_member(out, entry, _local_extra(src, entry), path)
+
+            # Central directory in the original order
+            new_offsets = {id(entry): offset for entry, offset in offsets}
+            cd_offset = out.tell()
+            for entry in entries:
+                out.write(_central_record(entry, new_offsets[id(entry)]))
+            cd_size = out.tell() - cd_offset
+            count = len(entries)
+            if count >= _LIMIT_16 or cd_size >= _LIMIT_32 or cd_offset >= _LIMIT_32:
+                zip64_offset = out.tell()
+                out.write(_ZIP64_END_RECORD.pack(_ZIP64_END_SIGNATURE, _ZIP64_END_RECORD.size - 12, 45, 45,
+                                                 0, 0, count, count, cd_size, cd_offset))
+                out.write(_ZIP64_LOCATOR.pack(_ZIP64_LOCATOR_SIGNATURE, 0, zip64_offset, 1))
+            out.write(_END_RECORD.pack(_END_SIGNATURE, 0, 0, min(count, _LIMIT_16), min(count, _LIMIT_16),
+                                       min(cd_size, _LIMIT_32), min(cd_offset, _LIMIT_32), len(comment)))
+            out.write(comment)
+            out.flush()
+            os.fsync(out.fileno())
+        # Cheap sanity check: the new central directory must be readable
+        with zipfile.ZipFile(temp_path) as check:
+            if len(check.infolist()) != len(entries):
+                raise ArchiveError("rewritten archive does not list all entries")
+        shutil.copymode(archive_path, temp_path)
+        os.replace(temp_path, archive_path)
+        return copied, len(replacements)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,160 @@
+"""
+Persistent index of signed artifacts
+
+Remembers which files were signed and verified successfully, keyed by
+absolute path, so that unchanged files can be skipped on the next run. The
+index is a JSON file stored next to certum_signer_settings.json.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+DEFAULT_MAX_ENTRIES = 50000
+DEFAULT_MAX_AGE_DAYS = 90
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path):
+    """Return the SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """Thread-safe on-disk index of signed and verified files
+
+    Each entry holds size, mtime, content hash, signing time and the
+    verification result of a file. A file counts as up to date if it was
+    verified and its content still matches: an unchanged size and mtime are
+    trusted directly, otherwise the content hash is compared.
+
+    Entries of files that no longer exist, that were not seen for
+    max_age_days, or that exceed max_entries (least recently seen first) are
+    dropped by compact().
+    """
+
+    def __init__(self, index_file, max_entries=DEFAULT_MAX_ENTRIES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.index_file = index_file
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Load the index, starting empty if it is missing or unreadable"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = data.get("entries", {})
+            self.entries = entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError, AttributeError):
+            self.entries = {}
+
+    def save(self):
+        """Write the index atomically if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": 1, "entries": self.entries}
+            tmp_file = f"{self.index_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.index_file)
+            self._dirty = False
+
+    def is_up_to_date(self, file_path):
+        """Check whether a file still matches a previously verified signature"""
+        key = os.path.abspath(file_path)
+        with self._lock:
+            entry = self.entries.get(key)
+        if not entry or not entry.get("verified"):
+            return False
+        try:
+            stat = os.stat(key)
+            if stat.st_size != entry.get("size"):
+                return False
+            if stat.st_mtime_ns != entry.get("mtime_ns"):
+                # Touched (e.g. copied again by the build) - compare content
+                if hash_file(key) != entry.get("sha256"):
+                    return False
+                entry = dict(entry, mtime_ns=stat.st_mtime_ns)
+        except OSError:
+            return False
+
+        entry["last_seen"] = time.time()
+        with self._lock:
+            self.entries[key] = entry
+            self._dirty = True
+        return True
+
+    def record(self, file_path, verified):
+        """Remember the signing result of a file
+
+        Files that failed are removed from the index so they are signed again.
+        """
+        key = os.path.abspath(file_path)
+        if not verified:
+            self.forget(key)
+            return
+        try:
+            stat = os.stat(key)
+            entry = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": hash_file(key),
+                "signed_at": datetime.now().isoformat(timespec='seconds'),
+                "verified": True,
+                "last_seen": time.time(),
+            }
+        except OSError:
+            self.forget(key)
+            return
+        with self._lock:
+            self.entries[key] = entry
+            self._dirty = True
+
+    def forget(self, file_path):
+        """Remove a file from the index"""
+        with self._lock:
+            if self.entries.pop(os.path.abspath(file_path), None) is not None:
+                self._dirty = True
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self.entries = {}
+            self._dirty = True
+
+    def compact(self):
+        """Drop missing, expired and surplus entries
+
+        Returns:
+            int: Number of removed entries
+        """
+        cutoff = time.time() - self.max_age_days * 86400
+        with self._lock:
+            keep = {
+                key: entry for key, entry in self.entries.items()
+                if entry.get("last_seen", 0) >= cutoff and os.path.exists(key)
+            }
+            if len(keep) > self.max_entries:
+                newest = sorted(keep.items(), key=lambda item: item[1].get("last_seen", 0), reverse=True)
+                keep = dict(newest[:self.max_entries])
+            removed = len(self.entries) - len(keep)
+            if removed:
+                self.entries = keep
+                self._dirty = True
+        return removed
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,379 @@
+"""
+Command-line interface of CertumSigner
+
+Signs or verifies files without the GUI, for build agents and scripts:
+
+    python -m src.certum_signer sign --recursive dist/ --jobs 8
+    python -m src.certum_signer verify build/app.exe
+    python -m src.certum_signer resume
+    python -m src.certum_signer watch --recursive build/out
+    python -m src.certum_signer serve --port 8765
+    python -m src.certum_signer submit --server http://signhost:8765 dist/app.exe
+
+A JSON summary is printed to stdout, the log goes to the configured log file
+(and to stderr with --verbose). The exit code is 0 if every file was signed
+and verified, 1 if any file failed and 2 for usage errors. Nothing in here
+imports tkinter.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+from . import __version__
+from .log_pipeline import AsyncLogger
+from .run_journal import find_interrupted_run, load_journal
+from .service_settings import DEFAULT_SERVICE_HOST, DEFAULT_SERVICE_PORT, DEFAULT_ROUND_FILES, DEFAULT_GATHER_SECONDS
+from .signing_engine import (
+    SigningEngine, DEFAULT_SETTINGS_FILE, MAX_WORKERS_LIMIT, MAX_BATCH_SIZE,
+    default_settings, load_settings_file, create_artifact_cache, find_signable_files, journal_directory,
+    create_toolchain_resolver, create_latency_history, create_log_rotation
+)
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def _bounded_int(minimum, maximum):
+    def parse(value):
+        number = int(value)
+        if not minimum <= number <= maximum:
+            raise argparse.ArgumentTypeError(f"must be between {minimum} and {maximum}")
+        return number
+    return parse
+
+
+def build_parser():
+    """Create the argument parser"""
+    scan_rules = argparse.ArgumentParser(add_help=False)
+    scan_rules.add_argument("-r", "--recursive", action="store_true",
+                            help="scan folders including all subfolders")
+    scan_rules.add_argument("--include", action="append", metavar="GLOB",
+                            help="only take files matching this glob from scanned folders (repeatable)")
+    scan_rules.add_argument("--exclude", action="append", metavar="GLOB",
+                            help="skip files and folders matching this glob (repeatable)")
+    scan_rules.add_argument("--max-depth", type=_bounded_int(0, 1000),
+                            help="number of subfolder levels to scan with --recursive")
+
+    targets = argparse.ArgumentParser(add_help=False, parents=[scan_rules])
+    targets.add_argument("paths", nargs="+", metavar="PATH",
+                         help="files or folders (folders are scanned for signable files)")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--settings", default=str(DEFAULT_SETTINGS_FILE),
+                        help="settings file (default: %(default)s)")
+    common.add_argument("--signtool", help="signtool command or path (overrides the settings)")
+    common.add_argument("--log-file", help="log file (overrides the settings)")
+    common.add_argument("--verify-jobs", type=_bounded_int(1, MAX_WORKERS_LIMIT),
+                        help="number of parallel verify workers")
+    common.add_argument("--verify-mode", choices=["full", "quick"],
+                        help="'full' runs signtool verify, 'quick' only checks the embedded signature")
+    common.add_argument("--metrics-json", metavar="FILE",
+                        help="write the timings of the run as a JSON report")
+    common.add_argument("--metrics-prom", metavar="FILE",
+                        help="write the timings of the run as a Prometheus textfile (node_exporter)")
+    common.add_argument("-v", "--verbose", action="store_true", help="also write the log to stderr")
+
+    signing = argparse.ArgumentParser(add_help=False)
+    signing.add_argument("-j", "--jobs", type=_bounded_int(1, MAX_WORKERS_LIMIT),
+                         help="number of parallel sign workers")
+    signing.add_argument("--batch-size", type=_bounded_int(1, MAX_BATCH_SIZE),
+                         help="files per signtool call")
+    signing.add_argument("--digest", action="store_true",
+                         help="hash files locally and only sign their digests remotely (signtool /dg, /ds, /di)")
+    signing.add_argument("--timestamp-server", action="append", metavar="URL",
+                         help="timestamp server URL (overrides the settings; repeat to give a failover pool)")
+    signing.add_argument("--no-cache", action="store_true",
+                         help="sign all files, even unchanged ones signed by an earlier run")
+    signing.add_argument("--skip-signed", action="store_true",
+                         help="skip files that already carry an intact Authenticode signature")
+    signing.add_argument("--stage", choices=["off", "network", "always"],
+                         help="sign local copies of the files and write them back atomically "
+                              "('network' = only files on network shares)")
+    signing.add_argument("--archives", action="store_true",
+                         help="also sign the binaries inside .zip, .nupkg and .vsix packages")
+    signing.add_argument("--order", choices=["largest", "smallest", "name"],
+                         help="order of the files: longest estimated signing time first (default), "
+                              "shortest first for quick feedback, or by name")
+    signing.add_argument("--rate-limit", type=float, metavar="CALLS",
+                         help="at most CALLS sign calls per minute (0 = unlimited)")
+    signing.add_argument("--max-sessions", type=_bounded_int(0, MAX_WORKERS_LIMIT), metavar="N",
+                         help="at most N sign calls at the same time (0 = unlimited)")
+    signing.add_argument("--no-dedup", action="store_true",
+                         help="sign identical copies of a file separately instead of copying the signed file")
+    signing.add_argument("--no-journal", action="store_true",
+                         help="do not write a run journal (the run cannot be resumed)")
+
+    parser = argparse.ArgumentParser(
+        prog="certum_signer",
+        description="Sign files with signtool and Certum SimplySign without the GUI."
+    )
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.required = True
+
+    commands.add_parser("sign", parents=[targets, common, signing], help="sign and verify files")
+    commands.add_parser("verify", parents=[targets, common], help="verify signatures without signing")
+    commands.add_parser("check", parents=[targets, common],
+                        help="check that the files and the signing tool are usable, without signing")
+    resume = commands.add_parser("resume", parents=[common, signing],
+                                 help="continue the files of an interrupted run")
+    resume.add_argument("--journal", metavar="FILE",
+                        help="run journal to resume (default: the newest one, if that run was interrupted)")
+    resume.add_argument("--retry-failed", action="store_true",
+                        help="also sign the files that failed in the interrupted run again")
+    watch = commands.add_parser("watch", parents=[scan_rules, common, signing],
+                                help="sign files as they appear in a folder, until interrupted")
+    watch.add_argument("folder", help="folder to watch, e.g. the build output folder")
+    watch.add_argument("--settle", type=float, metavar="SECONDS",
+                       help="sign a file once it was unchanged for this long")
+    watch.add_argument("--interval", type=float, metavar="SECONDS",
+                       help="seconds between folder scans when polling")
+    watch.add_argument("--existing", action="store_true",
+                       help="also sign the files already in the folder when watching starts")
+    watch.add_argument("--duration", type=float, metavar="SECONDS",
+                       help="stop watching after this many seconds")
+    serve = commands.add_parser("serve", parents=[common, signing],
+                                help="sign the jobs of build agents submitted over HTTP, until interrupted")
+    serve.add_argument("--host", help="address to listen on (default: the settings, 127.0.0.1)")
+    serve.add_argument("--port", type=_bounded_int(0, 65535), help="port to listen on (default: the settings, 8765)")
+    serve.add_argument("--token", help="require this bearer token from clients "
+                                       "(required to listen on other than loopback addresses)")
+    serve.add_argument("--allow-root", action="append", metavar="DIR",
+                       help="only sign files inside DIR (repeat for several folders; overrides the settings)")
+    serve.add_argument("--duration", type=float, metavar="SECONDS",
+                       help="stop the service after this many seconds")
+    submit = commands.add_parser("submit", parents=[targets, common],
+                                 help="sign files via a running signing service")
+    submit.add_argument("--server", metavar="URL",
+                        help="URL of the signing service (default: the service_host/service_port settings)")
+    submit.add_argument("--client", default=socket.gethostname(),
+                        help="client name for fair scheduling (default: %(default)s)")
+    submit.add_argument("--token", help="bearer token of the service")
+    return parser
+
+
+def _load_settings(args):
+    if os.path.exists(args.settings):
+        settings = load_settings_file(args.settings)
+    else:
+        settings = default_settings()
+
+    overrides = {
+        "signing_command": args.signtool,
+        "log_file": args.log_file,
+        "verify_workers": args.verify_jobs,
+        "verify_mode": args.verify_mode,
+        "metrics_json": args.metrics_json,
+        "metrics_prometheus": args.metrics_prom,
+        "scan_include": getattr(args, "include", None),
+        "scan_exclude": getattr(args, "exclude", None),
+        "scan_max_depth": getattr(args, "max_depth", None),
+    }
+    if args.command == "watch":
+        overrides.update({
+            "watch_settle": args.settle,
+            "watch_interval": args.interval,
+            "watch_include_existing": True if args.existing else None,
+        })
+    if args.command in ("serve", "submit"):
+        overrides.update({
+            "service_host": getattr(args, "host", None),
+            "service_port": getattr(args, "port", None),
+            "service_token": args.token,
+            "service_allowed_roots": getattr(args, "allow_root", None),
+        })
+    if args.command in ("sign", "resume", "watch", "serve"):
+        overrides.update({
+            "max_workers": args.jobs,
+            "batch_size": args.batch_size,
+            "timestamp_servers": args.timestamp_server,
+            "timestamp_server": args.timestamp_server[0] if args.timestamp_server else None,
+            "skip_unchanged": False if args.no_cache else None,
+            "skip_already_signed": True if args.skip_signed else None,
+            "sign_mode": "digest" if args.digest else None,
+            "dedup_identical": False if args.no_dedup else None,
+            "sign_archives": True if args.archives else None,
+            "staging_mode": args.stage,
+            "sign_order": args.order,
+            "rate_limit_per_minute": args.rate_limit,
+            "max_sign_sessions": args.max_sessions,
+            "journal_runs": False if args.no_journal else None,
+        })
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    return settings
+
+
+def collect_files(paths, recursive, settings=None):
+    """Expand the PATH arguments into a sorted list of files
+
+    Folders are scanned with the scan_* rules from settings; files given
+    explicitly are always taken.
+
+    Returns:
+        tuple: (files, missing)
+    """
+    files = set()
+    missing = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(find_signable_files(path, recursive=recursive, settings=settings))
+        elif os.path.isfile(path):
+            files.add(os.path.abspath(path))
+        else:
+            missing.append(path)
+    return sorted(files), missing
+
+
+def _watch(engine, args):
+    """Run engine.watch_folder() until Ctrl+C (or --duration) and return its summary"""
+    stop_event = threading.Event()
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.update(summary=engine.watch_folder(args.folder, stop_event, recursive=args.recursive)),
+        name="certum-watch", daemon=True
+    )
+    thread.start()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        # Short joins, so Ctrl+C is also delivered on Windows
+        while thread.is_alive() and (deadline is None or time.monotonic() < deadline):
+            thread.join(0.5)
+    except KeyboardInterrupt:
+        pass
+    stop_event.set()
+    thread.join()
+    return result["summary"]
+
+
+def _serve(engine, args):
+    """Run a SigningService until Ctrl+C (or --duration) and return it (None if it cannot start)"""
+    # Imported here: http.server is only needed by "serve", not by every "sign" call
+    from .sign_service import SigningService
+    settings = engine.settings
+    service = SigningService(
+        engine,
+        round_files=engine.get_int_setting("service_round_files", DEFAULT_ROUND_FILES, 1, 100000),
+        gather=engine.get_float_setting("service_gather", DEFAULT_GATHER_SECONDS),
+        token=settings.get("service_token") or None,
+        allowed_roots=settings.get("service_allowed_roots") or []
+    )
+    try:
+        url = service.start(settings.get("service_host") or DEFAULT_SERVICE_HOST,
+                            int(settings.get("service_port", DEFAULT_SERVICE_PORT)))
+    except (OSError, ValueError) as e:
+        print(f"certum_signer: cannot start the signing service: {e}", file=sys.stderr)
+        return None
+    print(f"certum_signer: signing service listening on {url}", file=sys.stderr)
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    service.stop()
+    return service
+
+
+def _submit(args, settings, files):
+    """Send files to a signing service and print the job result like "sign" does"""
+    from .sign_service import submit_job
+    host = settings.get("service_host") or DEFAULT_SERVICE_HOST
+    url = args.server or f"http://{host}:{settings.get('service_port', DEFAULT_SERVICE_PORT)}"
+
+    def progress(event):
+        if args.verbose and event["final"]:
+            print(f"{event['status']}: {event['path']}", file=sys.stderr)
+
+    try:
+        job = submit_job(url, files, args.client, token=settings.get("service_token") or None, on_event=progress)
+    except (OSError, ValueError) as e:
+        print(f"certum_signer: signing service {url} failed: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    job.pop("event", None)
+    json.dump(dict({"command": args.command, "version": __version__}, **job), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return EXIT_FAILED if job["failed"] else EXIT_OK
+
+
+def main(argv=None):
+    """Run the command line interface and return the exit code"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        settings = _load_settings(args)
+    except (OSError, ValueError) as e:
+        print(f"certum_signer: cannot load settings {args.settings}: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.command == "resume":
+        try:
+            if args.journal:
+                run_state = load_journal(args.journal)
+            else:
+                run_state = find_interrupted_run(journal_directory(args.settings))
+        except OSError as e:
+            print(f"certum_signer: cannot read journal {args.journal}: {e}", file=sys.stderr)
+            return EXIT_USAGE
+        if run_state is None:
+            print("certum_signer: no interrupted run to resume", file=sys.stderr)
+            return EXIT_USAGE
+    elif args.command == "watch":
+        if not os.path.isdir(args.folder):
+            print(f"certum_signer: not a folder: {args.folder}", file=sys.stderr)
+            return EXIT_USAGE
+    elif args.command != "serve":
+        files, missing = collect_files(args.paths, args.recursive, settings)
+        if missing:
+            print(f"certum_signer: not found: {', '.join(missing)}", file=sys.stderr)
+            return EXIT_USAGE
+        if args.command == "submit":
+            return _submit(args, settings, files)
+
+    logger = AsyncLogger(settings["log_file"], ui_enabled=False, echo=sys.stderr if args.verbose else None,
+                         rotation=create_log_rotation(settings))
+    try:
+        engine = SigningEngine(settings, logger, create_artifact_cache(args.settings, settings),
+                               journal_dir=journal_directory(args.settings),
+                               toolchain=create_toolchain_resolver(args.settings),
+                               latency_history=create_latency_history(args.settings))
+        if args.command == "sign":
+            summary = engine.sign_files(files)
+        elif args.command == "resume":
+            summary = engine.resume_run(run_state, retry_failed=args.retry_failed)
+        elif args.command == "watch":
+            summary = _watch(engine, args)
+        elif args.command == "serve":
+            service = _serve(engine, args)
+        elif args.command == "check":
+            problems, tool_error = engine.preflight(files)
+        else:
+            summary = engine.verify_files(files)
+    finally:
+        logger.close()
+
+    result = {"command": args.command, "version": __version__}
+    if args.command == "check":
+        result.update({
+            "total": len(files),
+            "tool_error": tool_error,
+            "problems": [{"path": file_path, "problem": problem} for file_path, problem in sorted(problems.items())],
+        })
+        failed = bool(problems or tool_error)
+    elif args.command == "serve":
+        if service is None:
+            return EXIT_USAGE
+        result["rounds"] = service.rounds
+        failed = False
+    else:
+        result.update(summary.to_dict())
+        failed = bool(summary.failed)
+    json.dump(result, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return EXIT_FAILED if failed else EXIT_OK
@@ -0,0 +1,82 @@
+"""
+Content deduplication of files to sign
+
+Installers often carry the same binary (VC runtimes, shared libraries) at
+many paths. Signing every copy costs one remote SimplySign operation each,
+although the result is byte for byte the same. group_identical() finds
+files with identical content - sizes first, then SHA-256 of the files that
+share a size, hashed in parallel - so only one representative per group
+has to be signed. copy_atomic() then writes the signed bytes over the other
+copies without ever leaving a half-written file behind.
+"""
+
+import os
+import shutil
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .artifact_cache import hash_file
+
+
+DEFAULT_DEDUP_WORKERS = 8
+
+
+def group_identical(files, workers=DEFAULT_DEDUP_WORKERS, hash_func=hash_file):
+    """Group files with identical content
+
+    Files that cannot be read are left out of the grouping (they are signed
+    on their own, where the error is reported).
+
+    Returns:
+        list: Groups of at least two paths, each sorted; the first path of a
+            group is its representative
+    """
+    by_size = defaultdict(list)
+    for file_path in files:
+        try:
+            by_size[os.path.getsize(file_path)].append(file_path)
+        except OSError:
+            continue
+    candidates = [file_path for same_size in by_size.values() if len(same_size) > 1 for file_path in same_size]
+    if not candidates:
+        return []
+
+    def digest(file_path):
+        try:
+            return hash_func(file_path)
+        except OSError:
+            return None
+
+    by_hash = defaultdict(list)
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="certum-dedup") as pool:
+        for file_path, file_hash in zip(candidates, pool.map(digest, candidates)):
+            if file_hash is not None:
+                by_hash[file_hash].append(file_path)
+    return sorted(sorted(group) for group in by_hash.values() if len(group) > 1)
+
+
+def copy_atomic(source, target):
+    """Replace target with a copy of source
+
+    The copy is written to a temporary file next to target and renamed over
+    it, so target is either the old or the complete new file.
+
+    Raises:
+        OSError: If the copy fails; target is left unchanged
+    """
+    directory = os.path.dirname(os.path.abspath(target))
+    handle, temp_path = tempfile.mkstemp(prefix=".certum-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as out, open(source, 'rb') as src:
+            shutil.copyfileobj(src, out, 1024 * 1024)
+            out.flush()
+            os.fsync(out.fileno())
+        shutil.copymode(target, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,150 @@
+"""
+Virtualized file list widget
+
+A tk.Listbox keeps one item per file, so filling it with 100k paths, or
+redrawing it on every status change, stalls the Tk main loop. This view
+draws only the rows that fit into its canvas, reads them from a
+FileRegistry, and redraws when the registry's version number changes. Work
+per refresh depends on the window height, not the number of files.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+
+from .file_registry import (
+    STATUS_PENDING, STATUS_SIGNING, STATUS_SIGNED, STATUS_VERIFIED, STATUS_FAILED, STATUS_SKIPPED
+)
+
+
+STATUS_COLORS = {
+    STATUS_PENDING: "gray",
+    STATUS_SIGNING: "blue",
+    STATUS_SIGNED: "dark orange",
+    STATUS_VERIFIED: "dark green",
+    STATUS_FAILED: "red",
+    STATUS_SKIPPED: "gray",
+}
+REFRESH_INTERVAL_MS = 100
+ROW_PADDING = 4
+STATUS_COLUMN_WIDTH = 80
+
+
+class VirtualFileList(ttk.Frame):
+    """Scrollable list of files with their status, backed by a FileRegistry
+
+    Supports click, Ctrl+click and Shift+click selection; selected paths are
+    available as the selection attribute.
+    """
+
+    def __init__(self, master, registry):
+        super().__init__(master)
+        self.registry = registry
+        self.selection = set()
+        self.top = 0
+        self._anchor = None
+        self._drawn_version = None
+
+        self.font = tkfont.nametofont("TkDefaultFont")
+        self.row_height = self.font.metrics("linespace") + ROW_PADDING
+
+        self.canvas = tk.Canvas(self, background="white", highlightthickness=0, takefocus=True)
+        self.canvas.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.canvas.bind("<Button-4>", lambda event: self.scroll_to(self.top - 3))
+        self.canvas.bind("<Button-5>", lambda event: self.scroll_to(self.top + 3))
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<Control-Button-1>", lambda event: self._on_click(event, toggle=True))
+        self.canvas.bind("<Shift-Button-1>", lambda event: self._on_click(event, extend=True))
+        self.canvas.bind("<Prior>", lambda event: self.scroll_to(self.top - self.visible_rows()))
+        self.canvas.bind("<Next>", lambda event: self.scroll_to(self.top + self.visible_rows()))
+
+        self._poll()
+
+    def visible_rows(self):
+        """Number of rows that fit into the canvas"""
+        return max(1, self.canvas.winfo_height() // self.row_height)
+
+    def scroll_to(self, top):
+        """Make row top the first visible row"""
+        top = max(0, min(int(top), len(self.registry) - self.visible_rows()))
+        if top != self.top:
+            self.top = top
+            self.redraw()
+
+    def clear_selection(self):
+        self.selection = set()
+        self._anchor = None
+        self.redraw()
+
+    def refresh(self):
+        """Redraw if the registry changed since the last redraw"""
+        if self.registry.version != self._drawn_version:
+            self.redraw()
+
+    def redraw(self):
+        """Draw the visible rows"""
+        self._drawn_version = self.registry.version
+        total = len(self.registry)
+        visible = self.visible_rows()
+        if self.top > max(0, total - visible):
+            self.top = max(0, total - visible)
+
+        width = self.canvas.winfo_width()
+        self.canvas.delete("all")
+        for i, (path, status) in enumerate(self.registry.rows(self.top, self.top + visible + 1)):
+            y = i * self.row_height
+            middle = y + self.row_height // 2
+            if path in self.selection:
+                self.canvas.create_rectangle(0, y, width, y + self.row_height, fill="#cce4f7", outline="")
+            self.canvas.create_text(4, middle, anchor=tk.W, text=path, font=self.font)
+            self.canvas.create_rectangle(width - STATUS_COLUMN_WIDTH, y, width, y + self.row_height,
+                                         fill="white", outline="")
+            self.canvas.create_text(width - 4, middle, anchor=tk.E, text=status, font=self.font,
+                                    fill=STATUS_COLORS.get(status, "black"))
+
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _poll(self):
+        self.refresh()
+        self.after(REFRESH_INTERVAL_MS, self._poll)
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(float(args[0]) * len(self.registry))
+        elif action == "scroll":
+            step = self.visible_rows() if args[1] == "pages" else 1
+            self.scroll_to(self.top + int(args[0]) * step)
+
+    def _on_mousewheel(self, event):
+        self.scroll_to(self.top - 3 * int(event.delta / abs(event.delta)) if event.delta else self.top)
+
+    def _on_click(self, event, toggle=False, extend=False):
+        self.canvas.focus_set()
+        row = self.top + event.y // self.row_height
+        rows = self.registry.rows(row, row + 1)
+        if not rows:
+            return
+        path = rows[0][0]
+        if extend and self._anchor is not None:
+            anchor_row = self.registry.index(self._anchor)
+            if anchor_row >= 0:
+                start, stop = min(anchor_row, row), max(anchor_row, row)
+                self.selection = set(p for p, status in self.registry.rows(start, stop + 1))
+                self.redraw()
+                return
+        if toggle:
+            self.selection.symmetric_difference_update([path])
+        else:
+            self.selection = {path}
+        self._anchor = path
+        self.redraw()
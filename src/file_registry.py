@@ -0,0 +1,292 @@
+"""
+Ordered registry of the files to sign
+
+Keeps the file list sorted by path, together with the status of every file
+(pending / signing / signed / verified / failed / skipped). Lookups and
+positions are found by binary search and status changes never touch the
+order, so a view can render just the rows it shows, e.g.
+registry.rows(top, top + visible), and redraw them when the version number
+changes. Status updates come from the signing workers, so all methods are
+thread-safe.
+
+The paths are kept in a blocked sorted list (_SortedPaths): sorted chunks of
+about _CHUNK_SIZE paths plus a cumulative index of the chunk lengths, so
+adding or removing a file and finding a row are O(log n) however long the
+list grows, where a flat sorted list would shift every path behind the
+changed one.
+"""
+
+import bisect
+import threading
+from collections import Counter
+
+
+STATUS_PENDING = "pending"
+STATUS_SIGNING = "signing"
+STATUS_SIGNED = "signed"
+STATUS_VERIFIED = "verified"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+# Paths per chunk of _SortedPaths; a chunk is split at twice this size
+_CHUNK_SIZE = 1000
+# Adding or removing more files than this (and more than an eighth of the
+# list) in one call rebuilds the chunks in one pass instead
+_BULK_THRESHOLD = 64
+
+
+class _SortedPaths:
+    """Sorted list of unique paths in chunks, with O(log n) updates and rows
+
+    _maxes holds the last path of every chunk, so the chunk of a path is
+    found by binary search. _tree is a Fenwick tree over the chunk lengths
+    (the cumulative index): the rows before a chunk, and the chunk of a row,
+    are O(log n). An insert or remove moves at most 2 * _CHUNK_SIZE paths.
+    Not thread-safe; FileRegistry holds its lock.
+    """
+
+    def __init__(self, paths=()):
+        self.rebuild(paths)
+
+    def rebuild(self, paths):
+        """Replace the contents by paths (sorted and unique)"""
+        paths = list(paths)
+        self._chunks = [paths[start:start + _CHUNK_SIZE] for start in range(0, len(paths), _CHUNK_SIZE)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._len = len(paths)
+        self._reindex()
+
+    def _reindex(self):
+        """Rebuild the cumulative index after chunks were split or dropped, O(chunks)"""
+        tree = [0] * (len(self._chunks) + 1)
+        for position, chunk in enumerate(self._chunks, 1):
+            tree[position] += len(chunk)
+            parent = position + (position & -position)
+            if parent < len(tree):
+                tree[parent] += tree[position]
+        self._tree = tree
+
+    def _grow(self, chunk, delta):
+        position = chunk + 1
+        while position < len(self._tree):
+            self._tree[position] += delta
+            position += position & -position
+
+    def _rows_before(self, chunk):
+        total = 0
+        while chunk > 0:
+            total += self._tree[chunk]
+            chunk -= chunk & -chunk
+        return total
+
+    def _locate(self, row):
+        """(chunk, offset) of row, for 0 <= row < len(self)"""
+        chunk = 0
+        step = 1 << (len(self._tree).bit_length() - 1)
+        while step:
+            following = chunk + step
+            if following < len(self._tree) and self._tree[following] <= row:
+                chunk = following
+                row -= self._tree[following]
+            step >>= 1
+        return chunk, row
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from chunk
+
+    def index(self, path):
+        """Row of path, or -1"""
+        chunk = bisect.bisect_left(self._maxes, path)
+        if chunk == len(self._chunks):
+            return -1
+        offset = bisect.bisect_left(self._chunks[chunk], path)
+        if self._chunks[chunk][offset] != path:
+            return -1
+        return self._rows_before(chunk) + offset
+
+    def add(self, path):
+        """Insert a path that is not in the list yet"""
+        if not self._chunks:
+            self.rebuild([path])
+            return
+        chunk = min(bisect.bisect_left(self._maxes, path), len(self._chunks) - 1)
+        paths = self._chunks[chunk]
+        bisect.insort(paths, path)
+        self._maxes[chunk] = paths[-1]
+        self._len += 1
+        if len(paths) > 2 * _CHUNK_SIZE:
+            self._chunks[chunk:chunk + 1] = [paths[:_CHUNK_SIZE], paths[_CHUNK_SIZE:]]
+            self._maxes[chunk:chunk + 1] = [paths[_CHUNK_SIZE - 1], paths[-1]]
+            self._reindex()
+        else:
+            self._grow(chunk, 1)
+
+    def remove(self, path):
+        """Remove a path that is in the list"""
+        chunk = bisect.bisect_left(self._maxes, path)
+        paths = self._chunks[chunk]
+        del paths[bisect.bisect_left(paths, path)]
+        self._len -= 1
+        if len(paths) < _CHUNK_SIZE // 4 and len(self._chunks) > 1:
+            # Merge a nearly empty chunk into its neighbour, so the chunk count tracks the size
+            neighbour = chunk - 1 if chunk else chunk + 1
+            first = min(chunk, neighbour)
+            merged = self._chunks[first] + self._chunks[first + 1]
+            if len(merged) > 2 * _CHUNK_SIZE:
+                half = len(merged) // 2
+                self._chunks[first:first + 2] = [merged[:half], merged[half:]]
+                self._maxes[first:first + 2] = [merged[half - 1], merged[-1]]
+            else:
+                self._chunks[first:first + 2] = [merged]
+                self._maxes[first:first + 2] = [merged[-1]]
+            self._reindex()
+        elif not paths:
+            del self._chunks[chunk]
+            del self._maxes[chunk]
+            self._reindex()
+        else:
+            self._maxes[chunk] = paths[-1]
+            self._grow(chunk, -1)
+
+    def slice(self, start, stop):
+        """Paths of the rows start to stop-1"""
+        start, stop = max(0, start), min(self._len, stop)
+        if start >= stop:
+            return []
+        chunk, offset = self._locate(start)
+        result = []
+        while len(result) < stop - start:
+            result.extend(self._chunks[chunk][offset:offset + stop - start - len(result)])
+            chunk, offset = chunk + 1, 0
+        return result
+
+
+class FileRegistry:
+    """Sorted, indexed set of file paths with a status per file"""
+
+    def __init__(self):
+        self._paths = _SortedPaths()
+        self._status = {}
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, path):
+        return path in self._status
+
+    def paths(self):
+        """Return a snapshot of all paths in order"""
+        with self._lock:
+            return list(self._paths)
+
+    def rows(self, start, stop):
+        """Return (path, status) for the rows start to stop-1"""
+        with self._lock:
+            return [(path, self._status[path]) for path in self._paths.slice(start, stop)]
+
+    def index(self, path):
+        """Return the row of a path, or -1 if it is not registered"""
+        with self._lock:
+            return self._paths.index(path)
+
+    def status(self, path):
+        """Return the status of a path, or None if it is not registered"""
+        return self._status.get(path)
+
+    def counts(self):
+        """Return a {status: number of files} dict"""
+        with self._lock:
+            return {status: count for status, count in self._counts.items() if count}
+
+    def _is_bulk(self, count):
+        return count > max(_BULK_THRESHOLD, len(self._paths) // 8)
+
+    def add(self, path, status=STATUS_PENDING):
+        """Add one path (O(log n)); returns False if it was already registered"""
+        return self.add_many([path], status) == 1
+
+    def add_many(self, paths, status=STATUS_PENDING):
+        """Add paths that are not registered yet; returns the number added
+
+        O(k log n) for k new paths; a batch that is large against the list
+        is merged in one pass instead, O(n + k log k).
+        """
+        with self._lock:
+            new_paths = sorted(set(path for path in paths if path not in self._status))
+            if not new_paths:
+                return 0
+            if self._is_bulk(len(new_paths)):
+                # Two sorted runs: merging them is a linear pass for timsort
+                self._paths.rebuild(sorted(list(self._paths) + new_paths))
+            else:
+                for path in new_paths:
+                    self._paths.add(path)
+            for path in new_paths:
+                self._status[path] = status
+            self._counts[status] += len(new_paths)
+            self.version += 1
+            return len(new_paths)
+
+    def remove(self, path):
+        """Remove one path (O(log n)); returns False if it was not registered"""
+        return self.remove_many([path]) == 1
+
+    def remove_many(self, paths):
+        """Remove paths; returns the number removed
+
+        O(k log n) for k paths, or one O(n) pass for a large batch.
+        """
+        with self._lock:
+            removed = set(path for path in paths if path in self._status)
+            if not removed:
+                return 0
+            if self._is_bulk(len(removed)):
+                self._paths.rebuild(path for path in self._paths if path not in removed)
+            else:
+                for path in removed:
+                    self._paths.remove(path)
+            for path in removed:
+                self._counts[self._status.pop(path)] -= 1
+            self.version += 1
+            return len(removed)
+
+    def clear(self):
+        """Remove all paths"""
+        with self._lock:
+            self._paths = _SortedPaths()
+            self._status = {}
+            self._counts = Counter()
+            self.version += 1
+
+    def set_status(self, path, status):
+        """Change the status of a registered path; unknown paths are ignored"""
+        self.set_status_many([path], status)
+
+    def set_status_many(self, paths, status):
+        """Change the status of several registered paths"""
+        with self._lock:
+            changed = False
+            for path in paths:
+                old_status = self._status.get(path)
+                if old_status is None or old_status == status:
+                    continue
+                self._status[path] = status
+                self._counts[old_status] -= 1
+                self._counts[status] += 1
+                changed = True
+            if changed:
+                self.version += 1
+
+    def reset_status(self, status=STATUS_PENDING):
+        """Set every file back to the same status, e.g. before a new run"""
+        with self._lock:
+            self._status = dict.fromkeys(self._status, status)
+            self._counts = Counter({status: len(self._status)})
+            self.version += 1
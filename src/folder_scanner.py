@@ -0,0 +1,137 @@
+"""
+Parallel folder scanner
+
+Build output trees can hold hundreds of thousands of entries, often on SMB
+shares where every directory listing is a network round trip. The scanner
+therefore lists directories with os.scandir (which returns the file type
+without an extra stat call) on a small thread pool, so several listings are
+in flight at once, and streams the matches in batches as they are found
+instead of returning one list at the end.
+
+Matching uses a set of lowercase suffixes plus optional include/exclude glob
+rules. Globs are matched against both the entry name and its path relative
+to the scanned folder (with "/" separators), so "*.pdb", "obj" and
+"tools/*.exe" all work. Excluded directories are not descended into.
+"""
+
+import fnmatch
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+DEFAULT_SCAN_WORKERS = 8
+MAX_SCAN_WORKERS = 64
+DEFAULT_SCAN_BATCH_SIZE = 500
+
+
+class ScanRules:
+    """Which files a scan reports
+
+    Args:
+        extensions: Suffixes to match, e.g. [".exe", ".dll"] (case-insensitive)
+        include: Glob patterns; if given, a file must match at least one
+        exclude: Glob patterns for files and directories to leave out
+        max_depth: Number of subfolder levels to descend (0 = only the folder
+            itself, None = unlimited)
+    """
+
+    def __init__(self, extensions, include=None, exclude=None, max_depth=None):
+        self.extensions = frozenset(ext.lower() for ext in extensions)
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.max_depth = max_depth
+
+    def matches_file(self, name, rel_path):
+        """Check whether a file is reported"""
+        if os.path.splitext(name)[1].lower() not in self.extensions:
+            return False
+        if self.include and not _matches_any(name, rel_path, self.include):
+            return False
+        return not _matches_any(name, rel_path, self.exclude)
+
+    def enters_directory(self, name, rel_path, depth):
+        """Check whether a subdirectory at the given depth (1 = direct child) is scanned"""
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        return not _matches_any(name, rel_path, self.exclude)
+
+
+def _matches_any(name, rel_path, patterns):
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern) for pattern in patterns)
+
+
+class FolderScanner:
+    """Walks a folder tree in parallel and yields matching files in batches
+
+    Args:
+        rules: ScanRules deciding which files are reported
+        workers: Number of directories listed concurrently
+        batch_size: Maximum number of paths per yielded batch
+    """
+
+    def __init__(self, rules, workers=DEFAULT_SCAN_WORKERS, batch_size=DEFAULT_SCAN_BATCH_SIZE):
+        self.rules = rules
+        self.workers = max(1, min(workers, MAX_SCAN_WORKERS))
+        self.batch_size = max(1, batch_size)
+        self.errors = []
+
+    def scan(self, folder_path, cancel_event=None):
+        """Yield lists of absolute paths of matching files
+
+        Batches are yielded as soon as batch_size matches were collected or the
+        scanner runs out of finished directory listings, so the first results
+        arrive long before the walk ends. The order of files is unspecified.
+        Directories that cannot be listed are recorded in self.errors as
+        (path, exception) and skipped. Setting cancel_event stops the scan
+        after the listings already in progress.
+        """
+        root = os.path.abspath(folder_path)
+        self.errors = []
+        pending = set()
+        batch = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="certum-scan") as pool:
+            pending.add(pool.submit(self._list_directory, root, "", 0))
+            while pending:
+                if cancel_event is not None and cancel_event.is_set():
+                    for future in pending:
+                        future.cancel()
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs = future.result()
+                    for path, rel_path, depth in subdirs:
+                        pending.add(pool.submit(self._list_directory, path, rel_path, depth))
+                    batch.extend(files)
+                while batch and (len(batch) >= self.batch_size or not any(future.done() for future in pending)):
+                    yield batch[:self.batch_size]
+                    batch = batch[self.batch_size:]
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+        if batch and not (cancel_event is not None and cancel_event.is_set()):
+            yield batch
+
+    def scan_all(self, folder_path):
+        """Return all matching files of a folder as a sorted list"""
+        found = []
+        for batch in self.scan(folder_path):
+            found.extend(batch)
+        return sorted(found)
+
+    def _list_directory(self, path, rel_path, depth):
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    entry_rel = f"{rel_path}/{entry.name}" if rel_path else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.rules.enters_directory(entry.name, entry_rel, depth + 1):
+                                subdirs.append((entry.path, entry_rel, depth + 1))
+                        elif self.rules.matches_file(entry.name, entry_rel) and entry.is_file():
+                            files.append(entry.path)
+                    except OSError:
+                        continue
+        except OSError as e:
+            self.errors.append((path, e))
+        return files, subdirs
@@ -0,0 +1,234 @@
+"""
+Watch a build output folder and report artifacts once they are complete
+
+A build writes its artifacts over several minutes, and a file that shows up
+in a listing is not necessarily finished. FolderWatcher rescans the folder
+with a FolderScanner and reports a new or changed file only when it is
+settled:
+
+- its size and modification time did not change for settle seconds, and
+- it can be opened for writing, i.e. the linker or installer builder no
+  longer holds it open without sharing (this is what fails on Windows while
+  a file is still being written)
+
+On Linux the watcher waits on inotify between rescans, so a change is picked
+up right away and an idle folder is only rescanned every rescan_interval
+seconds (which also catches new subfolders that hold no matches yet and are
+therefore not watched). Elsewhere, and if inotify is not available, it polls
+every interval seconds.
+
+Files are reported once. Files changed by the caller afterwards (signing
+rewrites them) are passed to acknowledge(), so they are not reported again.
+"""
+
+import os
+import select
+import sys
+import threading
+import time
+
+
+DEFAULT_WATCH_INTERVAL = 2.0
+DEFAULT_WATCH_SETTLE = 3.0
+DEFAULT_RESCAN_INTERVAL = 10.0
+
+
+def _file_signature(path):
+    """(size, mtime) of a file, or None if it is gone"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_released(path):
+    """Check that no other process holds the file open exclusively"""
+    try:
+        with open(path, 'r+b'):
+            return True
+    except OSError:
+        return False
+
+
+class _Inotify:
+    """Minimal inotify wrapper (ctypes) used to wake the watcher early"""
+
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_MASK = 0x002 | 0x008 | 0x080 | 0x100 | 0x200
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watched = set()
+
+    def add(self, directory):
+        """Watch a directory (not recursive); errors leave it to polling"""
+        if directory in self._watched:
+            return
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.EVENT_MASK) >= 0:
+            self._watched.add(directory)
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds for events; returns True if there were any"""
+        readable = select.select([self.fd], [], [], max(0.0, timeout))[0]
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _create_inotify():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify()
+    except (OSError, AttributeError):
+        return None
+
+
+class FolderWatcher:
+    """Reports settled, signable files appearing in a folder tree
+
+    Args:
+        folder: Folder to watch
+        scanner: FolderScanner with the rules for the files to report
+        interval: Seconds between rescans when polling
+        settle: Seconds a file must stay unchanged before it is reported
+        include_existing: Also report the files present when watching starts
+        use_inotify: None = use inotify if available, False = always poll
+        clock: Time source (time.monotonic), replaceable in tests
+    """
+
+    def __init__(self, folder, scanner, interval=DEFAULT_WATCH_INTERVAL, settle=DEFAULT_WATCH_SETTLE,
+                 include_existing=False, use_inotify=None, rescan_interval=DEFAULT_RESCAN_INTERVAL,
+                 clock=time.monotonic):
+        self.folder = os.path.abspath(folder)
+        self.scanner = scanner
+        self.interval = max(0.1, interval)
+        self.settle = max(0.0, settle)
+        self.rescan_interval = max(self.interval, rescan_interval)
+        self.clock = clock
+        self._include_existing = include_existing
+        self._first_poll = True
+        self._handled = {}  # path -> signature when reported or acknowledged
+        self._pending = {}  # path -> (signature, time it was first seen with it)
+        self._lock = threading.Lock()
+        self._inotify = _create_inotify() if use_inotify is not False else None
+
+    @property
+    def uses_inotify(self):
+        return self._inotify is not None
+
+    @property
+    def pending(self):
+        """Number of files seen but not settled yet"""
+        with self._lock:
+            return len(self._pending)
+
+    def poll(self):
+        """Rescan the folder once and return the files that just settled"""
+        self.scanner.errors = []
+        found = self.scanner.scan_all(self.folder)
+        now = self.clock()
+        ready = []
+        with self._lock:
+            present = set(found)
+            for path in list(self._pending):
+                if path not in present:
+                    del self._pending[path]
+            for path in list(self._handled):
+                if path not in present:
+                    del self._handled[path]
+
+            if self._first_poll and not self._include_existing:
+                # Artifacts from before the watch started are not reported
+                self._handled.update((path, _file_signature(path)) for path in found)
+                candidates = []
+            else:
+                candidates = found
+            self._first_poll = False
+
+            for path in candidates:
+                signature = _file_signature(path)
+                if signature is None or self._handled.get(path) == signature:
+                    continue
+                seen = self._pending.get(path)
+                if seen is None or seen[0] != signature:
+                    self._pending[path] = (signature, now)
+                    if self.settle > 0:
+                        continue
+                    seen = self._pending[path]
+                if now - seen[1] >= self.settle and _is_released(path):
+                    del self._pending[path]
+                    self._handled[path] = signature
+                    ready.append(path)
+
+        if self._inotify is not None:
+            self._watch_directories(found)
+        return ready
+
+    def acknowledge(self, paths):
+        """Take the current state of paths as handled (e.g. after signing them)"""
+        with self._lock:
+            for path in paths:
+                self._pending.pop(path, None)
+                self._handled[path] = _file_signature(path)
+
+    def run(self, callback, stop_event):
+        """Call callback(files) with settled files until stop_event is set
+
+        The callback runs in this thread; files that settle while it runs
+        are reported by the next poll.
+        """
+        last_scan = None
+        changed = True
+        try:
+            while not stop_event.is_set():
+                now = self.clock()
+                if changed or self.pending or last_scan is None or now - last_scan >= self.rescan_interval:
+                    last_scan = now
+                    ready = self.poll()
+                    if ready:
+                        callback(ready)
+                changed = self._wait(stop_event)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _wait(self, stop_event):
+        """Sleep until the next poll; returns True if the folder changed"""
+        if self._inotify is None:
+            stop_event.wait(self.interval)
+            return True
+        # Wake up in short steps so stop_event is noticed promptly
+        deadline = self.clock() + (self.interval if self.pending else self.rescan_interval)
+        while not stop_event.is_set():
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                return False
+            if self._inotify.wait(min(remaining, 0.5)):
+                return True
+        return False
+
+    def _watch_directories(self, found):
+        self._inotify.add(self.folder)
+        for directory in set(os.path.dirname(path) for path in found):
+            self._inotify.add(directory)
@@ -0,0 +1,791 @@
+"""
+Tk user interface of CertumSigner
+
+The window only collects files, shows the log and edits the settings; the
+actual signing is done by SigningEngine in a background thread.
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox, scrolledtext
+import os
+import json
+import queue
+from pathlib import Path
+import threading
+
+from .file_list_view import VirtualFileList
+from .file_registry import FileRegistry, STATUS_PENDING, STATUS_VERIFIED, STATUS_FAILED, STATUS_SKIPPED
+from .log_pipeline import AsyncLogger, DEFAULT_UI_MAX_LINES, UI_BATCH_SIZE
+from .pipeline import DEFAULT_VERIFY_WORKERS
+from .signing_engine import (
+    SigningEngine, DEFAULT_SETTINGS_FILE, DEFAULT_LOG_FILE, MAX_WORKERS_LIMIT, MAX_BATCH_SIZE, SIGN_MODES,
+    default_settings, load_settings_file, create_artifact_cache, create_scanner, create_toolchain_resolver,
+    create_latency_history, create_log_rotation, get_timestamp_servers, journal_directory
+)
+from .local_staging import STAGING_MODES
+from .scheduling import SIGN_ORDERS
+from .run_journal import find_interrupted_run
+
+_SCAN_DONE = object()
+
+
+def _split_patterns(text):
+    """Split a ';'-separated list (glob patterns, URLs) from a settings field"""
+    return [pattern.strip() for pattern in text.split(";") if pattern.strip()]
+
+
+class CertumSignerApp:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Certum Signer")
+        self.root.geometry("800x600")
+        self.root.minsize(600, 400)
+        
+        # File list: sorted paths with the status of each file
+        self.file_registry = FileRegistry()
+        
+        # Folder scans stream their matches through this queue into the list
+        self._scan_queue = queue.Queue()
+        self._scan_cancels = set()
+        self._scans_running = 0
+        self._scan_found = 0
+        self._signing = False
+        self._watch_stop = None
+        
+        # Load settings
+        self.settings_file = DEFAULT_SETTINGS_FILE
+        self.log_file = DEFAULT_LOG_FILE
+        self.logger = AsyncLogger(self.log_file)
+        self.load_settings()
+        self.logger.set_log_file(self.log_file)
+        self.logger.set_rotation(create_log_rotation(self.settings))
+        
+        # Index of already signed files, stored next to the settings file
+        self.artifact_cache = create_artifact_cache(self.settings_file, self.settings)
+        self.engine = SigningEngine(self.settings, self.logger, self.artifact_cache,
+                                    status_callback=self.file_registry.set_status_many,
+                                    journal_dir=journal_directory(self.settings_file),
+                                    toolchain=create_toolchain_resolver(self.settings_file),
+                                    latency_history=create_latency_history(self.settings_file))
+        
+        # Create UI
+        self.create_menu()
+        self.create_widgets()
+        
+        interrupted = find_interrupted_run(journal_directory(self.settings_file))
+        if interrupted is not None and interrupted.unfinished():
+            self.log_message(f"The last signing run was interrupted with {len(interrupted.unfinished())} "
+                             f"files left; use File > Resume Interrupted Run to continue it")
+        
+    def load_settings(self):
+        """Load settings from JSON file"""
+        if self.settings_file.exists():
+            try:
+                self.settings = load_settings_file(self.settings_file)
+            except Exception as e:
+                self.settings = default_settings(self.log_file)
+                self.log_message(f"Error loading settings: {e}", error=True)
+        else:
+            self.settings = default_settings(self.log_file)
+            self.save_settings()
+        
+        # Update log file path
+        self.log_file = Path(self.settings["log_file"])
+        
+    def save_settings(self):
+        """Save settings to JSON file"""
+        try:
+            with open(self.settings_file, 'w') as f:
+                json.dump(self.settings, f, indent=2)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save settings: {e}")
+    
+    def create_menu(self):
+        """Create menu bar"""
+        menubar = tk.Menu(self.root)
+        self.root.config(menu=menubar)
+        
+        # File menu
+        file_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="File", menu=file_menu)
+        file_menu.add_command(label="Settings", command=self.open_settings)
+        file_menu.add_command(label="Clear Signing Cache", command=self.clear_signing_cache)
+        file_menu.add_command(label="Resume Interrupted Run", command=self.resume_interrupted_run)
+        file_menu.add_separator()
+        file_menu.add_command(label="Exit", command=self.on_close)
+        
+        # Help menu
+        help_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Help", menu=help_menu)
+        help_menu.add_command(label="About", command=self.show_about)
+    
+    def create_widgets(self):
+        """Create main UI widgets"""
+        # Main container
+        main_frame = ttk.Frame(self.root, padding="10")
+        main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Configure grid weights
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        main_frame.columnconfigure(0, weight=1)
+        main_frame.rowconfigure(1, weight=1)
+        main_frame.rowconfigure(3, weight=1)
+        
+        # Button frame
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        ttk.Button(button_frame, text="Select Files", command=self.select_files).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Select Folder", command=self.select_folder).pack(side=tk.LEFT, padx=5)
+        self.watch_button = ttk.Button(button_frame, text="Watch Folder", command=self.toggle_watch)
+        self.watch_button.pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Remove Selected", command=self.remove_selected).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Clear List", command=self.clear_files).pack(side=tk.LEFT, padx=5)
+        
+        # File list frame
+        list_frame = ttk.LabelFrame(main_frame, text="Files to Sign", padding="5")
+        list_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        list_frame.columnconfigure(0, weight=1)
+        list_frame.rowconfigure(0, weight=1)
+        
+        # Only the visible rows are drawn, so the list stays fast with 100k+ files
+        self.file_view = VirtualFileList(list_frame, self.file_registry)
+        self.file_view.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.file_view.canvas.bind("<Delete>", lambda event: self.remove_selected())
+        
+        # Sign button
+        sign_frame = ttk.Frame(main_frame)
+        sign_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        self.sign_button = ttk.Button(sign_frame, text="Sign All Files", command=self.sign_files)
+        self.sign_button.pack(side=tk.LEFT, padx=5)
+        self.check_button = ttk.Button(sign_frame, text="Check Files", command=self.check_files)
+        self.check_button.pack(side=tk.LEFT, padx=5)
+        
+        self.status_label = ttk.Label(sign_frame, text="Ready")
+        self.status_label.pack(side=tk.LEFT, padx=10)
+        
+        # Log frame
+        log_frame = ttk.LabelFrame(main_frame, text="Log Output", padding="5")
+        log_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        log_frame.columnconfigure(0, weight=1)
+        log_frame.rowconfigure(0, weight=1)
+        
+        self.log_text = scrolledtext.ScrolledText(log_frame, height=10, state='disabled')
+        self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.log_text.tag_config("error", foreground="red")
+        
+        # Log lines are queued by log_message and shown from the Tk main loop
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._drain_log_queue()
+    
+    def select_files(self):
+        """Open file dialog to select files"""
+        files = filedialog.askopenfilenames(
+            title="Select files to sign",
+            filetypes=[
+                ("Executable files", "*.exe"),
+                ("DLL files", "*.dll"),
+                ("MSI files", "*.msi"),
+                ("Cabinet files", "*.cab"),
+                ("Packages (signed inside)", "*.zip *.nupkg *.vsix"),
+                ("All files", "*.*")
+            ]
+        )
+        self.file_registry.add_many(os.path.abspath(file_path) for file_path in files
+                                    if os.path.isfile(file_path))
+        self.update_file_list()
+    
+    def select_folder(self):
+        """Open folder dialog to select a folder"""
+        folder = filedialog.askdirectory(title="Select folder containing files to sign")
+        if folder:
+            self.add_folder(folder)
+    
+    def toggle_watch(self):
+        """Start watching a folder, or stop the running watch"""
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self.watch_button.config(state='disabled')
+            self.status_label.config(text="Stopping watch...")
+            return
+        if self._signing:
+            return
+        folder = filedialog.askdirectory(title="Select the build output folder to watch")
+        if not folder:
+            return
+        
+        self._watch_stop = threading.Event()
+        self.watch_button.config(text="Stop Watching")
+        self._signing = True
+        self.sign_button.config(state='disabled')
+        self._update_signing_progress()
+        
+        thread = threading.Thread(target=self._watch_folder_thread, args=(folder, self._watch_stop))
+        thread.daemon = True
+        thread.start()
+    
+    def _watch_folder_thread(self, folder, stop_event):
+        """Thread function that signs new files in folder until the watch is stopped"""
+        try:
+            self.engine.watch_folder(folder, stop_event, files_callback=self.file_registry.add_many)
+        except Exception as e:
+            self.log_message(f"Error watching {folder}: {e}", error=True)
+        self.root.after(0, self._watch_finished)
+    
+    def _watch_finished(self):
+        self._watch_stop = None
+        self.watch_button.config(text="Watch Folder", state='normal')
+        self._signing_finished()
+    
+    def add_file(self, file_path):
+        """Add a single file to the list"""
+        if os.path.isfile(file_path):
+            self.file_registry.add(os.path.abspath(file_path))
+    
+    def add_folder(self, folder_path):
+        """Scan a folder for signable files in the background
+        
+        Matches are added to the list in batches by _drain_scan_queue while
+        the scan is still running.
+        """
+        scanner = create_scanner(self.settings)
+        cancel_event = threading.Event()
+        self._scan_cancels.add(cancel_event)
+        self._scans_running += 1
+        self.sign_button.config(state='disabled')
+        self.status_label.config(text=f"Scanning... {self._scan_found} files found")
+        
+        thread = threading.Thread(target=self._scan_folder_thread, args=(scanner, folder_path, cancel_event))
+        thread.daemon = True
+        thread.start()
+        if self._scans_running == 1:
+            self._drain_scan_queue()
+    
+    def _scan_folder_thread(self, scanner, folder_path, cancel_event):
+        """Thread function that feeds the scan results into the scan queue"""
+        self.log_message(f"Scanning folder: {folder_path}")
+        try:
+            for batch in scanner.scan(folder_path, cancel_event=cancel_event):
+                self._scan_queue.put((cancel_event, batch))
+        except Exception as e:
+            self.log_message(f"Error scanning {folder_path}: {e}", error=True)
+        for path, error in scanner.errors:
+            self.log_message(f"Cannot read folder {path}: {error}", error=True)
+        self._scan_queue.put((cancel_event, _SCAN_DONE))
+    
+    def _drain_scan_queue(self):
+        """Append newly found files to the list (runs in the Tk main loop)"""
+        while True:
+            try:
+                cancel_event, item = self._scan_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _SCAN_DONE:
+                self._scan_cancels.discard(cancel_event)
+                self._scans_running -= 1
+                continue
+            if cancel_event.is_set():
+                continue  # list was cleared while the scan was running
+            self._scan_found += self.file_registry.add_many(item)
+        
+        if self._scans_running > 0:
+            self.status_label.config(text=f"Scanning... {self._scan_found} files found")
+            self.root.after(50, self._drain_scan_queue)
+            return
+        
+        self.log_message(f"Folder scan complete: {self._scan_found} files added")
+        self._scan_found = 0
+        if not self._signing:
+            self.sign_button.config(state='normal')
+            self.status_label.config(text="Ready")
+    
+    def clear_files(self):
+        """Clear the file list"""
+        self._cancel_scans()
+        self.file_registry.clear()
+        self.file_view.clear_selection()
+        self.log_message("File list cleared")
+    
+    def clear_signing_cache(self):
+        """Forget all previously signed files so the next run signs everything"""
+        self.artifact_cache.clear()
+        try:
+            self.artifact_cache.save()
+        except OSError as e:
+            self.log_message(f"Failed to save signing cache: {e}", error=True)
+            return
+        self.log_message("Signing cache cleared")
+    
+    def remove_selected(self):
+        """Remove the selected files from the list"""
+        if self._signing:
+            return
+        removed = self.file_registry.remove_many(self.file_view.selection)
+        self.file_view.clear_selection()
+        if removed:
+            self.log_message(f"Removed {removed} files from the list")
+    
+    def update_file_list(self):
+        """Redraw the visible part of the file list"""
+        self.file_view.refresh()
+    
+    def sign_files(self):
+        """Sign all files in the list"""
+        if not len(self.file_registry):
+            messagebox.showwarning("No Files", "Please add files to sign first.")
+            return
+        
+        self.file_registry.reset_status(STATUS_PENDING)
+        self._start_signing()
+    
+    def check_files(self):
+        """Run the pre-flight checks over the list without signing anything"""
+        if not len(self.file_registry) or self._signing:
+            return
+        self.check_button.config(state='disabled')
+        self.status_label.config(text="Checking files...")
+        thread = threading.Thread(target=self._check_files_thread, args=(self.file_registry.paths(),))
+        thread.daemon = True
+        thread.start()
+    
+    def _check_files_thread(self, files):
+        """Thread function for check_files"""
+        problems, tool_error = self.engine.preflight(files)
+        for file_path, problem in sorted(problems.items()):
+            self.log_message(f"✗ {file_path}: {problem}", error=True)
+        if tool_error:
+            self.log_message(f"✗ {tool_error}", error=True)
+        self.root.after(0, lambda: self._check_finished(problems, tool_error))
+    
+    def _check_finished(self, problems, tool_error):
+        """Show the pre-flight report and offer to drop the files that would fail"""
+        self.check_button.config(state='normal')
+        if not self._signing:
+            self.status_label.config(text="Ready")
+        self.file_registry.set_status_many(list(problems), STATUS_FAILED)
+        if tool_error:
+            messagebox.showerror("Pre-flight Check", f"{tool_error}\n\nCheck the Signing Command in the settings.")
+        if not problems:
+            if not tool_error:
+                messagebox.showinfo("Pre-flight Check", "All files can be signed.")
+            return
+        details = "\n".join(f"{os.path.basename(path)}: {problem}" for path, problem in sorted(problems.items())[:10])
+        if len(problems) > 10:
+            details += f"\n... and {len(problems) - 10} more (see log)"
+        if messagebox.askyesno("Pre-flight Check",
+                               f"{len(problems)} files cannot be signed:\n\n{details}\n\nRemove them from the list?"):
+            removed = self.file_registry.remove_many(problems)
+            self.file_view.clear_selection()
+            self.log_message(f"Removed {removed} files that failed the pre-flight check")
+    
+    def resume_interrupted_run(self):
+        """Continue the files of the last run that did not finish"""
+        if self._signing:
+            return
+        state = find_interrupted_run(journal_directory(self.settings_file))
+        if state is None or not state.unfinished(retry_failed=True):
+            messagebox.showinfo("Resume", "There is no interrupted run to resume.")
+            return
+        
+        unfinished = state.unfinished()
+        failed = len(state.unfinished(retry_failed=True)) - len(unfinished)
+        answer = messagebox.askyesnocancel(
+            "Resume Interrupted Run",
+            f"The interrupted run has {len(unfinished)} files left"
+            + (f" and {failed} failed files" if failed else "") + ".\n\n"
+            + ("Sign the failed files again as well?" if failed else "Continue the run?")
+        )
+        if answer is None or (not failed and not answer):
+            return
+        retry_failed = bool(answer and failed)
+        
+        # Show the whole run, with the files that are done in their final state
+        self.file_registry.add_many(state.files)
+        for file_status in set(state.states.values()):
+            if file_status in (STATUS_VERIFIED, STATUS_SKIPPED, STATUS_FAILED):
+                self.file_registry.set_status_many(
+                    [path for path, status in state.states.items() if status == file_status], file_status)
+        self.file_registry.set_status_many(state.unfinished(retry_failed), STATUS_PENDING)
+        self.log_message(f"Resuming interrupted run {os.path.basename(state.path)}")
+        self._start_signing(resume_state=state, retry_failed=retry_failed)
+    
+    def _start_signing(self, resume_state=None, retry_failed=False):
+        # Disable sign button during signing
+        self._signing = True
+        self.sign_button.config(state='disabled')
+        self.status_label.config(text="Signing in progress...")
+        self._update_signing_progress()
+        
+        # Run signing in a separate thread to keep UI responsive
+        thread = threading.Thread(target=self._sign_files_thread, args=(resume_state, retry_failed))
+        thread.daemon = True
+        thread.start()
+    
+    def _sign_files_thread(self, resume_state=None, retry_failed=False):
+        """Thread function to sign files with the signing engine"""
+        try:
+            if resume_state is not None:
+                summary = self.engine.resume_run(resume_state, retry_failed=retry_failed)
+            else:
+                summary = self.engine.sign_files(self.file_registry.paths())
+        except Exception as e:
+            message = f"Signing stopped with an error: {e}"
+            self.log_message(f"✗ {message}", error=True)
+            self.root.after(0, lambda: messagebox.showerror("Signing Failed", f"{message}\n\nCheck log for details."))
+            return
+        finally:
+            # Re-enable button, also after an error
+            self.root.after(0, self._signing_finished)
+        verified_count = summary.verified
+        failure_count = summary.failed
+        skipped_count = summary.skipped
+        
+        # Show completion message
+        if failure_count == 0:
+            self.root.after(0, lambda: messagebox.showinfo("Success", 
+                f"All {verified_count} files signed and verified successfully!"
+                + (f"\n{skipped_count} already signed files skipped." if skipped_count else "")))
+        else:
+            self.root.after(0, lambda: messagebox.showwarning("Completed with Errors", 
+                f"Verified: {verified_count}\nFailed: {failure_count}\n\nCheck log for details."))
+    
+    def _cancel_scans(self):
+        """Stop all running folder scans and drop their pending results"""
+        for cancel_event in self._scan_cancels:
+            cancel_event.set()
+    
+    def _update_signing_progress(self):
+        """Show the per-status file counts while signing runs"""
+        if not self._signing:
+            return
+        counts = self.file_registry.counts()
+        done = counts.get(STATUS_VERIFIED, 0) + counts.get(STATUS_FAILED, 0) + counts.get(STATUS_SKIPPED, 0)
+        activity = "Watching for new files" if self._watch_stop is not None else "Signing in progress"
+        self.status_label.config(text=f"{activity}... {done}/{len(self.file_registry)} done, "
+                                      f"{counts.get(STATUS_FAILED, 0)} failed")
+        self.root.after(250, self._update_signing_progress)
+    
+    def _signing_finished(self):
+        """Re-enable the sign button unless a folder scan is still running"""
+        self._signing = False
+        if not self._scans_running:
+            self.sign_button.config(state='normal')
+            self.status_label.config(text="Ready")
+    
+    def log_message(self, message, error=False):
+        """Add message to log output and log file
+        
+        Safe to call from any thread: the line is only queued. The log writer
+        thread appends it to the log file and _drain_log_queue shows it in the UI.
+        """
+        self.logger.log(message, error=error)
+    
+    def _drain_log_queue(self):
+        """Move queued log lines into the log widget (runs in the Tk main loop)"""
+        records = self.logger.drain_ui()
+        if records:
+            self.log_text.config(state='normal')
+            # Insert runs of lines with the same tag in one call
+            run, run_error = [], False
+            for line, error in records + [(None, None)]:
+                if run and (line is None or error != run_error):
+                    self.log_text.insert(tk.END, "\n".join(run) + "\n", ("error",) if run_error else ())
+                    run = []
+                if line is not None:
+                    run.append(line)
+                    run_error = error
+            
+            # Keep the widget bounded
+            max_lines = self.engine.get_int_setting("log_max_lines", DEFAULT_UI_MAX_LINES, 100, 1000000)
+            line_count = int(self.log_text.index('end-1c').split('.')[0])
+            if line_count > max_lines:
+                self.log_text.delete('1.0', f"{line_count - max_lines + 1}.0")
+            self.log_text.see(tk.END)
+            self.log_text.config(state='disabled')
+        
+        # Poll again soon; right away if more lines are waiting
+        self.root.after(10 if len(records) >= UI_BATCH_SIZE else 100, self._drain_log_queue)
+    
+    def on_close(self):
+        """Flush the log and close the main window"""
+        self._cancel_scans()
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+        self.logger.close()
+        self.root.destroy()
+    
+    def open_settings(self):
+        """Open settings dialog"""
+        settings_window = tk.Toplevel(self.root)
+        settings_window.title("Settings")
+        settings_window.geometry("500x840")
+        settings_window.transient(self.root)
+        settings_window.grab_set()
+        
+        # Main frame
+        frame = ttk.Frame(settings_window, padding="20")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        settings_window.columnconfigure(0, weight=1)
+        settings_window.rowconfigure(0, weight=1)
+        
+        # Signing command
+        ttk.Label(frame, text="Signing Command:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        signing_cmd_entry = ttk.Entry(frame, width=50)
+        signing_cmd_entry.insert(0, self.settings.get("signing_command", "signtool"))
+        signing_cmd_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), pady=5, padx=(10, 0))
+        
+        # Timestamp server
+        ttk.Label(frame, text="Timestamp Server:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        timestamp_entry = ttk.Entry(frame, width=50)
+        timestamp_entry.insert(0, "; ".join(get_timestamp_servers(self.settings)))
+        timestamp_entry.grid(row=1, column=1, sticky=(tk.W, tk.E), pady=5, padx=(10, 0))
+        
+        # Log file location
+        ttk.Label(frame, text="Log File Location:").grid(row=2, column=0, sticky=tk.W, pady=5)
+        log_file_entry = ttk.Entry(frame, width=50)
+        log_file_entry.insert(0, self.settings.get("log_file", str(self.log_file)))
+        log_file_entry.grid(row=2, column=1, sticky=(tk.W, tk.E), pady=5, padx=(10, 0))
+        
+        def browse_log_file():
+            filename = filedialog.asksaveasfilename(
+                title="Select log file location",
+                defaultextension=".log",
+                filetypes=[("Log files", "*.log"), ("Text files", "*.txt"), ("All files", "*.*")]
+            )
+            if filename:
+                log_file_entry.delete(0, tk.END)
+                log_file_entry.insert(0, filename)
+        
+        ttk.Button(frame, text="Browse...", command=browse_log_file).grid(row=2, column=2, pady=5, padx=(5, 0))
+        
+        # Parallel workers
+        ttk.Label(frame, text="Sign Workers:").grid(row=3, column=0, sticky=tk.W, pady=5)
+        workers_spinbox = ttk.Spinbox(frame, from_=1, to=MAX_WORKERS_LIMIT, width=5)
+        workers_spinbox.set(self.engine.get_max_workers())
+        workers_spinbox.grid(row=3, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        ttk.Label(frame, text="Verify Workers:").grid(row=4, column=0, sticky=tk.W, pady=5)
+        verify_workers_spinbox = ttk.Spinbox(frame, from_=1, to=MAX_WORKERS_LIMIT, width=5)
+        verify_workers_spinbox.set(self.engine.get_int_setting("verify_workers", DEFAULT_VERIFY_WORKERS, 1, MAX_WORKERS_LIMIT))
+        verify_workers_spinbox.grid(row=4, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        # Batch size
+        ttk.Label(frame, text="Files per Call:").grid(row=5, column=0, sticky=tk.W, pady=5)
+        batch_spinbox = ttk.Spinbox(frame, from_=1, to=MAX_BATCH_SIZE, width=5)
+        batch_spinbox.set(self.engine.get_batch_size())
+        batch_spinbox.grid(row=5, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        # Signing cache
+        skip_unchanged_var = tk.BooleanVar(value=self.settings.get("skip_unchanged", True))
+        ttk.Checkbutton(frame, text="Skip unchanged files that are already signed",
+                        variable=skip_unchanged_var).grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=5)
+        skip_signed_var = tk.BooleanVar(value=self.settings.get("skip_already_signed", False))
+        ttk.Checkbutton(frame, text="Skip files that already carry a valid signature",
+                        variable=skip_signed_var).grid(row=7, column=0, columnspan=3, sticky=tk.W, pady=5)
+        
+        # Verification mode
+        ttk.Label(frame, text="Verification:").grid(row=8, column=0, sticky=tk.W, pady=5)
+        verify_mode_combo = ttk.Combobox(frame, values=["full", "quick"], state="readonly", width=8)
+        verify_mode_combo.set(self.settings.get("verify_mode", "full"))
+        verify_mode_combo.grid(row=8, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        # Folder scan rules
+        ttk.Label(frame, text="Scan Include:").grid(row=9, column=0, sticky=tk.W, pady=5)
+        scan_include_entry = ttk.Entry(frame, width=50)
+        scan_include_entry.insert(0, "; ".join(self.settings.get("scan_include") or []))
+        scan_include_entry.grid(row=9, column=1, sticky=(tk.W, tk.E), pady=5, padx=(10, 0))
+        ttk.Label(frame, text="Scan Exclude:").grid(row=10, column=0, sticky=tk.W, pady=5)
+        scan_exclude_entry = ttk.Entry(frame, width=50)
+        scan_exclude_entry.insert(0, "; ".join(self.settings.get("scan_exclude") or []))
+        scan_exclude_entry.grid(row=10, column=1, sticky=(tk.W, tk.E), pady=5, padx=(10, 0))
+        ttk.Label(frame, text="Scan Depth:").grid(row=11, column=0, sticky=tk.W, pady=5)
+        scan_depth_entry = ttk.Entry(frame, width=7)
+        scan_max_depth = self.settings.get("scan_max_depth")
+        scan_depth_entry.insert(0, "" if scan_max_depth is None else str(scan_max_depth))
+        scan_depth_entry.grid(row=11, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        # Sign mode
+        ttk.Label(frame, text="Sign Mode:").grid(row=12, column=0, sticky=tk.W, pady=5)
+        sign_mode_combo = ttk.Combobox(frame, values=list(SIGN_MODES), state="readonly", width=8)
+        sign_mode_combo.set(self.engine.get_sign_mode())
+        sign_mode_combo.grid(row=12, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        # Local staging of files on network shares
+        ttk.Label(frame, text="Local Staging:").grid(row=13, column=0, sticky=tk.W, pady=5)
+        staging_combo = ttk.Combobox(frame, values=list(STAGING_MODES), state="readonly", width=8)
+        staging_combo.set(self.engine.get_staging_mode())
+        staging_combo.grid(row=13, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        
+        # Binaries inside packages
+        sign_archives_var = tk.BooleanVar(value=self.settings.get("sign_archives", False))
+        ttk.Checkbutton(frame, text="Sign files inside ZIP/NuGet/VSIX packages",
+                        variable=sign_archives_var).grid(row=14, column=0, columnspan=3, sticky=tk.W, pady=5)
+        
+        # Order of the files and limits of the sign calls
+        ttk.Label(frame, text="Sign Order:").grid(row=15, column=0, sticky=tk.W, pady=5)
+        sign_order_combo = ttk.Combobox(frame, values=list(SIGN_ORDERS), state="readonly", width=8)
+        sign_order_combo.set(self.engine.get_sign_order())
+        sign_order_combo.grid(row=15, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        ttk.Label(frame, text="Rate Limit:").grid(row=16, column=0, sticky=tk.W, pady=5)
+        rate_frame = ttk.Frame(frame)
+        rate_frame.grid(row=16, column=1, sticky=tk.W, pady=5, padx=(10, 0))
+        rate_entry = ttk.Entry(rate_frame, width=7)
+        rate_entry.insert(0, f"{self.engine.get_float_setting('rate_limit_per_minute', 0):g}")
+        rate_entry.pack(side=tk.LEFT)
+        ttk.Label(rate_frame, text="calls/min, sessions:").pack(side=tk.LEFT, padx=(5, 5))
+        sessions_spinbox = ttk.Spinbox(rate_frame, from_=0, to=MAX_WORKERS_LIMIT, width=5)
+        sessions_spinbox.set(self.engine.get_int_setting("max_sign_sessions", 0, 0, MAX_WORKERS_LIMIT))
+        sessions_spinbox.pack(side=tk.LEFT)
+        
+        # Help text
+        help_text = (
+            "Signing Command: Use 'signtool' (NOT SimplySignDesktop.exe!)\n"
+            "  • Leave as 'signtool' if it's in your PATH\n"
+            "  • Or provide full path to signtool.exe from Windows SDK\n"
+            "  • signtool integrates automatically with SimplySign Desktop\n\n"
+            "Timestamp Server: URL of the timestamp server for timestamping signatures; several URLs "
+            "separated by ';' form a pool - each call uses the fastest healthy server, failing ones are skipped\n"
+            "Log File: Location where signing logs will be saved\n"
+            f"Sign/Verify Workers: Files signed / verified at the same time (1-{MAX_WORKERS_LIMIT})\n"
+            "Files per Call: Files signed by one signtool call (1 = one call per file)\n"
+            "Skip unchanged: Files signed and verified by an earlier run are not signed again\n"
+            "Scan Include/Exclude: Glob patterns separated by ';' (e.g. 'bin/*; *.dll' / 'obj; *.vshost.exe')\n"
+            "Scan Depth: Subfolder levels scanned by Select Folder (empty = unlimited)\n"
+            "Sign Mode: 'digest' hashes files locally and only sends digests to SimplySign "
+            "(best with Files per Call > 1)\n"
+            "Local Staging: Copy files ('network' = only files on network shares) to local disk, sign them "
+            "there and write them back atomically\n"
+            "Packages: Sign the EXE/DLL files inside .zip/.nupkg/.vsix files; only the signed entries "
+            "are replaced, all others are copied without recompressing\n"
+            "Sign Order: 'largest' signs the files that take longest first (shortest total time), "
+            "'smallest' gives quick feedback\n"
+            "Rate Limit: Sign calls per minute and concurrent SimplySign sessions (0 = unlimited)\n"
+            "Verification: 'full' runs signtool verify (certificate chain), "
+            "'quick' only checks the embedded signature of EXE/DLL files"
+        )
+        help_label = ttk.Label(frame, text=help_text, wraplength=450, justify=tk.LEFT, foreground="gray")
+        help_label.grid(row=17, column=0, columnspan=3, sticky=tk.W, pady=(20, 10))
+        
+        frame.columnconfigure(1, weight=1)
+        
+        # Buttons
+        button_frame = ttk.Frame(frame)
+        button_frame.grid(row=18, column=0, columnspan=3, pady=(20, 0))
+        
+        def save_and_close():
+            signing_cmd = signing_cmd_entry.get()
+            
+            try:
+                max_workers = int(workers_spinbox.get())
+                verify_workers = int(verify_workers_spinbox.get())
+                if not (1 <= max_workers <= MAX_WORKERS_LIMIT and 1 <= verify_workers <= MAX_WORKERS_LIMIT):
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Invalid Setting",
+                    f"Sign and Verify Workers must be numbers between 1 and {MAX_WORKERS_LIMIT}.")
+                return
+            
+            try:
+                batch_size = int(batch_spinbox.get())
+                if not 1 <= batch_size <= MAX_BATCH_SIZE:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Invalid Setting",
+                    f"Files per Call must be a number between 1 and {MAX_BATCH_SIZE}.")
+                return
+            
+            timestamp_servers = _split_patterns(timestamp_entry.get())
+            if not timestamp_servers:
+                messagebox.showerror("Invalid Setting", "Please enter at least one timestamp server URL.")
+                return
+            
+            try:
+                rate_limit = float(rate_entry.get().strip() or 0)
+                max_sessions = int(sessions_spinbox.get())
+                if rate_limit < 0 or not 0 <= max_sessions <= MAX_WORKERS_LIMIT:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Invalid Setting",
+                    f"Rate Limit must be 0 (unlimited) or more calls per minute, "
+                    f"sessions a number between 0 and {MAX_WORKERS_LIMIT}.")
+                return
+            
+            depth_text = scan_depth_entry.get().strip()
+            try:
+                scan_max_depth = int(depth_text) if depth_text else None
+                if scan_max_depth is not None and scan_max_depth < 0:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Invalid Setting",
+                    "Scan Depth must be empty (unlimited) or a number of 0 or more.")
+                return
+            
+            # Warn if user is trying to use SimplySignDesktop.exe
+            if "simplysigndesktop.exe" in signing_cmd.lower():
+                warning_msg = (
+                    "⚠ WARNING: You configured SimplySignDesktop.exe\n\n"
+                    "SimplySignDesktop.exe does NOT work with signtool command-line parameters!\n"
+                    "Your files will NOT be signed with this configuration.\n\n"
+                    "CORRECT CONFIGURATION:\n"
+                    "• Use 'signtool' (if in PATH)\n"
+                    "• Or full path to signtool.exe from Windows SDK\n\n"
+                    "signtool automatically integrates with SimplySign Desktop.\n\n"
+                    "Do you want to continue anyway?"
+                )
+                if not messagebox.askyesno("Configuration Warning", warning_msg, icon='warning'):
+                    return
+            
+            self.settings["signing_command"] = signing_cmd
+            self.settings["timestamp_servers"] = timestamp_servers
+            self.settings["timestamp_server"] = timestamp_servers[0]
+            self.settings["log_file"] = log_file_entry.get()
+            self.settings["max_workers"] = max_workers
+            self.settings["verify_workers"] = verify_workers
+            self.settings["batch_size"] = batch_size
+            self.settings["skip_unchanged"] = skip_unchanged_var.get()
+            self.settings["skip_already_signed"] = skip_signed_var.get()
+            self.settings["verify_mode"] = verify_mode_combo.get()
+            self.settings["scan_include"] = _split_patterns(scan_include_entry.get())
+            self.settings["scan_exclude"] = _split_patterns(scan_exclude_entry.get())
+            self.settings["scan_max_depth"] = scan_max_depth
+            self.settings["sign_mode"] = sign_mode_combo.get()
+            self.settings["staging_mode"] = staging_combo.get()
+            self.settings["sign_archives"] = sign_archives_var.get()
+            self.settings["sign_order"] = sign_order_combo.get()
+            self.settings["rate_limit_per_minute"] = rate_limit
+            self.settings["max_sign_sessions"] = max_sessions
+            self.log_file = Path(self.settings["log_file"])
+            self.logger.set_log_file(self.log_file)
+            self.save_settings()
+            self.log_message("Settings saved")
+            settings_window.destroy()
+        
+        ttk.Button(button_frame, text="Save", command=save_and_close).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Cancel", command=settings_window.destroy).pack(side=tk.LEFT, padx=5)
+    
+    def show_about(self):
+        """Show about dialog"""
+        about_text = """Certum Signer v1.0
+
+A simple Windows desktop tool for code signing using Certum SimplySign.
+
+Features:
+• Select files or folders for signing
+• Batch signing with parallel workers
+• Real-time logging
+• File-based logs
+• Configurable settings
+
+The tool integrates with Certum SimplySign Desktop
+for secure code signing with OTP verification.
+
+License: GNU GPL v3"""
+        messagebox.showinfo("About Certum Signer", about_text)
+
+
+def run_gui():
+    """Create the main window and run the Tk main loop"""
+    root = tk.Tk()
+    app = CertumSignerApp(root)
+    root.mainloop()
@@ -0,0 +1,187 @@
+"""
+Local staging of files on network shares
+
+signtool reads and rewrites a file in place: once to sign it and again to
+verify it, and over SMB every one of those passes is a series of network
+round trips. A dropped connection in the middle of the rewrite leaves a
+half-written file on the share.
+
+LocalStaging copies the files to a local directory first (one sequential
+read per file, in parallel, hashing while copying), so signing and
+verification only touch local disk. A signed file is written back next to
+the original under a temporary name, read back and compared with the
+local checksum, and only then renamed over the original. The original is
+never half-written, and it is not overwritten if it changed on the share
+while its copy was being signed.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+STAGING_MODES = ("off", "network", "always")
+DEFAULT_STAGING_WORKERS = 8
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
+# File systems of network mounts on Linux/macOS (see /proc/mounts)
+NETWORK_FILESYSTEMS = frozenset(["cifs", "smb3", "smbfs", "nfs", "nfs4", "afpfs", "fuse.sshfs", "9p"])
+
+_DRIVE_REMOTE = 4
+
+
+class StagingError(OSError):
+    """A staged file could not be written back to its original location"""
+
+
+def _mount_types():
+    """[(mount point, file system)] from /proc/mounts, longest mount point first"""
+    try:
+        with open("/proc/mounts", 'r', encoding='utf-8') as f:
+            mounts = [line.split()[1:3] for line in f if len(line.split()) >= 3]
+    except OSError:
+        return []
+    return sorted(((point.replace("\\040", " "), fs_type) for point, fs_type in mounts),
+                  key=lambda mount: len(mount[0]), reverse=True)
+
+
+def is_network_path(path, mounts=None):
+    """Check whether a path is on a network share (UNC path, mapped drive, network mount)"""
+    path = os.path.abspath(path)
+    if os.name == "nt":
+        if path.startswith("\\\\"):
+            return True
+        try:
+            import ctypes
+            return ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(path)[0] + "\\") == _DRIVE_REMOTE
+        except (AttributeError, OSError):
+            return False
+    if mounts is None:
+        mounts = _mount_types() if sys.platform.startswith("linux") else []
+    for mount_point, fs_type in mounts:
+        if path == mount_point or path.startswith(mount_point.rstrip("/") + "/"):
+            return fs_type in NETWORK_FILESYSTEMS
+    return False
+
+
+def _copy_hashed(source, target):
+    """Copy source to target and return the SHA-256 of the copied bytes"""
+    digest = hashlib.sha256()
+    with open(source, 'rb') as src, open(target, 'wb') as out:
+        while True:
+            chunk = src.read(COPY_BUFFER_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+    return digest.hexdigest()
+
+
+def _hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StagedFile:
+    """A file copied to the staging directory
+
+    Attributes:
+        original: Path of the file on the share
+        local: Path of the local copy that is signed
+        size, mtime_ns: State of the original when it was copied
+    """
+
+    def __init__(self, original, local, size, mtime_ns):
+        self.original = original
+        self.local = local
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+
+class LocalStaging:
+    """Copies files to a local directory and writes them back atomically
+
+    Args:
+        base_dir: Directory for the staged copies (default: the system temp
+            directory); a subdirectory is created per run
+        workers: Number of files copied concurrently
+    """
+
+    def __init__(self, base_dir=None, workers=DEFAULT_STAGING_WORKERS):
+        os.makedirs(base_dir or tempfile.gettempdir(), exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="certum-staging-", dir=base_dir or None)
+        self.workers = max(1, workers)
+        self._counter = 0
+
+    def stage(self, files):
+        """Copy files to the staging directory in parallel
+
+        Returns:
+            tuple: (staged, errors) - StagedFile list in the order of files,
+                and (file_path, error message) for files that could not be copied
+        """
+        jobs = []
+        for file_path in files:
+            # One subdirectory per file keeps the name (and extension) of the original
+            self._counter += 1
+            jobs.append((file_path, os.path.join(self.directory, str(self._counter), os.path.basename(file_path))))
+
+        def copy(job):
+            original, local = job
+            try:
+                os.makedirs(os.path.dirname(local))
+                before = os.stat(original)
+                _copy_hashed(original, local)
+                return StagedFile(original, local, before.st_size, before.st_mtime_ns), None
+            except OSError as e:
+                return None, (original, str(e))
+
+        staged = []
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="certum-stage") as pool:
+            for staged_file, error in pool.map(copy, jobs):
+                if staged_file is not None:
+                    staged.append(staged_file)
+                else:
+                    errors.append(error)
+        return staged, errors
+
+    def write_back(self, staged_file):
+        """Replace the original with the signed local copy
+
+        Raises:
+            StagingError: If the original changed since it was staged, or the
+                written copy does not match; the original is left untouched
+            OSError: If writing fails
+        """
+        original = staged_file.original
+        current = os.stat(original)
+        if (current.st_size, current.st_mtime_ns) != (staged_file.size, staged_file.mtime_ns):
+            raise StagingError(f"{original} changed while its copy was being signed")
+
+        handle, temp_path = tempfile.mkstemp(prefix=".certum-", suffix=".tmp", dir=os.path.dirname(original))
+        os.close(handle)
+        try:
+            expected = _copy_hashed(staged_file.local, temp_path)
+            if _hash(temp_path) != expected:
+                raise StagingError(f"checksum mismatch after writing {original}")
+            shutil.copymode(original, temp_path)
+            os.replace(temp_path, original)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def cleanup(self):
+        """Delete the staging directory"""
+        shutil.rmtree(self.directory, ignore_errors=True)
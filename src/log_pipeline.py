@@ -0,0 +1,191 @@
+"""
+Asynchronous buffered logging
+
+Signing workers log dozens of lines per file. Instead of opening the log file
+and touching Tk widgets for every line, log() only formats the line and puts
+it on a queue:
+
+- a single writer thread appends queued lines to the log file in batches,
+  keeping one file handle open
+- the GUI drains its own queue in batches from the Tk main loop (root.after),
+  which is the only thread allowed to update widgets
+
+With a LogRotation the writer thread also starts a new log file when the
+current one gets too big or a new day begins (see log_rotation).
+"""
+
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+WRITER_BATCH_SIZE = 1000
+UI_BATCH_SIZE = 500
+DEFAULT_UI_MAX_LINES = 5000
+
+_STOP = object()
+
+
+class AsyncLogger:
+    """Queue-based logger with a background file writer
+
+    Args:
+        log_file: Path of the log file (can be changed with set_log_file)
+        ui_enabled: Keep a second queue of records for a UI to drain
+        echo: Optional text stream (e.g. sys.stderr) that also receives every
+            line; used by the command-line interface
+        rotation: Optional LogRotation applied by the writer thread
+    """
+
+    def __init__(self, log_file, ui_enabled=True, echo=None, rotation=None):
+        self.log_file = log_file
+        self.ui_enabled = ui_enabled
+        self.echo = echo
+        self.rotation = rotation
+        self._file_queue = queue.Queue()
+        self._ui_queue = queue.Queue()
+        self._handle = None
+        self._handle_path = None
+        self._size = 0
+        self._last_write = None
+        self._write_error_reported = False
+        self._rotate_error_reported = False
+        self._writer = threading.Thread(target=self._writer_loop, name="certum-log-writer", daemon=True)
+        self._writer.start()
+
+    def log(self, message, error=False):
+        """Queue one log line; returns immediately"""
+        self.log_block([(message, error)])
+
+    def log_block(self, entries):
+        """Queue several (message, error) lines that must stay together"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        records = [(f"[{timestamp}] {message}", error) for message, error in entries]
+        self._file_queue.put(records)
+        if self.ui_enabled:
+            self._ui_queue.put(records)
+
+    def set_log_file(self, log_file):
+        """Switch to another log file; lines queued so far go to the new file"""
+        self.log_file = log_file
+
+    def set_rotation(self, rotation):
+        """Rotate the log file with rotation (None = never) from the next write on"""
+        self.rotation = rotation
+
+    def drain_ui(self, max_records=UI_BATCH_SIZE):
+        """Return up to about max_records queued (line, error) records for the UI"""
+        records = []
+        while len(records) < max_records:
+            try:
+                records.extend(self._ui_queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written to disk"""
+        done = threading.Event()
+        self._file_queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=5):
+        """Write all queued lines and stop the writer thread"""
+        if self._writer.is_alive():
+            self._file_queue.put(_STOP)
+            self._writer.join(timeout)
+        if self.rotation is not None:
+            self.rotation.wait(timeout)
+
+    def _writer_loop(self):
+        while True:
+            items = [self._file_queue.get()]
+            while len(items) < WRITER_BATCH_SIZE:
+                try:
+                    items.append(self._file_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            events = []
+            stop = False
+            for item in items:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    lines.extend(line for line, error in item)
+            if lines:
+                self._write(lines)
+                if self.echo is not None:
+                    self._echo(lines)
+            for event in events:
+                event.set()
+            if stop:
+                self._close_handle()
+                return
+
+    def _write(self, lines):
+        data = "\n".join(lines) + "\n"
+        try:
+            if self._handle is None or self._handle_path != str(self.log_file):
+                self._open_handle()
+            rotation = self.rotation
+            # Size in characters: close enough to bytes for a size limit
+            if rotation is not None and rotation.should_rotate(self._size, len(data), self._last_write):
+                self._rotate(rotation)
+            self._handle.write(data)
+            self._handle.flush()
+            self._size += len(data)
+            self._last_write = time.time()
+            self._write_error_reported = False
+        except Exception as e:
+            self._close_handle()
+            if not self._write_error_reported:
+                print(f"Failed to write to log file: {e}", file=sys.stderr)
+                self._write_error_reported = True
+
+    def _open_handle(self):
+        self._close_handle()
+        self._handle_path = str(self.log_file)
+        self._handle = open(self._handle_path, 'a', encoding='utf-8')
+        stat = os.fstat(self._handle.fileno())
+        self._size = stat.st_size
+        self._last_write = stat.st_mtime if stat.st_size else None
+
+    def _rotate(self, rotation):
+        path = self._handle_path
+        self._close_handle()
+        try:
+            rotation.rotate(path)
+            self._rotate_error_reported = False
+        except OSError as e:
+            # e.g. another process has the file open; keep writing to it
+            if not self._rotate_error_reported:
+                print(f"Failed to rotate log file: {e}", file=sys.stderr)
+                self._rotate_error_reported = True
+        self._open_handle()
+        if self._rotate_error_reported:
+            # Try again once the file has grown by another limit, not on every write
+            self._size = 0
+            self._last_write = None
+
+    def _echo(self, lines):
+        try:
+            self.echo.write("\n".join(lines) + "\n")
+            self.echo.flush()
+        except (OSError, ValueError):
+            pass
+
+    def _close_handle(self):
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except OSError:
+                pass
+        self._handle = None
+        self._handle_path = None
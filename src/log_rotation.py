@@ -0,0 +1,202 @@
+"""
+Rotation, compression and retention of the log file
+
+Without rotation certum_signer.log grows forever. LogRotation decides when
+the log writer starts a new file - when the next write would take it over
+max_bytes, or on the first write of a new day - and what happens to the old
+one:
+
+    certum_signer.log  ->  certum_signer.20261017-093012.log
+                       ->  certum_signer.20261017-093012.log.gz  (background)
+
+The rotated file is handed to one background thread that compresses and
+prunes the rotated files one at a time, so the writer thread (and every
+worker waiting on the log queue) never waits for gzip, not even when the
+next rotation comes while the last file is still being compressed.
+Afterwards only the newest keep rotated files younger than max_age_days are
+kept, so disk use stays bounded however long the installation runs.
+"""
+
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+
+DEFAULT_LOG_MAX_MB = 10
+DEFAULT_LOG_KEEP = 10
+DEFAULT_LOG_KEEP_DAYS = 30
+_STAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def _rotated(log_file):
+    """[((stamp, counter), path)] of the rotated files of log_file"""
+    directory = os.path.dirname(os.path.abspath(str(log_file)))
+    base, extension = os.path.splitext(os.path.basename(str(log_file)))
+    prefix = base + "."
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    found = []
+    for name in names:
+        stem = name[:-3] if name.endswith(".gz") else name
+        if not (stem.startswith(prefix) and stem.endswith(extension)):
+            continue
+        # 20261017-093012, or 20261017-093012-2 for a later file of that second
+        stamp = stem[len(prefix):len(stem) - len(extension)]
+        if len(stamp) > 15 and stamp[15] != "-":
+            continue
+        try:
+            datetime.strptime(stamp[:15], _STAMP_FORMAT)
+            found.append(((stamp[:15], int(stamp[16:] or 0)), os.path.join(directory, name)))
+        except ValueError:
+            continue
+    return found
+
+
+def rotated_name(log_file, when=None):
+    """certum_signer.20261017-093012.log for certum_signer.log
+
+    Later files of the same second get a counter that is higher than any
+    left of that second, so the names keep sorting by age.
+    """
+    base, extension = os.path.splitext(str(log_file))
+    stamp = (when or datetime.now()).strftime(_STAMP_FORMAT)
+    counters = [counter for (other, counter), path in _rotated(log_file) if other == stamp]
+    if not counters:
+        return f"{base}.{stamp}{extension}"
+    return f"{base}.{stamp}-{max(counters) + 1}{extension}"
+
+
+def rotated_files(log_file):
+    """Rotated files of log_file (compressed or not), newest first"""
+    return [path for order, path in sorted(_rotated(log_file), reverse=True)]
+
+
+class LogRotation:
+    """When the log file is rotated and how long old files are kept
+
+    Args:
+        max_bytes: Rotate before the file grows over this size (0 = no limit)
+        daily: Rotate on the first write of a new day
+        keep: Rotated files kept (0 = none)
+        max_age_days: Rotated files older than this are deleted (0 = no limit)
+        compress: gzip rotated files in the background
+    """
+
+    def __init__(self, max_bytes=DEFAULT_LOG_MAX_MB * 1024 * 1024, daily=True, keep=DEFAULT_LOG_KEEP,
+                 max_age_days=DEFAULT_LOG_KEEP_DAYS, compress=True):
+        self.max_bytes = max(0, int(max_bytes))
+        self.daily = daily
+        self.keep = max(0, int(keep))
+        self.max_age_days = max(0, float(max_age_days))
+        self.compress = compress
+        # (log_file, rotated) waiting for compression and pruning
+        self._pending = queue.Queue()
+        self._worker = None
+        self._unfinished = 0
+        self._idle = threading.Condition()
+
+    def should_rotate(self, size, pending, last_write, now=None):
+        """Check whether the file must be rotated before pending more bytes are written
+
+        Args:
+            size: Current size of the log file
+            pending: Bytes about to be written
+            last_write: Time of the file's last write (timestamp), None if unknown
+        """
+        if size <= 0:
+            return False
+        if self.max_bytes and size + pending > self.max_bytes:
+            return True
+        if self.daily and last_write is not None:
+            now = now if now is not None else time.time()
+            return datetime.fromtimestamp(last_write).date() != datetime.fromtimestamp(now).date()
+        return False
+
+    def rotate(self, log_file):
+        """Move log_file aside and compress and prune in the background
+
+        The caller must have closed its handle of log_file.
+
+        Returns:
+            str: The path log_file was renamed to
+
+        Raises:
+            OSError: If the file cannot be renamed (e.g. opened by another
+                process on Windows); the caller keeps writing to it
+        """
+        log_file = str(log_file)
+        try:
+            when = datetime.fromtimestamp(os.path.getmtime(log_file))
+        except OSError:
+            when = datetime.now()
+        target = rotated_name(log_file, when)
+        os.replace(log_file, target)
+        # The condition is only ever held for a counter update, never during gzip
+        with self._idle:
+            self._unfinished += 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="certum-log-rotate", daemon=True)
+                self._worker.start()
+        self._pending.put((log_file, target))
+        return target
+
+    def _run(self):
+        # One file at a time: pruning must see the result of the compression before it
+        while True:
+            log_file, rotated = self._pending.get()
+            try:
+                self._finish(log_file, rotated)
+            finally:
+                with self._idle:
+                    self._unfinished -= 1
+                    self._idle.notify_all()
+
+    def _finish(self, log_file, rotated):
+        if self.compress:
+            try:
+                _compress(rotated)
+            except OSError:
+                pass  # the uncompressed file is kept and pruned like the others
+        self.prune(log_file)
+
+    def prune(self, log_file):
+        """Delete the rotated files beyond keep and older than max_age_days"""
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days else None
+        for index, path in enumerate(rotated_files(log_file)):
+            try:
+                if index >= self.keep or (cutoff is not None and os.path.getmtime(path) < cutoff):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def wait(self, timeout=None):
+        """Wait until the background compression has finished
+
+        Returns:
+            bool: False if timeout expired first
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unfinished == 0, timeout)
+
+
+def _compress(path):
+    """Replace path by path.gz"""
+    temp_file = path + ".gz.tmp"
+    try:
+        with open(path, 'rb') as source, gzip.open(temp_file, 'wb') as target:
+            shutil.copyfileobj(source, target, 1024 * 1024)
+        shutil.copystat(path, temp_file)
+        os.replace(temp_file, path + ".gz")
+    except OSError:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        raise
+    os.remove(path)
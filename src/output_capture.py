@@ -0,0 +1,132 @@
+"""
+Bounded capture of subprocess output
+
+subprocess.run(capture_output=True) keeps everything a process writes in
+memory, and all of it ends up in the log. signtool's verbose output is long
+(certificate chains with /v, one block per file for a batch), so memory and
+log size grew with the size of the batch. run_captured() reads stdout and
+stderr line by line through pipes and keeps per stream only
+
+- the first head_lines and the last tail_lines lines
+- lines in between that match the keep pattern (the result lines the
+  callers parse, e.g. "Successfully signed: ..." or "SignTool Error: ..."),
+  up to max_kept of them
+
+Everything else is counted and replaced by one "... N lines omitted ..."
+line, so a caller sees what it needs to decide the outcome and the log
+still shows how the output started and ended.
+"""
+
+import subprocess
+import threading
+from collections import deque
+from functools import partial
+
+
+DEFAULT_HEAD_LINES = 20
+DEFAULT_TAIL_LINES = 20
+DEFAULT_MAX_KEPT = 1000
+# Longer lines are cut into pieces, so one line without newline cannot fill the memory
+MAX_LINE_LENGTH = 4096
+
+
+class BoundedOutput:
+    """The head, the matching lines and the tail of one output stream"""
+
+    def __init__(self, head_lines=DEFAULT_HEAD_LINES, tail_lines=DEFAULT_TAIL_LINES, keep=None,
+                 max_kept=DEFAULT_MAX_KEPT):
+        self.head_lines = max(0, head_lines)
+        self.keep = keep
+        self.max_kept = max(0, max_kept)
+        self.head = []
+        self.kept = []
+        self.tail = deque(maxlen=max(0, tail_lines))
+        self.omitted = 0
+
+    def add(self, line):
+        if len(self.head) < self.head_lines:
+            self.head.append(line)
+            return
+        if not self.tail.maxlen:
+            self._drop(line)
+            return
+        if len(self.tail) == self.tail.maxlen:
+            self._drop(self.tail[0])
+        self.tail.append(line)
+
+    def _drop(self, line):
+        """line leaves the tail: keep it if it is a result line, else count it"""
+        if self.keep is not None and len(self.kept) < self.max_kept and self.keep.search(line):
+            self.kept.append(line)
+        else:
+            self.omitted += 1
+
+    def text(self):
+        lines = self.head + self.kept
+        if self.omitted:
+            lines.append(f"... {self.omitted} lines omitted ...")
+        lines.extend(self.tail)
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class CapturedProcess(subprocess.CompletedProcess):
+    """CompletedProcess whose stdout and stderr are bounded (see BoundedOutput)"""
+
+    def __init__(self, args, returncode, stdout, stderr, omitted=0):
+        super().__init__(args, returncode, stdout, stderr)
+        self.omitted = omitted
+
+
+def _read_lines(stream, output):
+    try:
+        for line in iter(partial(stream.readline, MAX_LINE_LENGTH), ""):
+            output.add(line.rstrip("\r\n"))
+    except (OSError, ValueError):
+        pass  # pipe closed after the process was killed
+    finally:
+        stream.close()
+
+
+def run_captured(cmd, timeout=None, keep=None, head_lines=DEFAULT_HEAD_LINES, tail_lines=DEFAULT_TAIL_LINES,
+                 max_kept=DEFAULT_MAX_KEPT):
+    """Run cmd like subprocess.run(cmd, capture_output=True, text=True)
+
+    Args:
+        cmd: Command list
+        timeout: Seconds after which the process is killed
+        keep: Compiled pattern of lines that are kept from the middle of
+            the output
+        head_lines, tail_lines: Lines kept from the start and the end
+        max_kept: Upper bound of the kept middle lines per stream
+
+    Returns:
+        CapturedProcess
+
+    Raises:
+        subprocess.TimeoutExpired: If the process was killed after timeout
+            (with the output captured so far)
+    """
+    outputs = [BoundedOutput(head_lines, tail_lines, keep, max_kept) for _ in range(2)]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                               text=True, errors="replace")
+    # One reader per pipe: a process blocked on a full stderr pipe would never finish stdout
+    readers = [threading.Thread(target=_read_lines, args=(stream, output), name="certum-capture", daemon=True)
+               for stream, output in zip((process.stdout, process.stderr), outputs)]
+    for reader in readers:
+        reader.start()
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        for reader in readers:
+            reader.join()
+        raise subprocess.TimeoutExpired(cmd, timeout, output=outputs[0].text(), stderr=outputs[1].text()) from None
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    for reader in readers:
+        reader.join()
+    return CapturedProcess(cmd, returncode, outputs[0].text(), outputs[1].text(),
+                           omitted=outputs[0].omitted + outputs[1].omitted)
@@ -0,0 +1,393 @@
+"""
+In-process Authenticode inspection of PE files
+
+Reads the security directory (IMAGE_DIRECTORY_ENTRY_SECURITY) of a PE/COFF
+image through mmap, enumerates the embedded WIN_CERTIFICATE entries and pulls
+the signer, digest algorithm and timestamp presence out of the PKCS#7
+SignedData blob. The Authenticode image digest is recomputed so a signature
+that no longer matches the file content (stale) can be detected.
+
+This is a cheap "is it signed?" check. It does not validate the certificate
+chain or the signature itself - that still needs signtool verify.
+"""
+
+import hashlib
+import mmap
+import struct
+
+
+IMAGE_DIRECTORY_ENTRY_SECURITY = 4
+WIN_CERT_TYPE_PKCS_SIGNED_DATA = 0x0002
+
+PE32_MAGIC = 0x10b
+PE32_PLUS_MAGIC = 0x20b
+
+# Signature states returned by check_signature()
+STATUS_NOT_PE = "not-pe"
+STATUS_UNSIGNED = "unsigned"
+STATUS_SIGNED = "signed"
+STATUS_STALE = "stale"
+STATUS_INVALID = "invalid"
+
+OID_SIGNED_DATA = "1.2.840.113549.1.7.2"
+OID_SPC_INDIRECT_DATA = "1.3.6.1.4.1.311.2.1.4"
+OID_COUNTER_SIGNATURE = "1.2.840.113549.1.9.6"
+OID_RFC3161_TIMESTAMP = "1.3.6.1.4.1.311.3.3.1"
+OID_NESTED_SIGNATURE = "1.3.6.1.4.1.311.2.4.1"
+OID_COMMON_NAME = "2.5.4.3"
+
+DIGEST_ALGORITHMS = {
+    "1.2.840.113549.2.5": "md5",
+    "1.3.14.3.2.26": "sha1",
+    "2.16.840.1.101.3.4.2.1": "sha256",
+    "2.16.840.1.101.3.4.2.2": "sha384",
+    "2.16.840.1.101.3.4.2.3": "sha512",
+}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class PEFormatError(ValueError):
+    """Raised when a PE image or its signature data is malformed"""
+
+
+class NotPEError(PEFormatError):
+    """Raised when a file is not a PE image at all (e.g. MSI or CAB)"""
+
+
+class SignatureInfo:
+    """One Authenticode signature found in a PE file"""
+
+    def __init__(self, signer, digest_algorithm, signed_digest, has_timestamp, nested=False):
+        self.signer = signer
+        self.digest_algorithm = digest_algorithm
+        self.signed_digest = signed_digest
+        self.has_timestamp = has_timestamp
+        self.nested = nested
+
+    def describe(self):
+        timestamp = "timestamped" if self.has_timestamp else "no timestamp"
+        return f"{self.signer or 'unknown signer'} ({self.digest_algorithm or 'unknown digest'}, {timestamp})"
+
+
+class PESignatureInfo:
+    """Result of reading the security directory of a PE file
+
+    Attributes:
+        signatures: SignatureInfo for every signature, nested ones included
+        image_digest: Authenticode digest of the current file content, computed
+            with the algorithm of the primary signature (None if unsigned)
+        certificate_count: Number of WIN_CERTIFICATE entries
+    """
+
+    def __init__(self, signatures, image_digest, certificate_count):
+        self.signatures = signatures
+        self.image_digest = image_digest
+        self.certificate_count = certificate_count
+
+    @property
+    def is_signed(self):
+        return bool(self.signatures)
+
+    @property
+    def primary(self):
+        return self.signatures[0] if self.signatures else None
+
+    @property
+    def is_stale(self):
+        """True if the primary signature does not cover the current content"""
+        primary = self.primary
+        if primary is None or primary.signed_digest is None or self.image_digest is None:
+            return False
+        return primary.signed_digest != self.image_digest
+
+    @property
+    def status(self):
+        if not self.is_signed:
+            return STATUS_UNSIGNED
+        return STATUS_STALE if self.is_stale else STATUS_SIGNED
+
+    def describe(self):
+        if not self.is_signed:
+            return "no Authenticode signature"
+        text = f"signed by {self.primary.describe()}"
+        if len(self.signatures) > 1:
+            text += f" + {len(self.signatures) - 1} nested signature(s)"
+        if self.is_stale:
+            text += " - STALE: digest does not match file content"
+        return text
+
+
+class _PEHeaders:
+    """Offsets of the PE header fields that Authenticode cares about"""
+
+    def __init__(self, data):
+        if len(data) < 0x40 or data[:2] != b"MZ":
+            raise NotPEError("missing MZ header")
+        pe_offset = struct.unpack_from("<I", data, 0x3C)[0]
+        if pe_offset + 24 > len(data) or data[pe_offset:pe_offset + 4] != b"PE\0\0":
+            raise NotPEError("missing PE signature")
+
+        optional_header = pe_offset + 24
+        size_of_optional_header = struct.unpack_from("<H", data, pe_offset + 20)[0]
+        if optional_header + 2 > len(data):
+            raise PEFormatError("truncated optional header")
+        magic = struct.unpack_from("<H", data, optional_header)[0]
+        if magic == PE32_MAGIC:
+            rva_count_offset = optional_header + 92
+        elif magic == PE32_PLUS_MAGIC:
+            rva_count_offset = optional_header + 108
+        else:
+            raise PEFormatError(f"unknown optional header magic 0x{magic:x}")
+        data_directories = rva_count_offset + 4
+        if data_directories > optional_header + size_of_optional_header or data_directories > len(data):
+            raise PEFormatError("truncated optional header")
+
+        self.checksum_offset = optional_header + 64
+        rva_count = struct.unpack_from("<I", data, rva_count_offset)[0]
+        if rva_count <= IMAGE_DIRECTORY_ENTRY_SECURITY:
+            raise PEFormatError("no security directory entry")
+        self.security_dir_offset = data_directories + IMAGE_DIRECTORY_ENTRY_SECURITY * 8
+        if self.security_dir_offset + 8 > len(data):
+            raise PEFormatError("truncated data directories")
+        # For the security directory "VirtualAddress" is a plain file offset
+        self.cert_table_offset, self.cert_table_size = struct.unpack_from("<II", data, self.security_dir_offset)
+        if self.cert_table_size and self.cert_table_offset + self.cert_table_size > len(data):
+            raise PEFormatError("certificate table points beyond end of file")
+
+
+def _read_certificates(data, offset, size):
+    """Yield (revision, type, blob) for each WIN_CERTIFICATE entry"""
+    end = offset + size
+    while offset + 8 <= end:
+        length, revision, cert_type = struct.unpack_from("<IHH", data, offset)
+        if length < 8 or offset + length > end:
+            raise PEFormatError("malformed WIN_CERTIFICATE entry")
+        yield revision, cert_type, bytes(data[offset + 8:offset + length])
+        offset += (length + 7) & ~7  # entries are 8-byte aligned
+
+
+def authenticode_digest(data, headers, algorithm):
+    """Compute the Authenticode image digest
+
+    Hashes the whole file except the checksum field, the security directory
+    entry and the certificate table. For regular images (sections laid out
+    contiguously after the headers) this equals the section-by-section
+    digest of the Authenticode specification.
+    """
+    digest = hashlib.new(algorithm)
+    cert_start = headers.cert_table_offset if headers.cert_table_size else len(data)
+    ranges = [
+        (0, headers.checksum_offset),
+        (headers.checksum_offset + 4, headers.security_dir_offset),
+        (headers.security_dir_offset + 8, cert_start),
+    ]
+    if headers.cert_table_size:
+        ranges.append((cert_start + headers.cert_table_size, len(data)))
+    for start, end in ranges:
+        for chunk_start in range(start, end, HASH_CHUNK_SIZE):
+            digest.update(data[chunk_start:min(end, chunk_start + HASH_CHUNK_SIZE)])
+    return digest.digest()
+
+
+# --- Minimal DER reader -----------------------------------------------------
+# der_item() and der_children() are public: timestamp_pool parses TSA
+# responses with them. Malformed data raises PEFormatError.
+
+def der_item(data, offset):
+    """Read one DER TLV at offset
+
+    Returns:
+        tuple: (tag, content_start, content_end)
+
+    Raises:
+        PEFormatError: If the item is truncated or its length unsupported
+    """
+    if offset + 2 > len(data):
+        raise PEFormatError("truncated DER data")
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        count = length & 0x7F
+        if count == 0 or count > 4 or offset + count > len(data):
+            raise PEFormatError("unsupported DER length")
+        length = int.from_bytes(bytes(data[offset:offset + count]), "big")
+        offset += count
+    if offset + length > len(data):
+        raise PEFormatError("truncated DER data")
+    return tag, offset, offset + length
+
+
+def der_children(data, start, end):
+    """List (tag, content_start, content_end) of the items in a constructed value"""
+    children = []
+    while start < end:
+        tag, content_start, content_end = der_item(data, start)
+        children.append((tag, content_start, content_end))
+        start = content_end
+    return children
+
+
+def _der_oid(data, start, end):
+    value = bytes(data[start:end])
+    if not value:
+        raise PEFormatError("empty OID")
+    parts = [value[0] // 40, value[0] % 40]
+    number = 0
+    for byte in value[1:]:
+        number = (number << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            parts.append(number)
+            number = 0
+    return ".".join(str(part) for part in parts)
+
+
+def _algorithm_name(data, algorithm_identifier):
+    tag, start, end = algorithm_identifier
+    oid_tag, oid_start, oid_end = der_children(data, start, end)[0]
+    oid = _der_oid(data, oid_start, oid_end)
+    return DIGEST_ALGORITHMS.get(oid, oid)
+
+
+def _common_name(data, name):
+    """Extract the CN from an X.501 Name"""
+    tag, start, end = name
+    for rdn_tag, rdn_start, rdn_end in der_children(data, start, end):
+        for attr_tag, attr_start, attr_end in der_children(data, rdn_start, rdn_end):
+            attr = der_children(data, attr_start, attr_end)
+            if len(attr) == 2 and _der_oid(data, attr[0][1], attr[0][2]) == OID_COMMON_NAME:
+                return bytes(data[attr[1][1]:attr[1][2]]).decode("utf-8", errors="replace")
+    return None
+
+
+def _parse_signed_data(data, nested=False):
+    """Parse a PKCS#7 ContentInfo holding Authenticode SignedData
+
+    Returns:
+        list: SignatureInfo for the signature and any nested signatures
+    """
+    tag, start, end = der_item(data, 0)
+    content_info = der_children(data, start, end)
+    if len(content_info) < 2 or _der_oid(data, content_info[0][1], content_info[0][2]) != OID_SIGNED_DATA:
+        raise PEFormatError("certificate is not PKCS#7 SignedData")
+    explicit_tag, explicit_start, explicit_end = content_info[1]
+    tag, start, end = der_item(data, explicit_start)
+    signed_data = der_children(data, start, end)
+    if len(signed_data) < 4:
+        raise PEFormatError("malformed SignedData")
+
+    # encapContentInfo: SpcIndirectDataContent with the signed image digest
+    digest_algorithm = None
+    signed_digest = None
+    encap = der_children(data, signed_data[2][1], signed_data[2][2])
+    if encap and _der_oid(data, encap[0][1], encap[0][2]) == OID_SPC_INDIRECT_DATA and len(encap) > 1:
+        tag, start, end = der_item(data, encap[1][1])
+        indirect = der_children(data, start, end)
+        if len(indirect) >= 2:
+            digest_info = der_children(data, indirect[1][1], indirect[1][2])
+            digest_algorithm = _algorithm_name(data, digest_info[0])
+            signed_digest = bytes(data[digest_info[1][1]:digest_info[1][2]])
+
+    # certificates [0] IMPLICIT, keyed by serial number to find the signer
+    certificates = {}
+    for tag, start, end in signed_data[3:-1]:
+        if tag != 0xA0:
+            continue
+        for cert_tag, cert_start, cert_end in der_children(data, start, end):
+            tbs = der_children(data, cert_start, cert_end)[0]
+            fields = der_children(data, tbs[1], tbs[2])
+            if fields and fields[0][0] == 0xA0:
+                fields = fields[1:]  # explicit version
+            if len(fields) >= 5:
+                serial = bytes(data[fields[0][1]:fields[0][2]])
+                certificates[serial] = _common_name(data, fields[4])
+
+    signatures = []
+    tag, start, end = signed_data[-1]
+    for info_tag, info_start, info_end in der_children(data, start, end):
+        signer_info = der_children(data, info_start, info_end)
+        if len(signer_info) < 2:
+            raise PEFormatError("malformed SignerInfo")
+        issuer_and_serial = der_children(data, signer_info[1][1], signer_info[1][2])
+        serial = bytes(data[issuer_and_serial[-1][1]:issuer_and_serial[-1][2]])
+
+        has_timestamp = False
+        nested_blobs = []
+        if signer_info[-1][0] == 0xA1:  # unauthenticatedAttributes [1]
+            for attr_tag, attr_start, attr_end in der_children(data, signer_info[-1][1], signer_info[-1][2]):
+                attr = der_children(data, attr_start, attr_end)
+                oid = _der_oid(data, attr[0][1], attr[0][2])
+                if oid in (OID_COUNTER_SIGNATURE, OID_RFC3161_TIMESTAMP):
+                    has_timestamp = True
+                elif oid == OID_NESTED_SIGNATURE and len(attr) > 1:
+                    position = attr[1][1]
+                    while position < attr[1][2]:
+                        value_tag, value_start, value_end = der_item(data, position)
+                        nested_blobs.append(data[position:value_end])
+                        position = value_end
+
+        signatures.append(SignatureInfo(
+            certificates.get(serial), digest_algorithm, signed_digest, has_timestamp, nested=nested))
+        for blob in nested_blobs:
+            signatures.extend(_parse_signed_data(blob, nested=True))
+    return signatures
+
+
+# --- Public API ---------------------------------------------------------------
+
+def read_signature_info(file_path):
+    """Read the Authenticode signatures embedded in a PE file
+
+    Raises:
+        PEFormatError: If the file is not a PE image or is malformed
+        OSError: If the file cannot be read
+    """
+    with open(file_path, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise NotPEError("empty file")
+        with data:
+            return _read_signature_info(memoryview(data))
+
+
+def _read_signature_info(data):
+    try:
+        headers = _PEHeaders(data)
+        signatures = []
+        count = 0
+        if headers.cert_table_size:
+            certificates = _read_certificates(data, headers.cert_table_offset, headers.cert_table_size)
+            for revision, cert_type, blob in certificates:
+                count += 1
+                if cert_type == WIN_CERT_TYPE_PKCS_SIGNED_DATA:
+                    signatures.extend(_parse_signed_data(blob))
+
+        image_digest = None
+        if signatures and signatures[0].digest_algorithm in DIGEST_ALGORITHMS.values():
+            image_digest = authenticode_digest(data, headers, signatures[0].digest_algorithm)
+        return PESignatureInfo(signatures, image_digest, count)
+    except (IndexError, struct.error) as e:
+        raise PEFormatError(f"malformed PE/PKCS#7 data: {e}")
+    finally:
+        data.release()
+
+
+def check_signature(file_path):
+    """Classify the embedded signature of a file
+
+    Returns:
+        tuple: (status, info) where status is one of STATUS_* and info is the
+            PESignatureInfo (None for non-PE or malformed files)
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    try:
+        info = read_signature_info(file_path)
+    except NotPEError:
+        return STATUS_NOT_PE, None
+    except PEFormatError:
+        return STATUS_INVALID, None
+    return info.status, info
@@ -0,0 +1,188 @@
+"""
+Two-stage sign/verify pipeline
+
+Signing waits on the network (SimplySign, timestamp server) while verification
+is mostly local work. The two stages therefore run in separate, separately
+sized worker pools joined by a bounded queue: signers hand signed files to the
+verifiers and block when the queue is full, so verification can never fall
+arbitrarily far behind.
+
+An optional observe(stage, seconds, items) callable is told how long each
+batch waited for a sign worker ("sign_queue_wait") and each signed item for
+a verify worker ("verify_queue_wait").
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_VERIFY_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 32
+
+_STOP = object()
+
+
+class PipelineError(RuntimeError):
+    """sign_func or verify_func raised for some of the work
+
+    Attributes:
+        results: Results of the work that was completed nonetheless
+        errors: Every exception raised by the stages, in arrival order
+    """
+
+    def __init__(self, results, errors):
+        more = f" (and {len(errors) - 1} more errors)" if len(errors) > 1 else ""
+        super().__init__(f"{errors[0]}{more}")
+        self.results = results
+        self.errors = errors
+
+
+class StageStats:
+    """Busy/idle accounting for one pipeline stage
+
+    busy is the time workers spent doing work, waiting the time they were
+    blocked on the queue (signers: queue full, verifiers: queue empty).
+    idle is everything that was not busy, over the stage's wall-clock time.
+    """
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+        self.wall = 0.0
+        self._lock = threading.Lock()
+
+    def add_busy(self, seconds, items=1):
+        with self._lock:
+            self.busy += seconds
+            self.items += items
+
+    def add_waiting(self, seconds):
+        with self._lock:
+            self.waiting += seconds
+
+    @property
+    def idle(self):
+        return max(0.0, self.workers * self.wall - self.busy)
+
+    @property
+    def utilization(self):
+        capacity = self.workers * self.wall
+        return self.busy / capacity if capacity else 0.0
+
+    def summary(self, waiting_label="waiting"):
+        return (f"{self.name} stage: {self.workers} workers, {self.items} items, "
+                f"busy {self.busy:.1f}s, idle {self.idle:.1f}s "
+                f"({self.utilization:.0%} utilization, {waiting_label} {self.waiting:.1f}s)")
+
+
+class SignVerifyPipeline:
+    """Runs sign jobs and verify jobs in two pools joined by a bounded queue
+
+    Args:
+        sign_func: Called with one batch of files in a sign worker. Returns
+            (to_verify, results): items to pass to verify_func, and final
+            results for files that need no verification (e.g. failed ones).
+        verify_func: Called with one item in a verify worker, returns a result.
+        sign_workers: Size of the sign pool
+        verify_workers: Size of the verify pool
+        queue_size: Maximum number of signed items waiting for verification
+        observe: Optional callable(stage, seconds, items) for queue wait times
+    """
+
+    def __init__(self, sign_func, verify_func, sign_workers, verify_workers=DEFAULT_VERIFY_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, observe=None):
+        self.sign_func = sign_func
+        self.observe = observe
+        self.verify_func = verify_func
+        self.sign_stats = StageStats("Sign", max(1, sign_workers))
+        self.verify_stats = StageStats("Verify", max(1, verify_workers))
+        self.queue_size = max(1, queue_size)
+        self._results = []
+        self._results_lock = threading.Lock()
+        self._errors = []
+
+    def run(self, batches):
+        """Process all batches and return the list of results
+
+        Raises:
+            PipelineError: After both stages have shut down, if sign_func or
+                verify_func raised; it carries the results of everything
+                that was completed, so only the rest has to be given up
+        """
+        work_queue = queue.Queue(maxsize=self.queue_size)
+        start = time.perf_counter()
+
+        verifiers = [
+            threading.Thread(target=self._verify_worker, args=(work_queue,),
+                             name=f"certum-verify-{i}", daemon=True)
+            for i in range(self.verify_stats.workers)
+        ]
+        for thread in verifiers:
+            thread.start()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.sign_stats.workers, thread_name_prefix="certum-sign") as pool:
+                futures = [pool.submit(self._sign_worker, batch, work_queue, time.perf_counter())
+                           for batch in batches]
+                for future in futures:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self._errors.append(e)
+        finally:
+            self.sign_stats.wall = time.perf_counter() - start
+            for _ in verifiers:
+                work_queue.put(_STOP)
+            for thread in verifiers:
+                thread.join()
+            self.verify_stats.wall = time.perf_counter() - start
+
+        if self._errors:
+            raise PipelineError(list(self._results), list(self._errors)) from self._errors[0]
+        return self._results
+
+    def _sign_worker(self, batch, work_queue, submitted):
+        started = time.perf_counter()
+        if self.observe is not None:
+            self.observe("sign_queue_wait", started - submitted, batch)
+        to_verify, results = self.sign_func(batch)
+        self.sign_stats.add_busy(time.perf_counter() - started, items=len(batch))
+        with self._results_lock:
+            self._results.extend(results)
+        for item in to_verify:
+            started = time.perf_counter()
+            work_queue.put((item, time.perf_counter()))  # blocks while the verifiers are behind
+            self.sign_stats.add_waiting(time.perf_counter() - started)
+
+    def _verify_worker(self, work_queue):
+        while True:
+            started = time.perf_counter()
+            item = work_queue.get()
+            self.verify_stats.add_waiting(time.perf_counter() - started)
+            if item is _STOP:
+                return
+            item, queued = item
+            started = time.perf_counter()
+            if self.observe is not None:
+                self.observe("verify_queue_wait", started - queued, [item])
+            try:
+                result = self.verify_func(item)
+            except Exception as e:
+                self._errors.append(e)
+                continue
+            finally:
+                self.verify_stats.add_busy(time.perf_counter() - started)
+            with self._results_lock:
+                self._results.append(result)
+
+    def summary_lines(self):
+        """Stage statistics for the end-of-run summary"""
+        return [
+            self.sign_stats.summary(waiting_label="blocked by full verify queue"),
+            self.verify_stats.summary(waiting_label="waiting for signed files"),
+        ]
@@ -0,0 +1,97 @@
+"""
+Pre-flight checks before signing
+
+A file that cannot be signed (missing, empty, read-only, locked, or not
+what its extension claims) otherwise only fails after a signtool call -
+sometimes only after the call timed out, and always after it used up a
+slot of SimplySign's capacity. check_files() looks at every file in
+parallel before signing starts, with local I/O only:
+
+- the file exists and is not empty
+- it is not read-only
+- its header matches its extension (MZ for EXE/DLL/OCX/SYS, the OLE
+  compound file signature for MSI, MSCF for CAB, PK for ZIP packages)
+- no other process holds it open exclusively
+
+resolve_tool() checks once per run that the signing tool can be started.
+"""
+
+import os
+import shutil
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_PREFLIGHT_WORKERS = 16
+
+_PE_MAGIC = b"MZ"
+_OLE_MAGIC = bytes.fromhex("D0CF11E0A1B11AE1")
+_CAB_MAGIC = b"MSCF"
+_ZIP_MAGIC = b"PK\x03\x04"
+FILE_MAGICS = {
+    ".exe": _PE_MAGIC,
+    ".dll": _PE_MAGIC,
+    ".ocx": _PE_MAGIC,
+    ".sys": _PE_MAGIC,
+    ".msi": _OLE_MAGIC,
+    ".cab": _CAB_MAGIC,
+    ".zip": _ZIP_MAGIC,
+    ".nupkg": _ZIP_MAGIC,
+    ".vsix": _ZIP_MAGIC,
+}
+_FORMAT_NAMES = {_PE_MAGIC: "PE", _OLE_MAGIC: "MSI", _CAB_MAGIC: "CAB", _ZIP_MAGIC: "ZIP"}
+
+
+def check_file(file_path):
+    """Check one file
+
+    Returns:
+        str: Description of the problem, or None if the file can be signed
+    """
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return "file not found"
+    except OSError as e:
+        return f"cannot access file: {e.strerror or e}"
+    if not stat.S_ISREG(st.st_mode):
+        return "not a regular file"
+    if st.st_size == 0:
+        return "file is empty"
+    if not st.st_mode & stat.S_IWRITE:
+        return "file is read-only"
+
+    magic = FILE_MAGICS.get(os.path.splitext(file_path)[1].lower())
+    try:
+        with open(file_path, 'r+b') as f:
+            header = f.read(len(magic) if magic else 0)
+    except PermissionError:
+        return "file is locked by another process or not writable"
+    except OSError as e:
+        return f"cannot open file: {e.strerror or e}"
+    if magic and header != magic:
+        return f"not a valid {_FORMAT_NAMES[magic]} file (unexpected header)"
+    return None
+
+
+def check_files(files, workers=DEFAULT_PREFLIGHT_WORKERS):
+    """Check files in parallel
+
+    Returns:
+        dict: {file_path: problem} for the files that cannot be signed
+    """
+    files = list(files)
+    if not files:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(files))),
+                            thread_name_prefix="certum-preflight") as pool:
+        return {file_path: problem for file_path, problem in zip(files, pool.map(check_file, files)) if problem}
+
+
+def resolve_tool(command):
+    """Return the full path of a tool command, or None if it cannot be found"""
+    if not command:
+        return None
+    if os.path.dirname(command):
+        return command if os.path.isfile(command) else None
+    return shutil.which(command)
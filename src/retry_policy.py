@@ -0,0 +1,187 @@
+"""
+Failure classification, retry backoff and adaptive timeouts
+
+A signtool call can fail for reasons that go away on their own (SimplySign
+session dropped, timestamp server or network hiccup, rate limit hit, call
+timed out) or for reasons that will fail again every time (file locked by
+another process, not a signable file, no matching certificate). classify_failure() tells them
+apart from signtool's exit code and output. Transient failures are retried
+after a jittered exponential backoff (RetryPolicy); permanent ones fail
+right away.
+
+Fixed timeouts are either too short for big MSI files or far too long for
+small DLLs. AdaptiveTimeout derives them from the latencies observed so far:
+
+    timeout = multiplier * p95(seconds per file) * files
+              + size / p5(bytes per second)
+
+clamped to [minimum, maximum]. Until min_samples calls were observed, the
+configured default is used.
+"""
+
+import random
+import re
+import threading
+from collections import deque
+
+
+FAILURE_TRANSIENT = "transient"
+FAILURE_PERMANENT = "permanent"
+
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_RETRY_BASE_DELAY = 2.0
+DEFAULT_RETRY_MAX_DELAY = 60.0
+
+# Checked in order; the first match decides. Permanent causes come first, so
+# e.g. a locked file is not retried just because a timestamp line follows.
+_FAILURE_PATTERNS = [
+    (FAILURE_PERMANENT, "file locked", re.compile(
+        r"being used by another process|0x80070020|sharing violation", re.IGNORECASE)),
+    (FAILURE_PERMANENT, "file format not signable", re.compile(
+        r"file format cannot be signed|not recognized|0x800700C1|not a valid Win32 application", re.IGNORECASE)),
+    (FAILURE_PERMANENT, "no signing certificate", re.compile(
+        r"No certificates were found that met all the given criteria|certificate.*(not found|expired)",
+        re.IGNORECASE)),
+    (FAILURE_PERMANENT, "file not found", re.compile(
+        r"File not found|cannot find the file|0x80070002", re.IGNORECASE)),
+    (FAILURE_PERMANENT, "access denied", re.compile(r"Access is denied|0x80070005", re.IGNORECASE)),
+    (FAILURE_TRANSIENT, "timestamp server", re.compile(r"timestamp (server|signature)", re.IGNORECASE)),
+    (FAILURE_TRANSIENT, "rate limited", re.compile(
+        r"too many requests|\b429\b|rate.?limit|throttl|quota exceeded", re.IGNORECASE)),
+    (FAILURE_TRANSIENT, "SimplySign session", re.compile(
+        r"smart card|0x8010001F|0x80100066|0x8010006E|SimplySign|key ?set does not exist|0x80090016",
+        re.IGNORECASE)),
+    (FAILURE_TRANSIENT, "network", re.compile(
+        r"could not be reached|network|RPC server is unavailable|0x800706BA|0x80072EE2|"
+        r"connection (was )?(reset|refused|closed)|timed? ?out", re.IGNORECASE)),
+]
+
+
+def classify_failure(returncode, output, timed_out=False):
+    """Decide whether a failed signtool call is worth retrying
+
+    Args:
+        returncode: Exit code of the call (None if it did not finish)
+        output: Combined stdout and stderr
+        timed_out: The call was killed after its timeout
+
+    Returns:
+        tuple: (FAILURE_TRANSIENT or FAILURE_PERMANENT, reason)
+    """
+    if timed_out:
+        return FAILURE_TRANSIENT, "timeout"
+    for kind, reason, pattern in _FAILURE_PATTERNS:
+        if pattern.search(output or ""):
+            return kind, reason
+    # Unknown errors are not retried: repeating a broken call only costs time
+    return FAILURE_PERMANENT, f"signtool exit code {returncode}"
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter for transient failures
+
+    Args:
+        max_attempts: Total number of attempts, including the first one
+        base_delay: Delay before the first retry, in seconds
+        max_delay: Upper bound of the delay
+        rng: Random source returning floats in [0, 1) (random.random)
+    """
+
+    def __init__(self, max_attempts=DEFAULT_RETRY_ATTEMPTS, base_delay=DEFAULT_RETRY_BASE_DELAY,
+                 max_delay=DEFAULT_RETRY_MAX_DELAY, rng=random.random):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max(self.base_delay, max_delay)
+        self.rng = rng
+
+    def should_retry(self, attempt, kind):
+        """Check whether attempt (1 = first call) may be followed by another one"""
+        return kind == FAILURE_TRANSIENT and attempt < self.max_attempts
+
+    def delay(self, attempt):
+        """Seconds to wait after the given failed attempt
+
+        The exponential delay is spread over its upper half, so workers that
+        failed together (e.g. on a dropped SimplySign session) do not all
+        retry at the same moment.
+        """
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * (0.5 + 0.5 * self.rng())
+
+
+class AttemptBudget:
+    """signtool calls left for one file
+
+    Retries and timestamp server failovers draw from the same budget, so a
+    file costs at most max_attempts calls (each bounded by its timeout)
+    rather than max_attempts times the number of servers.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_RETRY_ATTEMPTS):
+        self.max_attempts = max(1, max_attempts)
+        self.used = 0
+
+    @property
+    def left(self):
+        return max(0, self.max_attempts - self.used)
+
+    def take(self):
+        """Count one call"""
+        self.used += 1
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class AdaptiveTimeout:
+    """Timeouts derived from observed call durations
+
+    Args:
+        default: Timeout per file while too few calls were observed
+        minimum: Lower bound of a derived timeout
+        maximum: Upper bound of any timeout
+        multiplier: Headroom over the p95 latency
+        window: Number of recent calls taken into account
+        min_samples: Observed calls needed before timeouts are derived
+    """
+
+    def __init__(self, default, minimum, maximum, multiplier=3.0, window=200, min_samples=5):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.min_samples = max(1, min_samples)
+        self._per_file = deque(maxlen=window)
+        self._throughput = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, duration, files=1, size=0):
+        """Record a successful call that took duration seconds"""
+        if duration <= 0:
+            return
+        with self._lock:
+            self._per_file.append(duration / max(1, files))
+            if size:
+                self._throughput.append(size / duration)
+
+    def timeout(self, files=1, size=0):
+        """Return the timeout in seconds for a call over files files of size bytes"""
+        with self._lock:
+            if len(self._per_file) < self.min_samples:
+                return min(self.maximum, self.default * max(1, files))
+            latency = _percentile(self._per_file, 95)
+            throughput = _percentile(self._throughput, 5) if self._throughput else None
+        timeout = self.multiplier * latency * max(1, files)
+        if size and throughput:
+            timeout += size / throughput
+        return max(self.minimum, min(self.maximum, timeout))
+
+    def describe(self):
+        with self._lock:
+            samples = len(self._per_file)
+            if samples < self.min_samples:
+                return f"default {self.default:.0f}s per file ({samples} samples)"
+            return f"p95 {_percentile(self._per_file, 95):.2f}s per file ({samples} samples)"
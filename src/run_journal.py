@@ -0,0 +1,169 @@
+"""
+Append-only journal of a signing run
+
+Every run writes a JSONL file to certum_signer_runs/ next to the settings
+file. The first record lists the queued files, then each state transition of
+a file (signing, signed, verified, failed, skipped) is appended with its
+time, and a final record marks the run as complete. Every write is flushed
+and fsync'd, so after a crash the journal shows exactly how far the run got.
+
+A journal without the final record belongs to an interrupted run;
+load_journal() replays it (ignoring a line cut off by the crash) and
+RunState.unfinished() lists the files that still need work.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+JOURNAL_DIR_NAME = "certum_signer_runs"
+DEFAULT_JOURNAL_KEEP = 20
+
+STATE_QUEUED = "queued"
+# Files in these states need no more work when a run is resumed
+DONE_STATES = ("verified", "skipped")
+
+
+class RunJournal:
+    """Writer for one run's journal file
+
+    Args:
+        path: Journal file; appended to if it exists (resumed runs)
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    @classmethod
+    def create(cls, directory):
+        """Start a new journal file in directory"""
+        os.makedirs(directory, exist_ok=True)
+        name = f"run-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl"
+        return cls(os.path.join(directory, name))
+
+    def _write(self, records):
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(lines)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def start(self, files, **info):
+        """Record the start of a run (or of a resumed part) with its queued files"""
+        self._write([dict(info, event="start", time=time.time(), files=list(files))])
+
+    def record(self, file_paths, state):
+        """Record that files moved to state; one fsync for all of them"""
+        now = time.time()
+        self._write([{"event": "state", "time": now, "file": file_path, "state": state}
+                     for file_path in file_paths])
+
+    def finish(self, **summary):
+        """Mark the run as complete"""
+        self._write([dict(summary, event="end", time=time.time())])
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RunState:
+    """Replayed state of a journal
+
+    Attributes:
+        files: Queued files in order
+        states: {file: last recorded state}
+        started: {file: time the file's first "signing" was recorded}
+        finished: {file: time its last state was recorded}
+        complete: True if the run was finished
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.files = []
+        self.states = {}
+        self.started = {}
+        self.finished = {}
+        self.complete = False
+
+    def unfinished(self, retry_failed=False):
+        """Files that are neither verified nor skipped (nor failed, unless retry_failed)"""
+        done = DONE_STATES if retry_failed else DONE_STATES + ("failed",)
+        return [file_path for file_path in self.files if self.states.get(file_path) not in done]
+
+    def durations(self):
+        """{file: seconds from the first "signing" to its last state}"""
+        return {file_path: self.finished[file_path] - started
+                for file_path, started in self.started.items() if file_path in self.finished}
+
+
+def load_journal(path):
+    """Replay a journal file
+
+    Raises:
+        OSError: If the file cannot be read
+    """
+    state = RunState(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # line cut off by a crash
+            event = record.get("event")
+            if event == "start":
+                state.complete = False
+                for file_path in record.get("files", []):
+                    if file_path not in state.states:
+                        state.files.append(file_path)
+                        state.states[file_path] = STATE_QUEUED
+            elif event == "state":
+                file_path = record.get("file")
+                if file_path not in state.states:
+                    state.files.append(file_path)
+                state.states[file_path] = record.get("state")
+                if record.get("state") == "signing":
+                    state.started.setdefault(file_path, record.get("time", 0))
+                state.finished[file_path] = record.get("time", 0)
+            elif event == "end":
+                state.complete = True
+    return state
+
+
+def list_journals(directory):
+    """Journal files in directory, oldest first"""
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.startswith("run-") and name.endswith(".jsonl"))
+    except OSError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def find_interrupted_run(directory):
+    """Return the RunState of the newest journal if that run did not finish, else None"""
+    journals = list_journals(directory)
+    if not journals:
+        return None
+    try:
+        state = load_journal(journals[-1])
+    except OSError:
+        return None
+    return None if state.complete else state
+
+
+def prune_journals(directory, keep=DEFAULT_JOURNAL_KEEP):
+    """Delete all but the newest keep journals"""
+    for path in list_journals(directory)[:-keep or None]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,222 @@
+"""
+Timing metrics of a signing run
+
+RunMetrics collects spans - how long one step took for which files - per
+stage:
+
+- sign_queue_wait / verify_queue_wait: time a batch or signed file waited
+  for a free sign or verify worker
+- sign: one "signtool sign" call (signing and timestamping); timestamp and
+  digest_* for the steps of digest mode
+- verify: one "signtool verify" call
+- preflight, stage_in, write_back: the local preparation steps
+
+Each stage gets a histogram of its span durations plus the bytes processed,
+each file the total time it spent in every stage, and retries and failovers
+are counted. At the end of a run the metrics are written as a JSON report
+and/or as a Prometheus textfile (for node_exporter's textfile collector),
+both replaced atomically.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+METRIC_PREFIX = "certum_signer"
+
+
+class Histogram:
+    """Bucketed distribution of durations (Prometheus-style buckets)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if count and seen + count >= rank:
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+            lower = upper
+        return self.max
+
+    def to_dict(self):
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            cumulative.append([bound, total])
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "max": round(self.max, 6),
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "buckets": cumulative,
+        }
+
+
+class RunMetrics:
+    """Thread-safe collector of the spans and counters of one run"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started = clock()
+        self.finished = None
+        self.stages = defaultdict(Histogram)
+        self.stage_bytes = defaultdict(int)
+        self.files = defaultdict(lambda: defaultdict(float))
+        self.counters = defaultdict(int)
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, file_paths=(), size=0):
+        """Record one span of stage that took seconds for file_paths (size bytes)"""
+        seconds = max(0.0, seconds)
+        with self._lock:
+            self.stages[stage].observe(seconds)
+            self.stage_bytes[stage] += size
+            for file_path in file_paths:
+                self.files[file_path][stage] += seconds
+
+    def count(self, name, amount=1):
+        """Add to a counter, e.g. "sign_retries\""""
+        with self._lock:
+            self.counters[name] += amount
+
+    def finish(self, results):
+        """Close the run with its (file_path, status) results"""
+        with self._lock:
+            self.finished = self.clock()
+            statuses = defaultdict(int)
+            for file_path, status in results:
+                statuses[status] += 1
+            self.statuses = dict(statuses)
+
+    @property
+    def duration(self):
+        return (self.finished if self.finished is not None else self.clock()) - self.started
+
+    def summary_lines(self):
+        """One line per stage for the end-of-run log"""
+        lines = []
+        with self._lock:
+            for stage, histogram in sorted(self.stages.items()):
+                line = (f"{stage}: {histogram.count} spans, total {histogram.sum:.1f}s, "
+                        f"p50 {histogram.quantile(0.5):.2f}s, p95 {histogram.quantile(0.95):.2f}s, "
+                        f"max {histogram.max:.2f}s")
+                if self.stage_bytes[stage] and histogram.sum:
+                    line += f", {self.stage_bytes[stage] / histogram.sum / 1e6:.1f} MB/s"
+                lines.append(line)
+        return lines
+
+    def to_dict(self):
+        """The JSON run report"""
+        duration = self.duration
+        with self._lock:
+            done = self.statuses.get("verified", 0)
+            signed_bytes = self.stage_bytes.get("sign", 0) + self.stage_bytes.get("digest_sign", 0)
+            return {
+                "started": self.started,
+                "duration_seconds": round(duration, 3),
+                "statuses": dict(self.statuses),
+                "counters": dict(self.counters),
+                "throughput": {
+                    "files_per_second": round(done / duration, 3) if duration else 0.0,
+                    "bytes_per_second": round(signed_bytes / duration, 1) if duration else 0.0,
+                },
+                "stages": {
+                    stage: dict(histogram.to_dict(), bytes=self.stage_bytes[stage])
+                    for stage, histogram in sorted(self.stages.items())
+                },
+                "files": {
+                    file_path: {stage: round(seconds, 6) for stage, seconds in sorted(stages.items())}
+                    for file_path, stages in sorted(self.files.items())
+                },
+            }
+
+    def prometheus_text(self, prefix=METRIC_PREFIX):
+        """The metrics in the Prometheus text exposition format"""
+        report = self.to_dict()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of the spans of each signing stage",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for stage, data in report["stages"].items():
+            for bound, count in data["buckets"]:
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {data["sum"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {data["count"]}')
+        lines += [
+            f"# HELP {prefix}_stage_bytes Bytes processed by each stage in the last run",
+            f"# TYPE {prefix}_stage_bytes gauge",
+        ]
+        lines += [f'{prefix}_stage_bytes{{stage="{stage}"}} {data["bytes"]}'
+                  for stage, data in report["stages"].items()]
+        lines += [
+            f"# HELP {prefix}_files Files of the last run by final status",
+            f"# TYPE {prefix}_files gauge",
+        ]
+        lines += [f'{prefix}_files{{status="{status}"}} {count}'
+                  for status, count in sorted(report["statuses"].items())]
+        lines += [
+            f"# HELP {prefix}_events Retries and failovers in the last run",
+            f"# TYPE {prefix}_events gauge",
+        ]
+        lines += [f'{prefix}_events{{event="{name}"}} {count}'
+                  for name, count in sorted(report["counters"].items())]
+        lines += [
+            f"# HELP {prefix}_run_duration_seconds Duration of the last run",
+            f"# TYPE {prefix}_run_duration_seconds gauge",
+            f"{prefix}_run_duration_seconds {report['duration_seconds']}",
+            f"# HELP {prefix}_files_per_second Verified files per second in the last run",
+            f"# TYPE {prefix}_files_per_second gauge",
+            f"{prefix}_files_per_second {report['throughput']['files_per_second']}",
+            f"# HELP {prefix}_last_run_timestamp_seconds End of the last run (Unix time)",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {round(self.finished or self.clock(), 3)}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        _write_atomic(path, json.dumps(self.to_dict(), indent=2) + "\n")
+
+    def write_prometheus(self, path):
+        _write_atomic(path, self.prometheus_text())
+
+
+def _write_atomic(path, text):
+    """Write a file via a temporary file, so readers never see half of it"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
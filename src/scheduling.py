@@ -0,0 +1,267 @@
+"""
+Size-aware ordering of the files to sign and admission control for sign calls
+
+The order in which files reach the sign workers decides how long a run
+takes: one big MSI picked up last keeps a single worker busy while all the
+others are idle. LatencyHistory learns how long a sign call takes per file
+type, as a linear model per extension
+
+    seconds = overhead + size * seconds_per_mib
+
+fitted by exponentially weighted least squares over earlier calls, and keeps
+it in a small JSON file next to the settings. order_files() sorts a run by
+that estimate: largest first for the shortest total run time (longest
+processing time first), smallest first for quick feedback.
+
+Certum's cloud signing limits the number of calls per minute and the number
+of concurrent sessions; calls over the quota are throttled and fail.
+RateLimiter admits sign calls through a token bucket (calls per minute,
+burst) and a session limit, so the workers run right up to the quota but
+not over it.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+LATENCY_FILE_NAME = "certum_signer_latency.json"
+SIGN_ORDERS = ("largest", "smallest", "name")
+DEFAULT_SIGN_ORDER = "largest"
+DEFAULT_RATE_BURST = 5
+# Weight of older samples per new sample of the same type (~20 calls remembered)
+DEFAULT_DECAY = 0.95
+# Weighted samples needed before a type's own model is used
+MIN_WEIGHT = 3.0
+# Estimate while nothing was learned yet: a cloud round trip plus upload
+PRIOR_OVERHEAD = 2.0
+PRIOR_SECONDS_PER_MIB = 0.05
+_MIB = 1024.0 * 1024.0
+_ALL_TYPES = "*"
+
+
+def _extension(file_path):
+    return os.path.splitext(file_path)[1].lower()
+
+
+def _file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+class LatencyHistory:
+    """Per file type model of sign call latency
+
+    Args:
+        cache_file: JSON file the model is kept in between runs (None = only
+            in memory)
+        decay: Weight an older sample keeps per new sample of the same type
+    """
+
+    def __init__(self, cache_file=None, decay=DEFAULT_DECAY):
+        self.cache_file = cache_file
+        self.decay = decay
+        # extension -> [weight, sum x, sum y, sum x*x, sum x*y], x in MiB, y in seconds
+        self._sums = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._sums = {str(key): [float(value) for value in sums][:5]
+                          for key, sums in data["types"].items() if len(sums) >= 5}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self._sums = {}
+
+    def save(self):
+        """Write the model to the cache file if it changed"""
+        with self._lock:
+            if not self.cache_file or not self._dirty:
+                return
+            data = {"types": {key: [round(value, 6) for value in sums] for key, sums in self._sums.items()}}
+            self._dirty = False
+        temp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(temp_file, self.cache_file)
+        except OSError:
+            pass  # the history only improves the order
+
+    def _add(self, key, x, y):
+        sums = self._sums.setdefault(key, [0.0] * 5)
+        for index in range(5):
+            sums[index] *= self.decay
+        sums[0] += 1.0
+        sums[1] += x
+        sums[2] += y
+        sums[3] += x * x
+        sums[4] += x * y
+
+    def record(self, file_path, seconds, size=None):
+        """Record that signing file_path took seconds"""
+        if seconds <= 0:
+            return
+        x = (size if size is not None else _file_size(file_path)) / _MIB
+        with self._lock:
+            self._add(_extension(file_path), x, seconds)
+            self._add(_ALL_TYPES, x, seconds)
+            self._dirty = True
+
+    def record_call(self, file_paths, seconds, sizes=None):
+        """Record one call that signed several files
+
+        The call's duration is split between the files in proportion to
+        their estimates, so a batch of one MSI and many small DLLs does not
+        teach that DLLs are slow. If every estimate is 0 (a model of empty
+        files without overhead) the duration is split evenly.
+        """
+        if not file_paths or seconds <= 0:
+            return
+        if sizes is None:
+            sizes = [_file_size(file_path) for file_path in file_paths]
+        estimates = [self.estimate(file_path, size) for file_path, size in zip(file_paths, sizes)]
+        total = sum(estimates)
+        if total <= 0:
+            estimates = [1.0] * len(estimates)
+            total = float(len(estimates))
+        for file_path, size, estimate in zip(file_paths, sizes, estimates):
+            self.record(file_path, seconds * estimate / total, size)
+
+    @staticmethod
+    def _fit(sums):
+        """(overhead, seconds per MiB) of the weighted least squares line"""
+        weight, sum_x, sum_y, sum_xx, sum_xy = sums
+        mean_x, mean_y = sum_x / weight, sum_y / weight
+        variance = sum_xx / weight - mean_x * mean_x
+        slope = 0.0
+        if variance > 1e-9 * max(1.0, mean_x * mean_x):
+            slope = max(0.0, (sum_xy / weight - mean_x * mean_y) / variance)
+        return max(0.0, mean_y - slope * mean_x), slope
+
+    def model(self, file_path):
+        """(overhead, seconds per MiB) used for the type of file_path"""
+        with self._lock:
+            for key in (_extension(file_path), _ALL_TYPES):
+                sums = self._sums.get(key)
+                if sums is not None and sums[0] >= MIN_WEIGHT:
+                    return self._fit(list(sums))
+        return PRIOR_OVERHEAD, PRIOR_SECONDS_PER_MIB
+
+    def estimate(self, file_path, size=None):
+        """Estimated seconds to sign file_path"""
+        overhead, slope = self.model(file_path)
+        size = size if size is not None else _file_size(file_path)
+        return overhead + slope * size / _MIB
+
+
+def order_files(files, order=DEFAULT_SIGN_ORDER, history=None):
+    """Sort the files of a run for the sign workers
+
+    Args:
+        files: Paths to sign
+        order: "largest" (longest estimated first), "smallest" (shortest
+            first) or "name" (sorted by path)
+        history: LatencyHistory for the estimates (default: the prior)
+
+    Returns:
+        tuple: (ordered files, estimated total seconds of signing)
+    """
+    history = history if history is not None else LatencyHistory()
+    sizes = {file_path: _file_size(file_path) for file_path in files}
+    estimates = {file_path: history.estimate(file_path, sizes[file_path]) for file_path in files}
+    if order == "name":
+        ordered = sorted(files)
+    else:
+        # Size breaks ties between files of equal estimate, the path keeps the order stable
+        ordered = sorted(files, key=lambda file_path: (estimates[file_path], sizes[file_path], file_path),
+                         reverse=order != "smallest")
+    return ordered, sum(estimates.values())
+
+
+class RateLimiter:
+    """Token bucket and session limit for sign calls
+
+    Args:
+        calls_per_minute: Sustained call rate (0 = unlimited)
+        burst: Calls that may start at once after an idle period
+        max_sessions: Calls that may run at the same time (0 = unlimited)
+        clock: Monotonic time source (time.monotonic)
+        sleep: Function that waits (time.sleep)
+    """
+
+    def __init__(self, calls_per_minute=0, burst=DEFAULT_RATE_BURST, max_sessions=0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.calls_per_minute = max(0.0, float(calls_per_minute))
+        self.burst = max(1, int(burst))
+        self.max_sessions = max(0, int(max_sessions))
+        self.clock = clock
+        self.sleep = sleep
+        self._rate = self.calls_per_minute / 60.0
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._sessions = threading.BoundedSemaphore(self.max_sessions) if self.max_sessions else None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.waited = 0.0
+
+    @property
+    def enabled(self):
+        return bool(self._rate or self._sessions)
+
+    @property
+    def config(self):
+        return self.calls_per_minute, self.burst, self.max_sessions
+
+    def acquire(self):
+        """Wait until a call may start
+
+        Tokens are reserved in arrival order: a caller that finds the bucket
+        empty takes its token in advance and sleeps until it is refilled, so
+        waiting callers start one after the other at the configured rate.
+
+        Returns:
+            float: Seconds waited
+        """
+        if not self.enabled:
+            return 0.0
+        started = self.clock()
+        if self._sessions is not None:
+            self._sessions.acquire()
+        delay = 0.0
+        if self._rate:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                self._tokens -= 1.0
+                if self._tokens < 0:
+                    delay = -self._tokens / self._rate
+        if delay:
+            self.sleep(delay)
+        waited = self.clock() - started
+        with self._lock:
+            self.calls += 1
+            self.waited += waited
+        return waited
+
+    def release(self):
+        """The call started by acquire() has finished"""
+        if self._sessions is not None:
+            self._sessions.release()
+
+    def describe(self):
+        limits = []
+        if self._rate:
+            limits.append(f"{self.calls_per_minute:g} calls/min (burst {self.burst})")
+        if self._sessions is not None:
+            limits.append(f"{self.max_sessions} concurrent sessions")
+        return ", ".join(limits) if limits else "unlimited"
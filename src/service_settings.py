@@ -0,0 +1,11 @@
+"""
+Defaults of the signing service settings
+
+Kept apart from sign_service, so the settings and the command line can use
+them without importing http.server for every "sign" or "verify" call.
+"""
+
+DEFAULT_SERVICE_HOST = "127.0.0.1"
+DEFAULT_SERVICE_PORT = 8765
+DEFAULT_ROUND_FILES = 200
+DEFAULT_GATHER_SECONDS = 0.5
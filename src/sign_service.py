@@ -0,0 +1,475 @@
+"""
+Signing service for many build agents
+
+One machine holds the SimplySign session; instead of every build agent
+queueing for a manual GUI run there, SigningService runs one SigningEngine
+behind a small HTTP API on a local port:
+
+    POST /jobs              {"client": "agent-3", "files": [...]} -> job
+    GET  /jobs/<id>         state and results of a job
+    GET  /jobs/<id>/events  per-file results as they happen (one JSON object
+                            per line, until the job is done)
+    GET  /status            queue length and jobs in progress
+
+Submitted files go into one queue per client. A dispatcher thread takes
+rounds of up to round_files files from all clients in turn (one file per
+client at a time, so a large job cannot starve a small one) and signs each
+round with one engine run - the engine keeps its toolchain, timestamp pool
+health and adaptive timeouts warm between rounds. A file submitted by
+several clients at once is signed once and reported to all of them.
+
+Anyone who can reach the service can have files signed with the code
+signing certificate, so it only listens on other than loopback addresses
+when a token is configured, and with allowed_roots it only signs files
+that resolve (symbolic links followed) into one of those folders.
+
+submit_job() is the client side, used by "certum_signer submit".
+"""
+
+import hmac
+import ipaddress
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .file_registry import STATUS_VERIFIED, STATUS_FAILED, STATUS_SKIPPED
+from .service_settings import DEFAULT_SERVICE_HOST, DEFAULT_SERVICE_PORT, DEFAULT_ROUND_FILES, DEFAULT_GATHER_SECONDS
+
+
+DEFAULT_KEEP_JOBS = 1000
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+
+_FINAL_STATUSES = (STATUS_VERIFIED, STATUS_FAILED, STATUS_SKIPPED)
+
+
+def is_loopback(host):
+    """Check whether host only accepts connections from this machine"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        # "" (all interfaces) and host names that may resolve to anything
+        return False
+
+
+def _normalize_root(path):
+    return os.path.normcase(os.path.realpath(path))
+
+
+class SignJob:
+    """Files submitted by one client in one request
+
+    Events (every status change of a file) are kept in order, so a client
+    that starts streaming late still gets all of them.
+    """
+
+    def __init__(self, job_id, client, files):
+        self.id = job_id
+        self.client = client
+        self.files = list(files)
+        self.created = time.time()
+        self.finished = None
+        self.state = JOB_QUEUED
+        self.results = {}
+        self.events = []
+        self._condition = threading.Condition()
+
+    def add_event(self, file_path, status):
+        """Record a status change; final statuses complete the file (first one wins)"""
+        with self._condition:
+            if file_path in self.results:
+                return
+            if status in _FINAL_STATUSES:
+                self.results[file_path] = status
+                if len(self.results) == len(self.files):
+                    self.state = JOB_DONE
+                    self.finished = time.time()
+            elif self.state == JOB_QUEUED:
+                self.state = JOB_RUNNING
+            self.events.append({"path": file_path, "status": status, "final": status in _FINAL_STATUSES})
+            self._condition.notify_all()
+
+    def wait_events(self, start, timeout=None):
+        """Events from index start on, waiting up to timeout if there are none yet
+
+        Returns:
+            tuple: (events, done) - done is True once the job is finished and
+                all its events were returned
+        """
+        with self._condition:
+            if len(self.events) <= start and self.state != JOB_DONE:
+                self._condition.wait(timeout)
+            events = self.events[start:]
+            return events, self.state == JOB_DONE
+
+    def to_dict(self, with_results=True):
+        with self._condition:
+            counts = defaultdict(int)
+            for status in self.results.values():
+                counts[status] += 1
+            data = {
+                "job": self.id,
+                "client": self.client,
+                "state": self.state,
+                "total": len(self.files),
+                "pending": len(self.files) - len(self.results),
+                "verified": counts[STATUS_VERIFIED],
+                "failed": counts[STATUS_FAILED],
+                "skipped": counts[STATUS_SKIPPED],
+            }
+            if with_results:
+                data["files"] = [{"path": file_path, "status": self.results.get(file_path)}
+                                 for file_path in self.files]
+            return data
+
+
+class FairQueue:
+    """One FIFO per client, taken from in round robin"""
+
+    def __init__(self):
+        self._queues = OrderedDict()
+        self._condition = threading.Condition()
+
+    def put(self, client, items):
+        with self._condition:
+            self._queues.setdefault(client, deque()).extend(items)
+            self._condition.notify_all()
+
+    def __len__(self):
+        with self._condition:
+            return sum(len(items) for items in self._queues.values())
+
+    def clients(self):
+        """{client: queued items}"""
+        with self._condition:
+            return {client: len(items) for client, items in self._queues.items()}
+
+    def take(self, max_items, timeout=None, gather=0.0, stop_event=None):
+        """Take up to max_items, one per client in turn
+
+        Waits up to timeout for the first item, then up to gather seconds
+        more while the round is not full, so jobs that arrive together share
+        a round. The client after the last one served starts the next round.
+
+        Returns:
+            list: Items, empty on timeout
+        """
+        with self._condition:
+            if not self._queues:
+                self._condition.wait(timeout)
+                if not self._queues:
+                    return []
+            deadline = time.monotonic() + gather
+            while (sum(len(items) for items in self._queues.values()) < max_items
+                   and not (stop_event is not None and stop_event.is_set())):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            taken = []
+            while self._queues and len(taken) < max_items:
+                client, items = next(iter(self._queues.items()))
+                taken.append(items.popleft())
+                if items:
+                    self._queues.move_to_end(client)
+                else:
+                    del self._queues[client]
+            return taken
+
+
+class SigningService:
+    """Signs the jobs of many clients with one engine
+
+    Args:
+        engine: SigningEngine to sign with; its status_callback is taken
+            over by the service
+        round_files: Maximum number of files per engine run
+        gather: Seconds to wait for more jobs before a round starts
+        keep_jobs: Number of finished jobs kept for GET /jobs/<id>
+        token: If set, clients must send "Authorization: Bearer <token>";
+            required to listen on other than loopback addresses
+        allowed_roots: Folders submitted files must lie in (empty = any)
+    """
+
+    def __init__(self, engine, round_files=DEFAULT_ROUND_FILES, gather=DEFAULT_GATHER_SECONDS,
+                 keep_jobs=DEFAULT_KEEP_JOBS, token=None, allowed_roots=None):
+        self.engine = engine
+        self.round_files = max(1, round_files)
+        self.gather = max(0.0, gather)
+        self.keep_jobs = max(1, keep_jobs)
+        self.token = token or None
+        self.allowed_roots = [_normalize_root(root) for root in allowed_roots or []]
+        self.queue = FairQueue()
+        self.rounds = 0
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._round_jobs = {}
+        self._stop = threading.Event()
+        self._dispatcher = None
+        self._server = None
+        self._server_thread = None
+        engine.status_callback = self._on_status
+
+    def allowed(self, file_path):
+        """Check whether file_path resolves into one of the allowed roots"""
+        if not self.allowed_roots:
+            return True
+        real_path = _normalize_root(file_path)
+        return any(real_path.startswith(root.rstrip(os.sep) + os.sep) for root in self.allowed_roots)
+
+    def submit(self, client, files):
+        """Queue files for client and return the new SignJob
+
+        Raises:
+            PermissionError: If a file lies outside the allowed roots (the
+                job is rejected as a whole)
+        """
+        files = list(dict.fromkeys(os.path.abspath(file_path) for file_path in files))
+        rejected = [file_path for file_path in files if not self.allowed(file_path)]
+        if rejected:
+            self.engine.log_message(f"✗ Service: job from {client} rejected, {len(rejected)} files outside "
+                                    f"the allowed roots, e.g. {rejected[0]}", error=True)
+            raise PermissionError(f"{len(rejected)} files outside the allowed roots, e.g. {rejected[0]}")
+        job = SignJob(f"{int(time.time())}-{next(self._ids)}", client, files)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            self._prune_jobs()
+        self.engine.log_message(f"Service: job {job.id} from {client} with {len(files)} files")
+        self.queue.put(client, [(job, file_path) for file_path in files])
+        return job
+
+    def job(self, job_id):
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def status(self):
+        with self._jobs_lock:
+            active = [job.to_dict(with_results=False) for job in self._jobs.values() if job.state != JOB_DONE]
+        return {"queued_files": len(self.queue), "clients": self.queue.clients(), "rounds": self.rounds,
+                "active_jobs": active}
+
+    def _prune_jobs(self):
+        done = [job_id for job_id, job in self._jobs.items() if job.state == JOB_DONE]
+        for job_id in done[:max(0, len(self._jobs) - self.keep_jobs)]:
+            del self._jobs[job_id]
+
+    def _on_status(self, file_paths, status):
+        """Engine status callback: stream the change to every job waiting for the file"""
+        for file_path in file_paths:
+            for job in self._round_jobs.get(file_path, ()):
+                job.add_event(file_path, status)
+
+    def run_round(self, items):
+        """Sign one round of (job, file_path) items with one engine run"""
+        by_path = defaultdict(list)
+        for job, file_path in items:
+            by_path[file_path].append(job)
+        missing = [file_path for file_path in by_path if not os.path.isfile(file_path)]
+        for file_path in missing:
+            self.engine.log_message(f"✗ Service: file not found: {file_path}", error=True)
+            for job in by_path.pop(file_path):
+                job.add_event(file_path, STATUS_FAILED)
+        # Checked again: a link may have been changed since the job was submitted
+        moved = [file_path for file_path in by_path if not self.allowed(file_path)]
+        for file_path in moved:
+            self.engine.log_message(f"✗ Service: file outside the allowed roots: {file_path}", error=True)
+            for job in by_path.pop(file_path):
+                job.add_event(file_path, STATUS_FAILED)
+        if not by_path:
+            return
+        clients = len(set(job.client for jobs in by_path.values() for job in jobs))
+        self.engine.log_message(f"Service: round {self.rounds + 1} with {len(by_path)} files from {clients} clients")
+        self._round_jobs = by_path
+        try:
+            summary = self.engine.sign_files(list(by_path))
+            final = dict(summary.results)
+        except Exception as e:
+            self.engine.log_message(f"✗ Service: signing round failed: {e}", error=True)
+            final = {}
+        finally:
+            self._round_jobs = {}
+            self.rounds += 1
+        # Files the engine did not report on its own (e.g. after an exception)
+        for file_path, jobs in by_path.items():
+            for job in jobs:
+                job.add_event(file_path, final.get(file_path, STATUS_FAILED))
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            items = self.queue.take(self.round_files, timeout=0.5, gather=self.gather, stop_event=self._stop)
+            if items:
+                self.run_round(items)
+
+    def start(self, host=DEFAULT_SERVICE_HOST, port=DEFAULT_SERVICE_PORT):
+        """Start the dispatcher and the HTTP server in background threads
+
+        Returns:
+            str: Base URL of the service (port 0 picks a free port)
+
+        Raises:
+            ValueError: If host is not a loopback address and no token is set
+        """
+        if not is_loopback(host) and self.token is None:
+            raise ValueError(f"refusing to listen on {host or 'all interfaces'} without a token; "
+                             f"set service_token (or --token) or listen on 127.0.0.1")
+        self._server = ThreadingHTTPServer((host, port), _ServiceHandler)
+        self._server.daemon_threads = True
+        self._server.service = self
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="certum-service", daemon=True)
+        self._dispatcher.start()
+        self._server_thread = threading.Thread(target=self._server.serve_forever, name="certum-service-http",
+                                               daemon=True)
+        self._server_thread.start()
+        self.engine.log_message(f"Signing service listening on {self.url}")
+        if not self.allowed_roots:
+            self.engine.log_message("Signing service accepts files from any folder (no allowed roots set)")
+        return self.url
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self, timeout=None):
+        """Stop accepting requests and wait for the current round to finish"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout)
+
+    def authorized(self, header):
+        if self.token is None:
+            return True
+        return hmac.compare_digest((header or "").encode(), f"Bearer {self.token}".encode())
+
+
+class _ServiceHandler(BaseHTTPRequestHandler):
+    """HTTP front end of SigningService (responses are JSON)"""
+
+    def _send_json(self, code, data):
+        body = (json.dumps(data) + "\n").encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _check_auth(self):
+        if self.server.service.authorized(self.headers.get("Authorization")):
+            return True
+        self._send_json(401, {"error": "missing or wrong token"})
+        return False
+
+    def do_POST(self):
+        if not self._check_auth():
+            return
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_REQUEST_BYTES:
+                raise ValueError("request too large")
+            request = json.loads(self.rfile.read(length).decode("utf-8"))
+            files = request["files"]
+            client = str(request.get("client") or self.client_address[0])
+            if not isinstance(files, list) or not files or not all(isinstance(path, str) for path in files):
+                raise ValueError("files must be a non-empty list of paths")
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"invalid job: {e}"})
+            return
+        try:
+            job = self.server.service.submit(client, files)
+        except PermissionError as e:
+            self._send_json(403, {"error": str(e)})
+            return
+        self._send_json(201, job.to_dict())
+
+    def do_GET(self):
+        if not self._check_auth():
+            return
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        service = self.server.service
+        if parts == ["status"]:
+            self._send_json(200, service.status())
+            return
+        job = service.job(parts[1]) if len(parts) in (2, 3) and parts[0] == "jobs" else None
+        if job is None or (len(parts) == 3 and parts[2] != "events"):
+            self._send_json(404, {"error": "not found"})
+            return
+        if len(parts) == 2:
+            self._send_json(200, job.to_dict())
+            return
+        self._stream_events(job)
+
+    def _stream_events(self, job):
+        """One JSON line per event, then the job summary; the connection close ends the stream"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        index = 0
+        try:
+            while True:
+                events, done = job.wait_events(index, timeout=15)
+                index += len(events)
+                lines = [json.dumps(event) for event in events]
+                if done:
+                    lines.append(json.dumps(dict(job.to_dict(), event="done")))
+                if lines:
+                    self.wfile.write(("\n".join(lines) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+                if done:
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client went away; the job goes on
+
+    def log_message(self, format, *args):
+        pass
+
+
+def submit_job(url, files, client, token=None, on_event=None, timeout=None):
+    """Submit files to a signing service and wait for the results
+
+    Args:
+        url: Base URL of the service, e.g. http://127.0.0.1:8765
+        on_event: Optional callable(event) for every per-file event
+        timeout: Socket timeout in seconds (None = wait as long as it takes)
+
+    Returns:
+        dict: The finished job (see SignJob.to_dict)
+
+    Raises:
+        OSError: If the service cannot be reached or rejects the job
+    """
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(url.rstrip("/") + "/jobs", method="POST", headers=headers,
+                                     data=json.dumps({"client": client, "files": list(files)}).encode("utf-8"))
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        job = json.loads(response.read().decode("utf-8"))
+
+    request = urllib.request.Request(f"{url.rstrip('/')}/jobs/{job['job']}/events", headers=headers)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        for line in response:
+            event = json.loads(line.decode("utf-8"))
+            if event.get("event") == "done":
+                return event
+            if on_event is not None:
+                on_event(event)
+    raise OSError(f"connection to {url} closed before job {job['job']} was done")
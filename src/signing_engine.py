@@ -0,0 +1,1839 @@
+"""
+Signing engine of CertumSigner
+
+Everything needed to sign and verify files - building signtool commands,
+batching, the sign/verify pipeline, the signing cache and the folder scan -
+without any GUI code. Both the Tk application and the command-line interface
+drive this engine, so importing it never loads tkinter.
+"""
+
+import os
+import json
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from .archive_signing import (
+    ARCHIVE_EXTENSIONS, ArchiveError, extract_members, is_archive, list_signable_members, rewrite_archive
+)
+from .artifact_cache import ArtifactCache, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_AGE_DAYS
+from .content_dedup import copy_atomic, group_identical
+from .file_registry import STATUS_SIGNING, STATUS_SIGNED, STATUS_VERIFIED, STATUS_FAILED, STATUS_SKIPPED
+from . import pe_reader
+from .folder_scanner import FolderScanner, ScanRules, DEFAULT_SCAN_WORKERS, MAX_SCAN_WORKERS
+from .preflight import check_files, resolve_tool
+from .toolchain import ToolchainResolver, TOOLCHAIN_CACHE_FILE_NAME
+from .local_staging import LocalStaging, STAGING_MODES, is_network_path
+from .folder_watcher import FolderWatcher, DEFAULT_WATCH_INTERVAL, DEFAULT_WATCH_SETTLE
+from .log_pipeline import DEFAULT_UI_MAX_LINES
+from .log_rotation import LogRotation, DEFAULT_LOG_MAX_MB, DEFAULT_LOG_KEEP, DEFAULT_LOG_KEEP_DAYS
+from .output_capture import run_captured, DEFAULT_MAX_KEPT
+from .pipeline import SignVerifyPipeline, PipelineError, DEFAULT_VERIFY_WORKERS, DEFAULT_QUEUE_SIZE
+from .run_metrics import RunMetrics
+from .scheduling import (
+    LatencyHistory, RateLimiter, order_files, LATENCY_FILE_NAME, SIGN_ORDERS, DEFAULT_SIGN_ORDER, DEFAULT_RATE_BURST
+)
+from .service_settings import DEFAULT_SERVICE_HOST, DEFAULT_SERVICE_PORT, DEFAULT_ROUND_FILES, DEFAULT_GATHER_SECONDS
+from .run_journal import RunJournal, JOURNAL_DIR_NAME, DEFAULT_JOURNAL_KEEP, prune_journals
+from .retry_policy import (
+    AdaptiveTimeout, AttemptBudget, RetryPolicy, classify_failure, FAILURE_PERMANENT,
+    DEFAULT_RETRY_ATTEMPTS, DEFAULT_RETRY_BASE_DELAY, DEFAULT_RETRY_MAX_DELAY
+)
+from .timestamp_pool import (
+    TimestampServerPool, DEFAULT_TIMESTAMP_SERVER, DEFAULT_FAILURE_THRESHOLD, DEFAULT_COOLDOWN
+)
+
+
+DEFAULT_SETTINGS_FILE = Path.home() / "certum_signer_settings.json"
+DEFAULT_LOG_FILE = Path.home() / "certum_signer.log"
+CACHE_FILE_NAME = "certum_signer_cache.json"
+
+SIGNABLE_EXTENSIONS = ['.exe', '.dll', '.msi', '.cab', '.ocx', '.sys']
+_SIGNABLE_SUFFIXES = frozenset(SIGNABLE_EXTENSIONS)
+
+# Default number of files signed/verified concurrently. Signing is dominated by
+# timestamp-server and SimplySign round trips, so a few workers already hide
+# most of the latency without hammering Certum's service.
+DEFAULT_MAX_WORKERS = 4
+MAX_WORKERS_LIMIT = 32
+
+# Batch mode: number of files passed to one "signtool sign" call (1 = one call
+# per file). Windows limits a command line to 32767 characters, so batches are
+# also cut at a configurable command-line length.
+DEFAULT_BATCH_SIZE = 1
+MAX_BATCH_SIZE = 200
+DEFAULT_MAX_COMMAND_LENGTH = 32000
+
+# "direct": signtool hashes and signs each file in one call. "digest": files
+# are hashed locally in parallel (/dg), only the digests are signed remotely
+# (/ds), and the signatures are embedded (/di) and timestamped afterwards.
+SIGN_MODES = ("direct", "digest")
+
+# Timeouts in seconds per file. The defaults apply until enough calls were
+# observed to derive timeouts from the actual latencies (adaptive_timeouts).
+DEFAULT_SIGN_TIMEOUT = 120
+DEFAULT_VERIFY_TIMEOUT = 30
+MAX_SIGN_TIMEOUT = 1800
+MAX_VERIFY_TIMEOUT = 600
+
+SIGNED_LINE_RE = re.compile(r"^\s*Successfully signed:\s*(.+?)\s*$")
+TIMESTAMPED_LINE_RE = re.compile(r"^\s*Successfully timestamped:\s*(.+?)\s*$")
+SIGNTOOL_ERROR_RE = re.compile(r"^\s*SignTool Error:.*:\s+(.+?)\s*$")
+# signtool errors caused by the timestamp server rather than the file or certificate
+TIMESTAMP_ERROR_RE = re.compile(r"SignTool Error:.*timestamp (server|signature)", re.IGNORECASE)
+TIMESTAMP_PROBE_TIMEOUT = 5.0
+# Lines of signtool output kept from the middle of a long output (see run_captured):
+# the result lines that are parsed and everything that reports a problem
+RESULT_LINE_RE = re.compile(r"Successfully (signed|timestamped|verified)|SignTool (Error|Warning)|"
+                            r"Number of (files|errors|warnings)|error|warning|fail", re.IGNORECASE)
+DEFAULT_OUTPUT_LINES = 40
+
+
+def _normalize_path(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+def parse_sign_output(output, file_paths, success_re=SIGNED_LINE_RE):
+    """Map signtool's per-file result lines back to the files of a batch
+    
+    signtool prints "Successfully signed: <file>" for every signed file and
+    "SignTool Error: ...: <file>" for files it could not sign. success_re
+    matches the success lines of other commands, e.g. TIMESTAMPED_LINE_RE.
+    
+    Returns:
+        tuple: (signed: set, failed: set) of paths from file_paths
+    """
+    known = {_normalize_path(path): path for path in file_paths}
+    signed = set()
+    failed = set()
+    for line in output.splitlines():
+        match = success_re.match(line)
+        if match:
+            path = known.get(_normalize_path(match.group(1)))
+            if path:
+                signed.add(path)
+            continue
+        match = SIGNTOOL_ERROR_RE.match(line)
+        if match:
+            path = known.get(_normalize_path(match.group(1)))
+            if path:
+                failed.add(path)
+    return signed - failed, failed
+
+
+def make_batches(file_paths, batch_size, base_length, max_length):
+    """Split files into batches for multi-file signtool calls
+    
+    A batch holds at most batch_size files, and the command line (base_length
+    plus the quoted file paths) stays within max_length characters. A file
+    that alone exceeds the limit still gets a batch of its own.
+    """
+    batches = []
+    current = []
+    length = base_length
+    for path in file_paths:
+        path_length = len(path) + 3  # separating space and quotes
+        if current and (len(current) >= batch_size or length + path_length > max_length):
+            batches.append(current)
+            current = []
+            length = base_length
+        current.append(path)
+        length += path_length
+    if current:
+        batches.append(current)
+    return batches
+
+
+class LogBlock:
+    """Collects the log lines of one file so they can be written as a block
+
+    Workers run concurrently, so logging line by line would interleave the
+    output of different files. Lines are buffered here and queued in one go
+    by flush().
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self.entries = []
+
+    def __call__(self, message, error=False):
+        self.entries.append((message, error))
+
+    def flush(self):
+        self.logger.log_block(self.entries)
+        self.entries = []
+
+
+def default_settings(log_file=DEFAULT_LOG_FILE):
+    """Return the default settings"""
+    return {
+        "signing_command": "signtool",
+        "timestamp_server": DEFAULT_TIMESTAMP_SERVER,
+        "timestamp_servers": [],
+        "timestamp_failure_threshold": DEFAULT_FAILURE_THRESHOLD,
+        "timestamp_cooldown": DEFAULT_COOLDOWN,
+        "timestamp_probe": True,
+        "journal_runs": True,
+        "journal_keep": DEFAULT_JOURNAL_KEEP,
+        "preflight": True,
+        "dedup_identical": True,
+        "staging_mode": "off",
+        "staging_dir": "",
+        "sign_archives": False,
+        "watch_interval": DEFAULT_WATCH_INTERVAL,
+        "watch_settle": DEFAULT_WATCH_SETTLE,
+        "watch_include_existing": False,
+        "service_host": DEFAULT_SERVICE_HOST,
+        "service_port": DEFAULT_SERVICE_PORT,
+        "service_round_files": DEFAULT_ROUND_FILES,
+        "service_gather": DEFAULT_GATHER_SECONDS,
+        "service_token": "",
+        "service_allowed_roots": [],
+        "metrics_json": "",
+        "metrics_prometheus": "",
+        "sign_mode": "direct",
+        "sign_order": DEFAULT_SIGN_ORDER,
+        "rate_limit_per_minute": 0,
+        "rate_limit_burst": DEFAULT_RATE_BURST,
+        "max_sign_sessions": 0,
+        "sign_timeout": DEFAULT_SIGN_TIMEOUT,
+        "verify_timeout": DEFAULT_VERIFY_TIMEOUT,
+        "adaptive_timeouts": True,
+        "retry_attempts": DEFAULT_RETRY_ATTEMPTS,
+        "retry_base_delay": DEFAULT_RETRY_BASE_DELAY,
+        "retry_max_delay": DEFAULT_RETRY_MAX_DELAY,
+        "log_file": str(log_file),
+        "max_workers": DEFAULT_MAX_WORKERS,
+        "verify_workers": DEFAULT_VERIFY_WORKERS,
+        "verify_queue_size": DEFAULT_QUEUE_SIZE,
+        "batch_size": DEFAULT_BATCH_SIZE,
+        "max_command_length": DEFAULT_MAX_COMMAND_LENGTH,
+        "skip_unchanged": True,
+        "skip_already_signed": False,
+        "verify_mode": "full",
+        "log_max_lines": DEFAULT_UI_MAX_LINES,
+        "log_max_mb": DEFAULT_LOG_MAX_MB,
+        "log_rotate_daily": True,
+        "log_keep": DEFAULT_LOG_KEEP,
+        "log_keep_days": DEFAULT_LOG_KEEP_DAYS,
+        "log_compress": True,
+        "output_keep_lines": DEFAULT_OUTPUT_LINES,
+        "cache_max_entries": DEFAULT_MAX_ENTRIES,
+        "cache_max_age_days": DEFAULT_MAX_AGE_DAYS,
+        "scan_include": [],
+        "scan_exclude": [],
+        "scan_max_depth": None,
+        "scan_workers": DEFAULT_SCAN_WORKERS
+    }
+
+
+def load_settings_file(settings_file):
+    """Load settings from a JSON file, filling in defaults for missing keys
+    
+    Raises:
+        OSError, ValueError: If the file cannot be read or parsed
+    """
+    with open(settings_file, 'r') as f:
+        settings = json.load(f)
+    # Ensure all keys exist
+    for key, value in default_settings().items():
+        if key not in settings:
+            settings[key] = value
+    return settings
+
+
+def get_timestamp_servers(settings):
+    """Return the configured timestamp server URLs in order of preference
+    
+    "timestamp_servers" lists the pool; older settings files only have the
+    single "timestamp_server", which is used when the list is empty.
+    """
+    servers = settings.get("timestamp_servers") or []
+    if isinstance(servers, str):
+        servers = [servers]
+    if not servers:
+        servers = [settings.get("timestamp_server") or DEFAULT_TIMESTAMP_SERVER]
+    return [url for url in dict.fromkeys(str(url).strip() for url in servers) if url]
+
+
+def _file_size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
+
+
+def _strip_paths(output, file_paths):
+    """Remove file paths from signtool output before classifying it"""
+    for file_path in file_paths:
+        output = output.replace(file_path, "<file>")
+    return output
+
+
+def journal_directory(settings_file):
+    """Directory of the run journals, next to the settings file"""
+    return Path(settings_file).parent / JOURNAL_DIR_NAME
+
+
+def create_artifact_cache(settings_file, settings):
+    """Open the signing cache that lives next to the settings file"""
+    return ArtifactCache(
+        Path(settings_file).parent / CACHE_FILE_NAME,
+        max_entries=settings.get("cache_max_entries", DEFAULT_MAX_ENTRIES),
+        max_age_days=settings.get("cache_max_age_days", DEFAULT_MAX_AGE_DAYS)
+    )
+
+
+def create_log_rotation(settings):
+    """Rotation of the log file according to the log_* settings"""
+    def number(key, default):
+        try:
+            return max(0.0, float(settings.get(key, default)))
+        except (TypeError, ValueError):
+            return default
+    
+    return LogRotation(
+        max_bytes=number("log_max_mb", DEFAULT_LOG_MAX_MB) * 1024 * 1024,
+        daily=bool(settings.get("log_rotate_daily", True)),
+        keep=int(number("log_keep", DEFAULT_LOG_KEEP)),
+        max_age_days=number("log_keep_days", DEFAULT_LOG_KEEP_DAYS),
+        compress=bool(settings.get("log_compress", True))
+    )
+
+
+def create_toolchain_resolver(settings_file):
+    """Create the signtool resolver whose cache lives next to the settings file"""
+    return ToolchainResolver(Path(settings_file).parent / TOOLCHAIN_CACHE_FILE_NAME)
+
+
+def create_latency_history(settings_file):
+    """Open the sign latency history that lives next to the settings file"""
+    return LatencyHistory(Path(settings_file).parent / LATENCY_FILE_NAME)
+
+
+def is_signable(file_name):
+    """Check whether a file name has one of the signable extensions"""
+    return os.path.splitext(file_name)[1].lower() in _SIGNABLE_SUFFIXES
+
+
+def create_scanner(settings, recursive=True):
+    """Create a FolderScanner for signable files from the scan_* settings
+    
+    recursive=False limits the scan to the folder itself.
+    """
+    max_depth = settings.get("scan_max_depth")
+    if not recursive:
+        max_depth = 0
+    elif max_depth is not None:
+        max_depth = max(0, int(max_depth))
+    try:
+        workers = int(settings.get("scan_workers", DEFAULT_SCAN_WORKERS))
+    except (TypeError, ValueError):
+        workers = DEFAULT_SCAN_WORKERS
+    extensions = SIGNABLE_EXTENSIONS
+    if settings.get("sign_archives", False):
+        extensions = SIGNABLE_EXTENSIONS + ARCHIVE_EXTENSIONS
+    rules = ScanRules(
+        extensions,
+        include=settings.get("scan_include") or [],
+        exclude=settings.get("scan_exclude") or [],
+        max_depth=max_depth
+    )
+    return FolderScanner(rules, workers=max(1, min(workers, MAX_SCAN_WORKERS)))
+
+
+def find_signable_files(folder_path, recursive=True, settings=None):
+    """Return the sorted absolute paths of all signable files in a folder"""
+    return create_scanner(settings or {}, recursive=recursive).scan_all(folder_path)
+
+
+class SigningSummary:
+    """Outcome of a signing or verification run
+    
+    Attributes:
+        results: (file_path, status) for every file, status being one of
+            STATUS_VERIFIED, STATUS_FAILED or STATUS_SKIPPED
+        metrics: RunMetrics with the timings of the run (None if not measured)
+    """
+    
+    def __init__(self):
+        self.results = []
+        self.stage_summary = []
+        self.duration = 0.0
+        self.metrics = None
+    
+    def _count(self, status):
+        return len([1 for file_path, file_status in self.results if file_status == status])
+    
+    @property
+    def total(self):
+        return len(self.results)
+    
+    @property
+    def verified(self):
+        return self._count(STATUS_VERIFIED)
+    
+    @property
+    def failed(self):
+        return self._count(STATUS_FAILED)
+    
+    @property
+    def skipped(self):
+        return self._count(STATUS_SKIPPED)
+    
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "verified": self.verified,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "duration_seconds": round(self.duration, 3),
+            "files": [{"path": file_path, "status": status} for file_path, status in self.results]
+        }
+
+
+class SigningEngine:
+    """Signs and verifies files with signtool
+    
+    Args:
+        settings: Settings dict (shared with the GUI, which may change it)
+        logger: AsyncLogger (or any object with log() and log_block())
+        artifact_cache: ArtifactCache used to skip unchanged files
+        status_callback: Optional callable(file_paths, status) told about
+            every status change of a file while a run is in progress (called
+            from worker threads, e.g. FileRegistry.set_status_many)
+        journal_dir: Directory for the run journals (None = no journal)
+        toolchain: ToolchainResolver that finds signtool.exe in the Windows
+            SDKs (default: one without a cache file)
+        latency_history: LatencyHistory used to order the files of a run
+            (default: one without a cache file)
+    """
+    
+    def __init__(self, settings, logger, artifact_cache, status_callback=None, journal_dir=None, toolchain=None,
+                 latency_history=None):
+        self.settings = settings
+        self.logger = logger
+        self.artifact_cache = artifact_cache
+        self.status_callback = status_callback
+        self.journal_dir = journal_dir
+        self._journal = None
+        self._timestamp_pool = None
+        self._timestamp_pool_lock = threading.Lock()
+        self._rate_limiter = None
+        self._rate_limiter_lock = threading.Lock()
+        self.sign_timeouts = AdaptiveTimeout(DEFAULT_SIGN_TIMEOUT, minimum=30, maximum=MAX_SIGN_TIMEOUT)
+        self.verify_timeouts = AdaptiveTimeout(DEFAULT_VERIFY_TIMEOUT, minimum=10, maximum=MAX_VERIFY_TIMEOUT)
+        self._digest_pool = None
+        self._staging = None
+        self._staged = {}
+        self._archive_dir = None
+        self._archives = {}
+        self._archive_members = {}
+        self.toolchain = toolchain if toolchain is not None else ToolchainResolver()
+        self._resolved_tools = {}
+        self.latency_history = latency_history if latency_history is not None else LatencyHistory()
+        self.metrics = RunMetrics()
+    
+    def _report_status(self, file_paths, status):
+        if not file_paths:
+            return
+        if self._staged:
+            file_paths = [self._original_path(file_path) for file_path in file_paths]
+        if self._archive_members:
+            # Extracted archive members are reported through their archive
+            file_paths = [file_path for file_path in file_paths if file_path not in self._archive_members]
+            if not file_paths:
+                return
+        journal = self._journal
+        if journal is not None:
+            try:
+                journal.record(file_paths, status)
+            except (OSError, ValueError) as e:
+                self._journal = None
+                self.log_message(f"Run journal disabled, writing {journal.path} failed: {e}", error=True)
+        if self.status_callback is not None:
+            self.status_callback(list(file_paths), status)
+    
+    def _observe(self, stage, seconds, file_paths=(), size=0):
+        """Record a timing span of the current run (see RunMetrics)"""
+        if self._staged:
+            file_paths = [self._original_path(file_path) for file_path in file_paths]
+        if self._archive_members:
+            file_paths = [self._member_name(file_path) for file_path in file_paths]
+        self.metrics.observe(stage, seconds, file_paths, size=size)
+    
+    def _observe_queue_wait(self, stage, seconds, items):
+        """Pipeline callback: items are batches of paths or (file_path, log) tuples"""
+        self._observe(stage, seconds, [item[0] if isinstance(item, tuple) else item for item in items])
+    
+    def _finish_metrics(self, summary):
+        """Close the run's metrics, log the timings per stage and export them"""
+        self.metrics.finish(summary.results)
+        summary.metrics = self.metrics
+        lines = self.metrics.summary_lines()
+        if lines:
+            self.log_message("Timings per stage:")
+            for line in lines:
+                self.log_message(f"  {line}")
+        for key, write in (("metrics_json", self.metrics.write_json),
+                           ("metrics_prometheus", self.metrics.write_prometheus)):
+            path = self.settings.get(key)
+            if not path:
+                continue
+            try:
+                write(path)
+            except OSError as e:
+                self.log_message(f"Cannot write metrics to {path}: {e}", error=True)
+    
+    def _create_journal(self):
+        """Start a journal for a new run if journaling is enabled"""
+        if self.journal_dir is None or not self.settings.get("journal_runs", True):
+            return None
+        try:
+            prune_journals(self.journal_dir, self.get_int_setting("journal_keep", DEFAULT_JOURNAL_KEEP, 1, 1000) - 1)
+            return RunJournal.create(self.journal_dir)
+        except OSError as e:
+            self.log_message(f"Cannot create run journal in {self.journal_dir}: {e}", error=True)
+            return None
+    
+    def log_message(self, message, error=False):
+        """Queue a message for the log file (and UI)"""
+        self.logger.log(message, error=error)
+    
+    def get_int_setting(self, key, default, minimum, maximum):
+        """Return an integer setting clamped to [minimum, maximum]"""
+        try:
+            value = int(self.settings.get(key, default))
+        except (TypeError, ValueError):
+            value = default
+        return max(minimum, min(value, maximum))
+    
+    def get_max_workers(self):
+        """Return the configured number of parallel signing workers"""
+        return self.get_int_setting("max_workers", DEFAULT_MAX_WORKERS, 1, MAX_WORKERS_LIMIT)
+    
+    def get_batch_size(self):
+        """Return the configured number of files per signtool call"""
+        return self.get_int_setting("batch_size", DEFAULT_BATCH_SIZE, 1, MAX_BATCH_SIZE)
+    
+    def get_sign_mode(self):
+        """Return the configured sign mode ("direct" or "digest")"""
+        mode = self.settings.get("sign_mode", "direct")
+        return mode if mode in SIGN_MODES else "direct"
+    
+    def get_float_setting(self, key, default, minimum=0.0):
+        """Return a number setting, at least minimum"""
+        try:
+            return max(minimum, float(self.settings.get(key, default)))
+        except (TypeError, ValueError):
+            return default
+    
+    def get_signing_tool(self):
+        """Return the command that runs signtool for signing
+        
+        A configured path or a command found on PATH is used as it is. A bare
+        "signtool" that is not on PATH is resolved to the newest signtool.exe
+        of the installed Windows SDKs. The result is remembered per command,
+        so the per-file paths never search the file system.
+        """
+        command = self.settings.get("signing_command", "signtool") or "signtool"
+        resolved = self._resolved_tools.get(command)
+        if resolved is None:
+            resolved = command
+            if ("simplysign" not in command.lower() and resolve_tool(command) is None
+                    and os.path.basename(command).lower() in ("signtool", "signtool.exe")):
+                resolved = self.toolchain.best() or command
+            self._resolved_tools[command] = resolved
+        return resolved
+    
+    def get_verify_tool(self):
+        """Return the command that runs signtool for verification
+        
+        SimplySignDesktop.exe has no verify command, so when it is configured
+        for signing, signtool.exe from the Windows SDKs (or PATH) is used.
+        """
+        command = self.settings.get("signing_command", "signtool") or "signtool"
+        if "simplysign" not in command.lower():
+            return self.get_signing_tool()
+        resolved = self._resolved_tools.get(("verify", command))
+        if resolved is None:
+            resolved = self.toolchain.best() or "signtool"
+            self._resolved_tools[("verify", command)] = resolved
+        return resolved
+    
+    def _log_resolved_tool(self):
+        """Resolve the tools again for a new run and log where signtool was found"""
+        self._resolved_tools = {}
+        # A few stat calls; picks up SDKs installed since the last run
+        self.toolchain.installations(refresh=True)
+        command = self.settings.get("signing_command", "signtool") or "signtool"
+        for tool in dict.fromkeys([self.get_signing_tool(), self.get_verify_tool()]):
+            if tool != command:
+                self.log_message(f"Using {tool}")
+    
+    def get_staging_mode(self):
+        """Return the configured staging mode ("off", "network" or "always")"""
+        mode = self.settings.get("staging_mode", "off")
+        return mode if mode in STAGING_MODES else "off"
+    
+    def _member_name(self, file_path):
+        """archive!member for an extracted archive member, else file_path"""
+        member = self._archive_members.get(file_path)
+        return f"{member[0]}!{member[1]}" if member is not None else file_path
+    
+    def _original_path(self, file_path):
+        """Path of the file a staged local copy stands for (file_path if it is not staged)"""
+        staged_file = self._staged.get(file_path)
+        return staged_file.original if staged_file is not None else file_path
+    
+    def get_retry_policy(self):
+        """Return the retry policy for transient signtool failures"""
+        return RetryPolicy(
+            max_attempts=self.get_int_setting("retry_attempts", DEFAULT_RETRY_ATTEMPTS, 1, 10),
+            base_delay=self.get_float_setting("retry_base_delay", DEFAULT_RETRY_BASE_DELAY),
+            max_delay=self.get_float_setting("retry_max_delay", DEFAULT_RETRY_MAX_DELAY)
+        )
+    
+    def _run_tool(self, cmd, timeout):
+        """Run a signtool command and capture a bounded part of its output
+        
+        The first and last output_keep_lines / 2 lines of each stream are
+        kept, plus the result lines in between, so a verbose call over a big
+        batch neither fills the memory nor the log.
+        """
+        lines = self.get_int_setting("output_keep_lines", DEFAULT_OUTPUT_LINES, 2, 100000)
+        return run_captured(cmd, timeout=timeout, keep=RESULT_LINE_RE, head_lines=lines // 2,
+                            tail_lines=lines - lines // 2, max_kept=max(DEFAULT_MAX_KEPT, 4 * MAX_BATCH_SIZE))
+    
+    def _get_timeout(self, timeouts, key, default, maximum, file_paths):
+        """Timeout for one signtool call over file_paths (see AdaptiveTimeout)"""
+        timeouts.default = self.get_int_setting(key, default, 1, maximum)
+        if not self.settings.get("adaptive_timeouts", True):
+            return min(maximum, timeouts.default * len(file_paths))
+        return timeouts.timeout(len(file_paths), sum(_file_size(file_path) for file_path in file_paths))
+    
+    def get_timestamp_pool(self):
+        """Return the timestamp server pool, rebuilt when the server list changed
+        
+        The pool (and the health it has learned) is kept across runs.
+        """
+        urls = get_timestamp_servers(self.settings)
+        with self._timestamp_pool_lock:
+            if self._timestamp_pool is None or self._timestamp_pool.urls != urls:
+                self._timestamp_pool = TimestampServerPool(
+                    urls,
+                    failure_threshold=self.get_int_setting("timestamp_failure_threshold",
+                                                           DEFAULT_FAILURE_THRESHOLD, 1, 100),
+                    cooldown=self.get_int_setting("timestamp_cooldown", int(DEFAULT_COOLDOWN), 1, 3600)
+                )
+            return self._timestamp_pool
+    
+    def get_sign_order(self):
+        """Return the configured order of the files ("largest", "smallest" or "name")"""
+        order = self.settings.get("sign_order", DEFAULT_SIGN_ORDER)
+        return order if order in SIGN_ORDERS else DEFAULT_SIGN_ORDER
+    
+    def get_rate_limiter(self):
+        """Return the rate limiter for sign calls, rebuilt when its settings changed
+        
+        Like the timestamp pool, the limiter is kept across runs, so the
+        quota is also respected between runs that follow each other closely.
+        """
+        config = (self.get_float_setting("rate_limit_per_minute", 0),
+                  self.get_int_setting("rate_limit_burst", DEFAULT_RATE_BURST, 1, 1000),
+                  self.get_int_setting("max_sign_sessions", 0, 0, MAX_WORKERS_LIMIT))
+        with self._rate_limiter_lock:
+            if self._rate_limiter is None or self._rate_limiter.config != config:
+                self._rate_limiter = RateLimiter(*config)
+            return self._rate_limiter
+    
+    def _admit_sign_call(self, file_paths, log):
+        """Wait for the rate limiter before a remote sign call
+        
+        Returns:
+            RateLimiter: Its release() must be called when the call is done
+        """
+        limiter = self.get_rate_limiter()
+        waited = limiter.acquire()
+        if limiter.enabled:
+            self._observe("rate_limit_wait", waited, file_paths)
+        if waited >= 0.05:
+            self.metrics.count("rate_limited_calls")
+            log(f"Waited {waited:.1f}s for the signing rate limit ({limiter.describe()})")
+        return limiter
+    
+    def _order_files(self, files):
+        """Sort the files to sign by their estimated signing time (see order_files)"""
+        order = self.get_sign_order()
+        if len(files) < 2:
+            return list(files)
+        files, estimate = order_files(files, order, self.latency_history)
+        if order != "name":
+            self.log_message(f"Signing {order} files first (about {estimate:.0f}s of signing estimated)")
+        return files
+    
+    def _probe_timestamp_servers(self, pool):
+        """Measure all timestamp servers in parallel before a run"""
+        with ThreadPoolExecutor(max_workers=len(pool.urls), thread_name_prefix="certum-tsa-probe") as probes:
+            outcomes = list(probes.map(lambda url: pool.probe(url, timeout=TIMESTAMP_PROBE_TIMEOUT), pool.urls))
+        for url, (ok, message) in zip(pool.urls, outcomes):
+            if ok:
+                self.log_message(f"Timestamp server {url}: reachable ({message})")
+            else:
+                self.log_message(f"Timestamp server {url}: not reachable ({message})", error=True)
+    
+    def _make_sign_batches(self, files):
+        """Group files into batches according to the batch settings"""
+        batch_size = self.get_batch_size()
+        if batch_size == 1:
+            return [[file_path] for file_path in files]
+        try:
+            max_length = int(self.settings.get("max_command_length", DEFAULT_MAX_COMMAND_LENGTH))
+        except (TypeError, ValueError):
+            max_length = DEFAULT_MAX_COMMAND_LENGTH
+        longest_server = max(get_timestamp_servers(self.settings), key=len)
+        base_length = len(subprocess.list2cmdline(
+            self._build_sign_command([], log=lambda *a, **k: None, timestamp_server=longest_server)))
+        return make_batches(files, batch_size, base_length, max_length)
+    
+    def sign_files(self, files, journal=None):
+        """Sign and verify files
+        
+        Every state transition is written to the run journal (a new one, or
+        journal when continuing an interrupted run); a run that does not
+        get to the end can be continued with resume_run().
+        
+        Returns:
+            SigningSummary
+        """
+        journal = journal if journal is not None else self._create_journal()
+        self._journal = journal
+        try:
+            if journal is not None:
+                journal.start(sorted(files), settings={
+                    key: self.settings.get(key) for key in ("sign_mode", "batch_size", "max_workers", "verify_mode")
+                })
+            summary = self._sign_files(files)
+            if journal is not None and self._journal is not None:
+                journal.finish(total=summary.total, verified=summary.verified, failed=summary.failed,
+                               skipped=summary.skipped, duration=round(summary.duration, 3))
+            return summary
+        finally:
+            self._journal = None
+            self._cleanup_archives()
+            if journal is not None:
+                journal.close()
+    
+    def resume_run(self, state, retry_failed=False):
+        """Continue an interrupted run from its replayed journal
+        
+        Files that were verified or skipped are not touched again (failed
+        ones only with retry_failed). Files that were signed but not yet
+        verified are verified first and only signed again if that fails.
+        
+        Args:
+            state: RunState from run_journal.load_journal()
+        
+        Returns:
+            SigningSummary: The whole run, including the files finished before
+        """
+        pending = state.unfinished(retry_failed=retry_failed)
+        pending_set = set(pending)
+        self.log_message(f"Resuming run {os.path.basename(state.path)}: "
+                         f"{len(state.files) - len(pending)} of {len(state.files)} files already done, "
+                         f"{len(pending)} to go")
+        
+        journal = RunJournal(state.path)
+        signed_before = [file_path for file_path in pending if state.states.get(file_path) == "signed"]
+        verified_before = set()
+        if signed_before:
+            def verify(file_path):
+                log = LogBlock(self.logger)
+                log(f"Verifying (signed before the interruption): {file_path}")
+                is_verified = self._verify_signature(file_path, log=log)[0]
+                log.flush()
+                return is_verified
+            
+            self._journal = journal
+            try:
+                verify_workers = self.get_int_setting("verify_workers", DEFAULT_VERIFY_WORKERS, 1, MAX_WORKERS_LIMIT)
+                with ThreadPoolExecutor(max_workers=verify_workers, thread_name_prefix="certum-verify") as pool:
+                    for file_path, is_verified in zip(signed_before, pool.map(verify, signed_before)):
+                        if is_verified:
+                            verified_before.add(file_path)
+                            self.artifact_cache.record(file_path, True)
+                            self._report_status([file_path], STATUS_VERIFIED)
+            except BaseException:
+                journal.close()
+                raise
+            finally:
+                self._journal = None
+            self.log_message(f"{len(verified_before)} of {len(signed_before)} files signed before the "
+                             f"interruption are verified, the others are signed again")
+        
+        summary = self.sign_files([file_path for file_path in pending if file_path not in verified_before],
+                                  journal=journal)
+        earlier = []
+        for file_path in state.files:
+            if file_path in verified_before:
+                earlier.append((file_path, STATUS_VERIFIED))
+            elif file_path not in pending_set:
+                earlier.append((file_path, state.states[file_path]))
+        summary.results = earlier + summary.results
+        return summary
+    
+    def _sign_files(self, files):
+        """Sign and verify files (see sign_files)
+        
+        Signing and verification run as a two-stage pipeline: a pool of sign
+        workers (max_workers) hands signed files over a bounded queue to a
+        separate pool of verify workers (verify_workers). Each file's log
+        output is buffered and written as one block, and the counters are only
+        computed here from the collected results, so no two threads touch them.
+        In batch mode a sign worker signs a whole batch with one signtool call.
+        
+        Files that still match a previously verified signature in the
+        signing cache are skipped unless "skip_unchanged" is disabled.
+        
+        Returns:
+            SigningSummary
+        """
+        started = time.perf_counter()
+        summary = SigningSummary()
+        self.metrics = RunMetrics()
+        all_files = sorted(files)
+        max_workers = self.get_max_workers()
+        
+        self.log_message(f"Starting signing process for {len(all_files)} files...")
+        self._log_resolved_tool()
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="certum-scan") as pool:
+            if self.settings.get("skip_unchanged", True):
+                up_to_date = list(pool.map(self.artifact_cache.is_up_to_date, all_files))
+                files = [file_path for file_path, skip in zip(all_files, up_to_date) if not skip]
+                skipped = [file_path for file_path, skip in zip(all_files, up_to_date) if skip]
+                if skipped:
+                    self.log_message(f"Skipping {len(skipped)} unchanged files that are already signed and verified")
+            else:
+                files, skipped = all_files, []
+            
+            if self.settings.get("skip_already_signed", False):
+                signed = list(pool.map(self._has_intact_signature, files))
+                already_signed = [file_path for file_path, is_signed in zip(files, signed) if is_signed]
+                files = [file_path for file_path, is_signed in zip(files, signed) if not is_signed]
+                if already_signed:
+                    self.log_message(f"Skipping {len(already_signed)} files that already carry an intact Authenticode signature")
+                skipped += already_signed
+        summary.results.extend((file_path, STATUS_SKIPPED) for file_path in skipped)
+        self._report_status(skipped, STATUS_SKIPPED)
+        
+        if files and self.settings.get("preflight", True):
+            problems, tool_error = self.preflight(files)
+            for file_path, problem in sorted(problems.items()):
+                self.log_message(f"✗ Pre-flight check failed for {file_path}: {problem}", error=True)
+            if tool_error:
+                # Fail fast instead of letting every signtool call fail
+                self.log_message(f"✗ {tool_error}; no file can be signed", error=True)
+                problems = dict.fromkeys(files, tool_error)
+            if problems:
+                files = [file_path for file_path in files if file_path not in problems]
+                summary.results.extend((file_path, STATUS_FAILED) for file_path in sorted(problems))
+                self._report_status(sorted(problems), STATUS_FAILED)
+        
+        if self.settings.get("sign_archives", False):
+            files = self._expand_archives(files, summary, max_workers)
+        
+        copies = {}
+        if self.settings.get("dedup_identical", True) and len(files) > 1:
+            for group in group_identical(files, workers=max_workers):
+                copies[group[0]] = group[1:]
+            if copies:
+                duplicates = set(file_path for group in copies.values() for file_path in group)
+                files = [file_path for file_path in files if file_path not in duplicates]
+                self.log_message(f"{len(duplicates)} files are identical copies of {len(copies)} others; "
+                                 f"signing one file per content and copying the result")
+        
+        try:
+            files = self._stage_files(files, summary, max_workers)
+            self._run_sign_pipeline(files, summary, max_workers)
+        finally:
+            if self._staging is not None:
+                self._staging.cleanup()
+                self._staging = None
+                self._staged = {}
+        if copies:
+            summary.results.extend(self._fan_out_copies(copies, dict(summary.results), max_workers))
+        if self._archives:
+            summary.results = self._finish_archives(summary.results)
+        
+        self._save_signing_cache()
+        self.latency_history.save()
+        summary.duration = time.perf_counter() - started
+        
+        # Summary
+        self.log_message("=" * 80)
+        self.log_message(f"=== Signing Complete ===")
+        self.log_message(f"Total files processed: {summary.total}")
+        self.log_message(f"Successfully signed and verified: {summary.verified}")
+        self.log_message(f"Skipped (unchanged or already signed): {summary.skipped}")
+        self.log_message(f"Failed or unverified: {summary.failed}")
+        for line in summary.stage_summary:
+            self.log_message(line)
+        if self.settings.get("adaptive_timeouts", True):
+            self.log_message(f"Sign timeouts: {self.sign_timeouts.describe()}; "
+                             f"verify timeouts: {self.verify_timeouts.describe()}")
+        timestamp_pool = self.get_timestamp_pool()
+        if len(timestamp_pool.urls) > 1:
+            for line in timestamp_pool.summary_lines():
+                self.log_message(f"Timestamp server {line}")
+        self._finish_metrics(summary)
+        self.log_message("=" * 80)
+        return summary
+    
+    def preflight(self, files):
+        """Check files and the signing tool before any signtool call
+        
+        Returns:
+            tuple: ({file_path: problem} for files that cannot be signed,
+                error message if the signing tool cannot be found, else None)
+        """
+        started = time.perf_counter()
+        signing_tool = self.get_signing_tool()
+        tool_error = None
+        if resolve_tool(signing_tool) is None:
+            tool_error = f"Signing tool not found: {signing_tool}"
+        problems = check_files(files, workers=self.get_max_workers() * 4)
+        elapsed = time.perf_counter() - started
+        self._observe("preflight", elapsed)
+        self.log_message(f"Pre-flight check of {len(files)} files: {len(problems)} problems ({elapsed:.1f}s)")
+        return problems, tool_error
+    
+    def _expand_archives(self, files, summary, workers):
+        """Replace the archives in files by their extracted signable members
+        
+        Returns:
+            list: The other files plus the extracted members. Archives that
+                cannot be read are added to summary as failed, archives
+                with nothing to sign as skipped.
+        """
+        archives = [file_path for file_path in files if is_archive(file_path)]
+        if not archives:
+            return files
+        
+        started = time.perf_counter()
+        self._archive_dir = tempfile.mkdtemp(prefix="certum-archive-")
+        members = []
+        failed = []
+        skipped = []
+        for index, archive in enumerate(archives):
+            try:
+                names = list_signable_members(archive, is_signable)
+                extracted = extract_members(archive, names, os.path.join(self._archive_dir, str(index)),
+                                            workers=workers)
+            except ArchiveError as e:
+                self.log_message(f"✗ Cannot read archive {archive}: {e}", error=True)
+                failed.append(archive)
+                continue
+            if self.settings.get("skip_already_signed", False):
+                extracted = {name: path for name, path in extracted.items() if not self._has_intact_signature(path)}
+            if not extracted:
+                self.log_message(f"Skipping archive {os.path.basename(archive)}: no unsigned signable members")
+                skipped.append(archive)
+                continue
+            self._archives[archive] = extracted
+            for name, path in extracted.items():
+                self._archive_members[path] = (archive, name)
+            members.extend(extracted.values())
+        
+        summary.results.extend((file_path, STATUS_FAILED) for file_path in failed)
+        summary.results.extend((file_path, STATUS_SKIPPED) for file_path in skipped)
+        self._report_status(failed, STATUS_FAILED)
+        self._report_status(skipped, STATUS_SKIPPED)
+        self._report_status(sorted(self._archives), STATUS_SIGNING)
+        elapsed = time.perf_counter() - started
+        self._observe("archive_extract", elapsed, sorted(self._archives))
+        self.log_message(f"Extracted {len(members)} signable members from {len(self._archives)} archives "
+                         f"({elapsed:.1f}s)")
+        return [file_path for file_path in files if not is_archive(file_path)] + members
+    
+    def _finish_archives(self, results):
+        """Write the signed members back into their archives
+        
+        An archive is only rewritten if all its members were signed and
+        verified; otherwise it is left unchanged and fails.
+        
+        Returns:
+            list: results with the members replaced by their archives
+        """
+        statuses = dict(results)
+        results = [(file_path, status) for file_path, status in results if file_path not in self._archive_members]
+        for archive, extracted in sorted(self._archives.items()):
+            unsigned = sorted(name for name, path in extracted.items() if statuses.get(path) != STATUS_VERIFIED)
+            if unsigned:
+                self.log_message(f"✗ Archive {archive} left unchanged, {len(unsigned)} of {len(extracted)} members "
+                                 f"could not be signed: {', '.join(unsigned)}", error=True)
+                status = STATUS_FAILED
+            else:
+                started = time.perf_counter()
+                try:
+                    copied, replaced = rewrite_archive(archive, extracted)
+                    self.log_message(f"✓ Archive {os.path.basename(archive)}: {replaced} signed members replaced, "
+                                     f"{copied} entries copied unchanged")
+                    status = STATUS_VERIFIED
+                except ArchiveError as e:
+                    self.log_message(f"✗ Rewriting archive {archive} failed, it was left unchanged: {e}", error=True)
+                    status = STATUS_FAILED
+                self._observe("archive_rewrite", time.perf_counter() - started, [archive],
+                              size=_file_size(archive) if status == STATUS_VERIFIED else 0)
+            self.artifact_cache.record(archive, status == STATUS_VERIFIED)
+            self._report_status([archive], status)
+            results.append((archive, status))
+        return results
+    
+    def _cleanup_archives(self):
+        """Delete the extracted archive members of the last run"""
+        if self._archive_dir is not None:
+            shutil.rmtree(self._archive_dir, ignore_errors=True)
+        self._archive_dir = None
+        self._archives = {}
+        self._archive_members = {}
+    
+    def _stage_files(self, files, summary, workers):
+        """Copy the files to sign to local disk if staging is enabled
+        
+        Returns:
+            list: The paths to sign - local copies for staged files, the
+                originals for the others. Files that cannot be copied are
+                added to summary as failed.
+        """
+        mode = self.get_staging_mode()
+        if mode == "off" or not files:
+            return files
+        if mode == "network":
+            to_stage = [file_path for file_path in files if is_network_path(file_path)]
+        else:
+            to_stage = list(files)
+        if not to_stage:
+            return files
+        
+        started = time.perf_counter()
+        try:
+            self._staging = LocalStaging(self.settings.get("staging_dir") or None, workers=workers)
+        except OSError as e:
+            self.log_message(f"Cannot create staging directory, signing in place: {e}", error=True)
+            return files
+        staged, errors = self._staging.stage(to_stage)
+        self._staged = {staged_file.local: staged_file for staged_file in staged}
+        for file_path, error in errors:
+            self.log_message(f"✗ Cannot copy {file_path} to the staging directory: {error}", error=True)
+        failed = [file_path for file_path, error in errors]
+        summary.results.extend((file_path, STATUS_FAILED) for file_path in failed)
+        self._report_status(failed, STATUS_FAILED)
+        elapsed = time.perf_counter() - started
+        self._observe("stage_in", elapsed, [staged_file.original for staged_file in staged],
+                      size=sum(staged_file.size for staged_file in staged))
+        self.log_message(f"Staged {len(staged)} files in {self._staging.directory} ({elapsed:.1f}s)")
+        
+        local_paths = {staged_file.original: staged_file.local for staged_file in staged}
+        failed = set(failed)
+        return [local_paths.get(file_path, file_path) for file_path in files if file_path not in failed]
+    
+    def _run_sign_pipeline(self, files, summary, max_workers):
+        """Sign and verify files with the pipeline and add the results to summary"""
+        timestamp_pool = self.get_timestamp_pool()
+        if files and len(timestamp_pool.urls) > 1 and self.settings.get("timestamp_probe", True):
+            self._probe_timestamp_servers(timestamp_pool)
+        
+        files = self._order_files(files)
+        batches = self._make_sign_batches(files)
+        digest_mode = self.get_sign_mode() == "digest"
+        if digest_mode:
+            # Local hashing and embedding of all sign workers share one pool sized to the CPU
+            digest_workers = os.cpu_count() or 4
+            self._digest_pool = ThreadPoolExecutor(max_workers=digest_workers, thread_name_prefix="certum-digest")
+            self.log_message(f"Digest mode: hashing locally with {digest_workers} workers, "
+                             f"signing only digests remotely")
+        pipeline = SignVerifyPipeline(
+            self._sign_stage,
+            self._verify_stage,
+            sign_workers=min(max_workers, len(batches)),
+            verify_workers=self.get_int_setting("verify_workers", DEFAULT_VERIFY_WORKERS, 1, MAX_WORKERS_LIMIT),
+            queue_size=self.get_int_setting("verify_queue_size", DEFAULT_QUEUE_SIZE, 1, 10000),
+            observe=self._observe_queue_wait
+        )
+        self.log_message(f"Signing {len(files)} files ({pipeline.sign_stats.workers} sign workers, "
+                         f"{pipeline.verify_stats.workers} verify workers, {len(batches)} signtool calls)...")
+        limiter = self.get_rate_limiter()
+        if limiter.enabled:
+            self.log_message(f"Sign calls limited to {limiter.describe()}")
+        self.log_message("")
+        
+        try:
+            results = pipeline.run(batches)
+        except PipelineError as e:
+            # Files completed before or besides the failure keep their result
+            self.log_message(f"✗ Signing pipeline failed: {e}", error=True)
+            results = e.results
+        except Exception as e:
+            self.log_message(f"✗ Signing pipeline failed: {e}", error=True)
+            results = []
+        finally:
+            if digest_mode:
+                self._digest_pool.shutdown()
+                self._digest_pool = None
+        done = set()
+        for file_path, is_verified in results:
+            summary.results.append((self._original_path(file_path), STATUS_VERIFIED if is_verified else STATUS_FAILED))
+            done.add(file_path)
+        lost = [file_path for file_path in files if file_path not in done]
+        summary.results.extend((self._original_path(file_path), STATUS_FAILED) for file_path in lost)
+        self._report_status(lost, STATUS_FAILED)
+        summary.stage_summary = pipeline.summary_lines()
+    
+    def watch_folder(self, folder, stop_event, recursive=True, files_callback=None):
+        """Sign files as they appear in folder until stop_event is set
+        
+        New and changed signable files are signed once they settled (see
+        FolderWatcher), so signing overlaps with the build that writes them.
+        files_callback(files) is called with each batch before it is signed.
+        
+        Returns:
+            SigningSummary: All files signed while watching
+        """
+        interval = self.get_float_setting("watch_interval", DEFAULT_WATCH_INTERVAL, 0.1)
+        settle = self.get_float_setting("watch_settle", DEFAULT_WATCH_SETTLE)
+        watcher = FolderWatcher(folder, create_scanner(self.settings, recursive), interval=interval, settle=settle,
+                                include_existing=bool(self.settings.get("watch_include_existing", False)))
+        self.log_message(f"Watching {folder} ({'inotify' if watcher.uses_inotify else f'polling every {interval:g}s'}); "
+                         f"files are signed after {settle:g}s without changes")
+        
+        total = SigningSummary()
+        
+        def sign_settled(files):
+            self.log_message(f"{len(files)} new files in {folder}")
+            if files_callback is not None:
+                files_callback(files)
+            summary = self.sign_files(files)
+            # Signing rewrote the files; that is not a change to sign again
+            watcher.acknowledge(files)
+            total.results.extend(summary.results)
+            total.duration += summary.duration
+        
+        watcher.run(sign_settled, stop_event)
+        self.log_message(f"Stopped watching {folder}: {total.verified} verified, {total.failed} failed")
+        return total
+    
+    def verify_files(self, files):
+        """Verify the signatures of files without signing them
+        
+        Returns:
+            SigningSummary
+        """
+        started = time.perf_counter()
+        summary = SigningSummary()
+        self.metrics = RunMetrics()
+        files = sorted(files)
+        verify_workers = self.get_int_setting("verify_workers", DEFAULT_VERIFY_WORKERS, 1, MAX_WORKERS_LIMIT)
+        
+        self.log_message(f"Verifying {len(files)} files ({verify_workers} verify workers)...")
+        self._log_resolved_tool()
+        
+        def verify(file_path):
+            log = LogBlock(self.logger)
+            log(f"=" * 80)
+            log(f"Verifying: {file_path}")
+            is_verified, verify_msg = self._verify_signature(file_path, log=log)
+            if is_verified:
+                log(f"✓ VERIFIED: {os.path.basename(file_path)}")
+            else:
+                log(f"✗ NOT VERIFIED: {verify_msg}", error=True)
+            log.flush()
+            self._report_status([file_path], STATUS_VERIFIED if is_verified else STATUS_FAILED)
+            return is_verified
+        
+        with ThreadPoolExecutor(max_workers=verify_workers, thread_name_prefix="certum-verify") as pool:
+            for file_path, is_verified in zip(files, pool.map(verify, files)):
+                summary.results.append((file_path, STATUS_VERIFIED if is_verified else STATUS_FAILED))
+        
+        summary.duration = time.perf_counter() - started
+        self.log_message("=" * 80)
+        self.log_message(f"=== Verification Complete ===")
+        self.log_message(f"Verified: {summary.verified}")
+        self.log_message(f"Failed: {summary.failed}")
+        self._finish_metrics(summary)
+        self.log_message("=" * 80)
+        return summary
+    
+    def _sign_stage(self, file_paths):
+        """Sign stage of the pipeline: sign one batch of files
+        
+        A batch of several files is signed with one signtool call, or with the
+        digest workflow in digest mode. Files that signtool does not report as
+        signed (or all files, if the call itself fails) are retried one by one.
+        
+        Returns:
+            tuple: (to_verify, results) - (file_path, log) items for the
+                verify stage and (file_path, False) results for failed files
+        """
+        self._report_status(file_paths, STATUS_SIGNING)
+        if self._digest_pool is not None:
+            signed, retry = self._sign_digest_batch(file_paths)
+        elif len(file_paths) == 1:
+            signed, retry = [], list(file_paths)
+        else:
+            signed, retry = self._sign_batch(file_paths)
+        
+        to_verify = [(file_path, log) for file_path, log in signed]
+        results = []
+        for file_path in retry:
+            log = LogBlock(self.logger)
+            if self._sign_file(file_path, log):
+                to_verify.append((file_path, log))
+            else:
+                log.flush()
+                self.artifact_cache.record(file_path, False)
+                results.append((file_path, False))
+        self._report_status([file_path for file_path, log in to_verify], STATUS_SIGNED)
+        self._report_status([file_path for file_path, is_verified in results], STATUS_FAILED)
+        return to_verify, results
+    
+    def _sign_batch(self, file_paths):
+        """Sign several files with one signtool call
+        
+        Returns:
+            tuple: (signed, retry) - (file_path, log) for files signtool
+                reported as signed, and the files that need an individual retry
+        """
+        log = LogBlock(self.logger)
+        signed = set()
+        try:
+            log(f"=" * 80)
+            log(f"Processing batch of {len(file_paths)} files:")
+            for file_path in file_paths:
+                log(f"  {file_path}")
+            
+            result = self._run_sign_command(file_paths, log)
+            
+            signed, failed = parse_sign_output(result.stdout + "\n" + result.stderr, file_paths)
+            if result.returncode == 0 and not signed and not failed:
+                # Quiet output: signtool reports success for the whole call
+                signed = set(file_paths)
+                
+        except subprocess.TimeoutExpired:
+            log(f"✗ Timeout signing batch of {len(file_paths)} files", error=True)
+            log("")
+        except Exception as e:
+            log(f"✗ Error signing batch of {len(file_paths)} files: {e}", error=True)
+            log("")
+        
+        retry = [file_path for file_path in file_paths if file_path not in signed]
+        if retry:
+            log(f"Retrying {len(retry)} file(s) of the batch individually...")
+            log("")
+        log.flush()
+        
+        signed_items = []
+        for file_path in file_paths:
+            if file_path in signed:
+                file_log = LogBlock(self.logger)
+                file_log(f"=" * 80)
+                file_log(f"Signed in batch: {file_path}")
+                signed_items.append((file_path, file_log))
+        return signed_items, retry
+    
+    def _sign_file(self, file_path, log):
+        """Sign one file with its own signtool call
+        
+        Transient failures (timeouts, timestamp server, network, SimplySign
+        session) are retried with exponential backoff according to the retry
+        settings; permanent failures are not. A failover to another timestamp
+        server counts as an attempt, so a file costs at most retry_attempts
+        signtool calls.
+        
+        Returns:
+            bool: True if signtool reported success
+        """
+        log(f"=" * 80)
+        log(f"Processing: {file_path}")
+        
+        policy = self.get_retry_policy()
+        budget = AttemptBudget(policy.max_attempts)
+        while True:
+            kind, reason = self._sign_file_once(file_path, log, budget)
+            if kind is None:
+                return True
+            attempt = budget.used
+            if not policy.should_retry(attempt, kind):
+                if kind == FAILURE_PERMANENT:
+                    log(f"  Permanent failure ({reason}), not retrying", error=True)
+                else:
+                    log(f"  Giving up after {attempt} attempts ({reason})", error=True)
+                log("")
+                return False
+            delay = policy.delay(attempt)
+            self.metrics.count("sign_retries")
+            log(f"Transient failure ({reason}), retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1} of {policy.max_attempts})...")
+            log("")
+            time.sleep(delay)
+    
+    def _sign_file_once(self, file_path, log, budget=None):
+        """One signing attempt for a file
+        
+        budget (AttemptBudget) limits the timestamp server failovers of the
+        attempt and counts its signtool calls.
+        
+        Returns:
+            tuple: (None, None) on success, otherwise (failure kind, reason)
+                as returned by classify_failure
+        """
+        try:
+            # Execute signing
+            result = self._run_sign_command([file_path], log, budget=budget)
+            
+            # Check return code
+            if result.returncode != 0:
+                log(f"✗ Signtool failed for: {os.path.basename(file_path)}", error=True)
+                return classify_failure(result.returncode,
+                                        _strip_paths(result.stdout + "\n" + result.stderr, [file_path]))
+            return None, None
+                
+        except subprocess.TimeoutExpired as e:
+            log(f"✗ Timeout signing: {os.path.basename(file_path)} (after {e.timeout:.0f}s)", error=True)
+            return classify_failure(None, "", timed_out=True)
+        except FileNotFoundError:
+            log(f"✗ Error signing {os.path.basename(file_path)}: signtool.exe not found", error=True)
+            log(f"  Please install Windows SDK or configure the full path in Settings", error=True)
+            log(f"  Current command: {self.settings.get('signing_command', 'signtool')}", error=True)
+            return FAILURE_PERMANENT, "signtool not found"
+        except Exception as e:
+            log(f"✗ Error signing {os.path.basename(file_path)}: {e}", error=True)
+            return FAILURE_PERMANENT, str(e)
+    
+    def _run_sign_command(self, file_paths, log, command_builder=None, budget=None):
+        """Run "signtool sign" with failover between timestamp servers
+        
+        Each attempt goes to the healthiest server of the timestamp pool. An
+        attempt that signtool reports as a timestamp failure is repeated with
+        the next server, at most once per server; the outcome is recorded in
+        the pool's health statistics. A timeout says nothing about the
+        server (SimplySign or the upload may be what hangs), so it is raised
+        to the caller's retry policy and the server is not penalised. The
+        timeout is derived from the latencies of earlier calls (see
+        AdaptiveTimeout).
+        
+        command_builder(timestamp_server) builds another timestamping command
+        (e.g. "signtool timestamp") instead of the sign command. Each call is
+        taken from budget (AttemptBudget), if given; once it is used up
+        there is no further failover.
+        
+        Returns:
+            subprocess.CompletedProcess: Result of the last attempt
+        
+        Raises:
+            subprocess.TimeoutExpired: If the last attempt timed out
+        """
+        pool = self.get_timestamp_pool()
+        timeout = self._get_timeout(self.sign_timeouts, "sign_timeout", DEFAULT_SIGN_TIMEOUT, MAX_SIGN_TIMEOUT,
+                                    file_paths)
+        stage = "sign" if command_builder is None else "timestamp"
+        tried = []
+        while True:
+            server = pool.acquire(exclude=tried)
+            tried.append(server)
+            if command_builder is not None:
+                cmd = command_builder(server)
+            else:
+                cmd = self._build_sign_command(file_paths, log=log, timestamp_server=server)
+            log(f"Command: {' '.join(cmd)}")
+            log("")
+            
+            log(f"Executing signtool...")
+            # Only sign calls go to SimplySign; timestamping is not rate limited
+            limiter = self._admit_sign_call(file_paths, log) if command_builder is None else None
+            if budget is not None:
+                budget.take()
+            started = time.perf_counter()
+            try:
+                result = self._run_tool(cmd, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                pool.release(server)
+                self._observe(stage, time.perf_counter() - started, file_paths)
+                raise
+            except BaseException:
+                pool.release(server)
+                raise
+            finally:
+                if limiter is not None:
+                    limiter.release()
+            elapsed = time.perf_counter() - started
+            size = sum(_file_size(file_path) for file_path in file_paths) if result.returncode == 0 else 0
+            self._observe(stage, elapsed, file_paths, size=size)
+            
+            # Log the complete output
+            log(f"Return code: {result.returncode}")
+            if result.stdout:
+                log(f"Standard output:")
+                for line in result.stdout.strip().split('\n'):
+                    log(f"  {line}")
+            if result.stderr:
+                log(f"Standard error:")
+                for line in result.stderr.strip().split('\n'):
+                    log(f"  {line}")
+            log("")
+            
+            if result.returncode != 0 and TIMESTAMP_ERROR_RE.search(result.stdout + "\n" + result.stderr):
+                pool.record_failure(server, error="timestamp error")
+                if len(tried) < len(pool.urls) and (budget is None or budget.left):
+                    self.metrics.count("timestamp_failovers")
+                    log(f"✗ Timestamp server {server} failed, retrying with another server...", error=True)
+                    log("")
+                    continue
+            elif result.returncode == 0:
+                pool.record_success(server, elapsed / max(1, len(file_paths)))
+                self.sign_timeouts.record(elapsed, len(file_paths), size)
+                if command_builder is None:
+                    try:
+                        self.latency_history.record_call(file_paths, elapsed)
+                    except Exception as e:
+                        # The history only improves the order of later runs, it must never fail a sign
+                        log(f"Latency history not updated: {e}")
+            else:
+                pool.release(server)
+            return result
+    
+    def _sign_digest_batch(self, file_paths):
+        """Sign a batch with signtool's detached digest workflow
+        
+        1. /dg: hash every file locally (in parallel on the digest pool)
+        2. /ds: sign all digests of the batch with one remote call
+        3. /di: embed each signature into its file (locally, in parallel)
+        4. signtool timestamp: timestamp the batch via the timestamp pool
+        
+        Only the small digest files go through SimplySign, so reading large
+        files no longer holds up the cloud signing session.
+        
+        Returns:
+            tuple: (signed, retry) like _sign_batch; files that fail any step
+                are retried with a regular sign call
+        """
+        log = LogBlock(self.logger)
+        log(f"=" * 80)
+        log(f"Processing {len(file_paths)} file(s) in digest mode:")
+        for file_path in file_paths:
+            log(f"  {file_path}")
+        
+        signed = []
+        work_dir = tempfile.mkdtemp(prefix="certum-digest-")
+        try:
+            # One directory per file, so equal file names in a batch do not collide
+            digest_dirs = {}
+            for index, file_path in enumerate(file_paths):
+                digest_dirs[file_path] = os.path.join(work_dir, str(index))
+                os.mkdir(digest_dirs[file_path])
+            digest_files = {
+                file_path: os.path.join(digest_dirs[file_path], os.path.basename(file_path) + ".dig")
+                for file_path in file_paths
+            }
+            
+            hashed = self._run_local_step("Generating digests", "digest_hash", {
+                file_path: self._build_digest_command("generate", [file_path], digest_dir=digest_dirs[file_path])
+                for file_path in file_paths
+            }, log)
+            hashed = [file_path for file_path in hashed if os.path.exists(digest_files[file_path])]
+            
+            if hashed:
+                sign_cmd = self._build_digest_command("sign", [digest_files[file_path] for file_path in hashed])
+                log(f"Signing {len(hashed)} digest(s) remotely...")
+                log(f"Command: {' '.join(sign_cmd)}")
+                limiter = self._admit_sign_call(hashed, log)
+                started = time.perf_counter()
+                try:
+                    result = self._run_tool(
+                        sign_cmd,
+                        timeout=self._get_timeout(self.sign_timeouts, "sign_timeout", DEFAULT_SIGN_TIMEOUT,
+                                                  MAX_SIGN_TIMEOUT, [digest_files[path] for path in hashed])
+                    )
+                    log(f"Return code: {result.returncode}")
+                    for line in (result.stdout + result.stderr).strip().splitlines():
+                        log(f"  {line}")
+                except subprocess.TimeoutExpired:
+                    log(f"✗ Timeout signing digests", error=True)
+                finally:
+                    limiter.release()
+                self._observe("digest_sign", time.perf_counter() - started, hashed)
+            digest_signed = [file_path for file_path in hashed if os.path.exists(digest_files[file_path] + ".signed")]
+            
+            embedded = self._run_local_step("Embedding signatures", "digest_embed", {
+                file_path: self._build_digest_command("ingest", [file_path], digest_dir=digest_dirs[file_path])
+                for file_path in digest_signed
+            }, log)
+            
+            if embedded:
+                log(f"Timestamping {len(embedded)} file(s)...")
+                result = self._run_sign_command(
+                    embedded, log,
+                    command_builder=lambda server: self._build_digest_command("timestamp", embedded,
+                                                                              timestamp_server=server)
+                )
+                timestamped, failed = parse_sign_output(result.stdout + "\n" + result.stderr, embedded,
+                                                        success_re=TIMESTAMPED_LINE_RE)
+                if result.returncode == 0 and not timestamped and not failed:
+                    timestamped = set(embedded)
+                signed = [file_path for file_path in embedded if file_path in timestamped]
+        except subprocess.TimeoutExpired:
+            log(f"✗ Timeout timestamping batch of {len(file_paths)} files", error=True)
+        except Exception as e:
+            log(f"✗ Error in digest signing of {len(file_paths)} files: {e}", error=True)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        retry = [file_path for file_path in file_paths if file_path not in signed]
+        if retry:
+            log(f"Signing {len(retry)} file(s) again with a regular sign call...")
+        log("")
+        log.flush()
+        
+        signed_items = []
+        for file_path in signed:
+            file_log = LogBlock(self.logger)
+            file_log(f"=" * 80)
+            file_log(f"Signed via digest: {file_path}")
+            signed_items.append((file_path, file_log))
+        return signed_items, retry
+    
+    def _run_local_step(self, step, stage, commands, log):
+        """Run one local signtool command per file on the digest pool
+        
+        Args:
+            step: Name of the step for the log
+            stage: Name of the step in the run metrics
+            commands: {file_path: command}
+        
+        Returns:
+            list: Files whose command succeeded, in the order of commands
+        """
+        def run(item):
+            file_path, cmd = item
+            started = time.perf_counter()
+            try:
+                result = self._run_tool(
+                    cmd,
+                    timeout=self._get_timeout(self.sign_timeouts, "sign_timeout", DEFAULT_SIGN_TIMEOUT,
+                                              MAX_SIGN_TIMEOUT, [file_path])
+                )
+                ok, output = result.returncode == 0, (result.stdout + result.stderr).strip()
+            except subprocess.TimeoutExpired:
+                ok, output = False, "timeout"
+            except Exception as e:
+                ok, output = False, str(e)
+            self._observe(stage, time.perf_counter() - started, [file_path], size=_file_size(file_path) if ok else 0)
+            return file_path, ok, output
+        
+        succeeded = []
+        for file_path, ok, output in self._digest_pool.map(run, commands.items()):
+            if ok:
+                succeeded.append(file_path)
+            else:
+                log(f"✗ {step} failed for {os.path.basename(file_path)}: {output}", error=True)
+        log(f"{step}: {len(succeeded)} of {len(commands)} file(s) done")
+        return succeeded
+    
+    def _verify_stage(self, item):
+        """Verify stage of the pipeline: verify one signed file
+        
+        Writes the file's log block and records the result in the signing cache.
+        
+        Returns:
+            tuple: (file_path, is_verified)
+        """
+        file_path, log = item
+        try:
+            log(f"Signtool reported success for: {os.path.basename(file_path)}")
+            
+            # Verify the signature
+            log(f"Verifying signature...")
+            is_verified, verify_msg = self._verify_signature(file_path, log=log)
+            
+            if is_verified:
+                log(f"✓ VERIFIED: File is properly signed: {os.path.basename(file_path)}")
+            else:
+                log(f"✗ VERIFICATION FAILED: Signature not valid!", error=True)
+                log(f"  Verification output: {verify_msg}", error=True)
+                log(f"  WARNING: File may appear signed but signature is invalid!", error=True)
+            staged_file = self._staged.get(file_path)
+            if staged_file is not None and is_verified:
+                started = time.perf_counter()
+                try:
+                    self._staging.write_back(staged_file)
+                    log(f"Written back to {staged_file.original}")
+                except OSError as e:
+                    is_verified = False
+                    log(f"✗ WRITE-BACK FAILED, {staged_file.original} was left unchanged: {e}", error=True)
+                self._observe("write_back", time.perf_counter() - started, [file_path],
+                              size=staged_file.size if is_verified else 0)
+            log("")
+        finally:
+            log.flush()
+        self.artifact_cache.record(self._original_path(file_path), is_verified)
+        self._report_status([file_path], STATUS_VERIFIED if is_verified else STATUS_FAILED)
+        return file_path, is_verified
+    
+    def _fan_out_copies(self, copies, results, workers):
+        """Copy signed representatives over their identical copies
+        
+        Each copy is written atomically and then checked in-process: its
+        embedded signature must be in the same state as the representative's.
+        Copies of files that failed fail as well.
+        
+        Args:
+            copies: {representative: [identical copies]}
+            results: {file_path: status} of the signed files
+        
+        Returns:
+            list: (file_path, status) for every copy
+        """
+        def copy(item):
+            source, target = item
+            try:
+                copy_atomic(source, target)
+                if (os.path.getsize(target) != os.path.getsize(source)
+                        or pe_reader.check_signature(target)[0] != pe_reader.check_signature(source)[0]):
+                    raise OSError("copy does not match the signed file")
+            except OSError as e:
+                self.log_message(f"✗ Copying signed {os.path.basename(source)} to {target} failed: {e}", error=True)
+                return False
+            self.artifact_cache.record(target, True)
+            return True
+        
+        fan_out = []
+        fan_out_results = []
+        for source, targets in sorted(copies.items()):
+            if results.get(source) == STATUS_VERIFIED:
+                fan_out.extend((source, target) for target in targets)
+            else:
+                fan_out_results.extend((target, STATUS_FAILED) for target in targets)
+                self._report_status(targets, STATUS_FAILED)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="certum-copy") as pool:
+            for (source, target), copied in zip(fan_out, pool.map(copy, fan_out)):
+                status = STATUS_VERIFIED if copied else STATUS_FAILED
+                fan_out_results.append((target, status))
+                self._report_status([target], status)
+        if fan_out:
+            self.log_message(f"Copied {sum(1 for target, status in fan_out_results if status == STATUS_VERIFIED)} "
+                             f"signed duplicates instead of signing them again")
+        return fan_out_results
+    
+    def _save_signing_cache(self):
+        """Compact and persist the signing cache after a run"""
+        try:
+            removed = self.artifact_cache.compact()
+            if removed:
+                self.log_message(f"Signing cache: removed {removed} stale entries")
+            self.artifact_cache.save()
+        except OSError as e:
+            self.log_message(f"Failed to save signing cache: {e}", error=True)
+    
+    def _has_intact_signature(self, file_path):
+        """Pre-scan check: does the file already carry a signature matching its content?
+        
+        Only PE files can be checked in-process; MSI/CAB files always need signing.
+        """
+        try:
+            status, info = pe_reader.check_signature(file_path)
+        except OSError:
+            return False
+        return status == pe_reader.STATUS_SIGNED
+    
+    def _verify_signature(self, file_path, log=None):
+        """Verify that a file is properly signed
+        
+        PE files are first checked in-process (signature present and matching
+        the file content), which catches missing or stale signatures without
+        starting a process. With "verify_mode" set to "quick" that check is the
+        whole verification; otherwise signtool verify validates the full chain.
+        
+        Always uses signtool.exe for verification, regardless of the signing tool used.
+        SimplySignDesktop.exe doesn't support verification commands.
+        
+        Args:
+            file_path: File to verify
+            log: Optional log callable (defaults to log_message), used by
+                workers to keep a file's output together
+        
+        Returns:
+            tuple: (is_valid: bool, message: str)
+        """
+        log = log or self.log_message
+        try:
+            # Cheap sanity check of the embedded Authenticode signature
+            status, info = pe_reader.check_signature(file_path)
+            if info is not None:
+                log(f"Embedded signature: {info.describe()}")
+            if status == pe_reader.STATUS_UNSIGNED:
+                return False, "No Authenticode signature embedded in file"
+            if status == pe_reader.STATUS_STALE:
+                return False, "Embedded signature does not match the file content (stale signature)"
+            if status == pe_reader.STATUS_INVALID:
+                log("Embedded signature could not be parsed, relying on signtool verify")
+            if status == pe_reader.STATUS_SIGNED and self.settings.get("verify_mode", "full") == "quick":
+                return True, "Embedded signature matches the file content (certificate chain not validated)"
+            
+            # Always use signtool for verification, even if user configured a different signing tool
+            # SimplySignDesktop.exe doesn't support the verify command
+            verify_tool = self.get_verify_tool()
+            
+            # Build verify command (using Certum's official verification parameters)
+            verify_cmd = [
+                verify_tool,
+                "verify",
+                "/pa",   # Verify using default authentication verification policy
+                "/all",  # Verify all signatures (Certum official documentation)
+                "/v",    # Verbose output
+                file_path
+            ]
+            
+            log(f"Verify command: {' '.join(verify_cmd)}")
+            
+            policy = self.get_retry_policy()
+            attempt = 1
+            while True:
+                # Execute verification
+                timeout = self._get_timeout(self.verify_timeouts, "verify_timeout", DEFAULT_VERIFY_TIMEOUT,
+                                            MAX_VERIFY_TIMEOUT, [file_path])
+                started = time.perf_counter()
+                try:
+                    result = self._run_tool(verify_cmd, timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    self._observe("verify", time.perf_counter() - started, [file_path])
+                    kind, reason = classify_failure(None, "", timed_out=True)
+                    if not policy.should_retry(attempt, kind):
+                        return False, f"Verification timeout after {timeout:.0f}s"
+                else:
+                    elapsed = time.perf_counter() - started
+                    size = _file_size(file_path)
+                    self._observe("verify", elapsed, [file_path], size=size if result.returncode == 0 else 0)
+                    # Log verification output
+                    if result.stdout:
+                        log(f"Verification output:")
+                        for line in result.stdout.strip().split('\n'):
+                            log(f"  {line}")
+                    if result.stderr:
+                        log(f"Verification errors:")
+                        for line in result.stderr.strip().split('\n'):
+                            log(f"  {line}")
+                    
+                    # Check if verification succeeded
+                    if result.returncode == 0:
+                        self.verify_timeouts.record(elapsed, 1, size)
+                        # Additional check: look for "Successfully verified" in output
+                        if "Successfully verified" in result.stdout:
+                            return True, "Signature verified successfully"
+                        else:
+                            return False, "Verification returned success but confirmation not found in output"
+                    
+                    # e.g. revocation lists that could not be downloaded
+                    kind, reason = classify_failure(
+                        result.returncode, _strip_paths(result.stdout + "\n" + result.stderr, [file_path]))
+                    if not policy.should_retry(attempt, kind):
+                        return False, result.stdout + "\n" + result.stderr
+                
+                delay = policy.delay(attempt)
+                self.metrics.count("verify_retries")
+                log(f"Verification failed ({reason}), retrying in {delay:.1f}s "
+                    f"(attempt {attempt + 1} of {policy.max_attempts})...")
+                time.sleep(delay)
+                attempt += 1
+                
+        except FileNotFoundError:
+            return False, "signtool.exe not found for verification - install Windows SDK"
+        except Exception as e:
+            return False, f"Verification error: {str(e)}"
+    
+    def _build_digest_command(self, stage, file_paths, digest_dir=None, timestamp_server=None):
+        """Build one command of the detached digest workflow
+        
+        Args:
+            stage: "generate" (/dg), "sign" (/ds), "ingest" (/di) or "timestamp"
+            file_paths: Files (for "sign": the .dig files) the command works on
+            digest_dir: Directory for the digest files of "generate" and "ingest"
+            timestamp_server: Server for "timestamp" (default: first configured)
+        """
+        signing_tool = self.get_signing_tool()
+        if stage == "generate":
+            cmd = [signing_tool, "sign", "/dg", digest_dir, "/fd", "sha256", "/a"]
+        elif stage == "sign":
+            cmd = [signing_tool, "sign", "/ds", "/fd", "sha256", "/a"]
+        elif stage == "ingest":
+            cmd = [signing_tool, "sign", "/di", digest_dir]
+        elif stage == "timestamp":
+            timestamp_server = timestamp_server or get_timestamp_servers(self.settings)[0]
+            cmd = [signing_tool, "timestamp", "/tr", timestamp_server, "/td", "sha256"]
+        else:
+            raise ValueError(f"unknown digest stage: {stage}")
+        return cmd + list(file_paths)
+    
+    def _build_sign_command(self, file_path, log=None, timestamp_server=None):
+        """Build the signing command
+        
+        file_path may also be a list of files, which signtool signs in one call
+        (batch mode). timestamp_server defaults to the first configured server;
+        signing runs pass the server chosen by the timestamp pool.
+        
+        Based on Certum's official documentation, there are two approaches:
+        1. Use /a to auto-select certificate (current implementation - works with SimplySign Desktop)
+        2. Use /sha1 <thumbprint> to specify exact certificate
+        
+        Current implementation uses /a which is simpler and works well with SimplySign Desktop.
+        Reference: CS-Code_Signing_in_the_Cloud_Signtool_jarsigner_signing.pdf
+        
+        IMPORTANT: You should use signtool.exe, NOT SimplySignDesktop.exe for signing.
+        signtool automatically integrates with SimplySign Desktop when you have it installed.
+        """
+        # This builds the command for Certum SimplySign
+        # Default command uses signtool which integrates with SimplySign Desktop
+        
+        log = log or self.log_message
+        signing_tool = self.get_signing_tool()
+        timestamp_server = timestamp_server or get_timestamp_servers(self.settings)[0]
+        
+        # Warn if user configured SimplySignDesktop.exe directly
+        if "simplysign" in signing_tool.lower() and "simplysigndesktop.exe" in signing_tool.lower():
+            log("=" * 80, error=True)
+            log("⚠ WARNING: You configured SimplySignDesktop.exe as the signing tool!", error=True)
+            log("", error=True)
+            log("SimplySignDesktop.exe does NOT accept signtool command-line parameters!", error=True)
+            log("This will likely result in files NOT being signed.", error=True)
+            log("", error=True)
+            log("CORRECT CONFIGURATION:", error=True)
+            log("  Use 'signtool' or the full path to signtool.exe", error=True)
+            log("  signtool automatically integrates with SimplySign Desktop", error=True)
+            log("", error=True)
+            log("To fix:", error=True)
+            log("  1. Go to File → Settings", error=True)
+            log("  2. Change 'Signing Command' to: signtool", error=True)
+            log("  3. Or use full path: C:\\Program Files (x86)\\Windows Kits\\10\\bin\\...\\signtool.exe", error=True)
+            log("=" * 80, error=True)
+            log("")
+        
+        # Standard signtool command that works with SimplySign Desktop
+        cmd = [
+            signing_tool,
+            "sign",
+            "/tr", timestamp_server,
+            "/td", "sha256",
+            "/fd", "sha256",
+            "/a",  # Select the best signing cert automatically
+        ]
+        if isinstance(file_path, (list, tuple)):
+            cmd.extend(file_path)
+        else:
+            cmd.append(file_path)
+        
+        return cmd
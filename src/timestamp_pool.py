@@ -0,0 +1,259 @@
+"""
+Pool of RFC 3161 timestamp servers
+
+Every signtool call sends its signature to a timestamp server (/tr). With a
+single server, one slow or rate-limiting endpoint stalls every file until the
+signtool timeout. The pool tracks each configured server's latency
+(exponentially weighted moving average) and error rate. It hands out the
+server with the best score, and takes servers that keep failing out of
+rotation with a circuit breaker:
+
+- closed: the server is used normally
+- open: after failure_threshold consecutive failures the server is skipped
+  for cooldown seconds
+- half-open: after the cooldown one call is let through as a trial; success
+  closes the circuit, failure opens it again for twice the cooldown (up to
+  max_cooldown)
+
+probe() sends a real TimeStampReq to a server, so the pool can be warmed up
+(and tested against a local stub TSA) without signing anything.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from .pe_reader import PEFormatError, der_children, der_item
+
+
+DEFAULT_TIMESTAMP_SERVER = "http://time.certum.pl"
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+DEFAULT_PROBE_TIMEOUT = 10.0
+EWMA_ALPHA = 0.3
+# Seconds added to a server's score per consecutive failure, so a server that
+# just failed is avoided while others still answer
+FAILURE_PENALTY = 10.0
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half-open"
+
+# DER prefix of AlgorithmIdentifier { id-sha256, NULL }
+_SHA256_ALGORITHM = bytes.fromhex("300d06096086480165030402010500")
+
+
+def _der(tag, content):
+    length = len(content)
+    if length < 0x80:
+        header = bytes([tag, length])
+    else:
+        size = (length.bit_length() + 7) // 8
+        header = bytes([tag, 0x80 | size]) + length.to_bytes(size, "big")
+    return header + content
+
+
+def build_timestamp_request(digest, nonce=None):
+    """Build a DER TimeStampReq for a SHA-256 message digest"""
+    message_imprint = _der(0x30, _SHA256_ALGORITHM + _der(0x04, digest))
+    content = _der(0x02, b"\x01") + message_imprint
+    if nonce is not None:
+        content += _der(0x02, nonce.to_bytes(8, "big").lstrip(b"\0") or b"\0")
+    content += _der(0x01, b"\xff")  # certReq
+    return _der(0x30, content)
+
+
+def parse_timestamp_status(data):
+    """Return the PKIStatus of a DER TimeStampResp (0 = granted, 1 = with mods)
+
+    Raises:
+        ValueError: If the response is not a TimeStampResp
+    """
+    tag, start, end = der_item(data, 0)
+    children = der_children(data, start, end) if tag == 0x30 else []
+    if not children or children[0][0] != 0x30:
+        raise PEFormatError("not a TimeStampResp")
+    status_info = der_children(data, children[0][1], children[0][2])
+    if not status_info or status_info[0][0] != 0x02:
+        raise PEFormatError("TimeStampResp without status")
+    return int.from_bytes(bytes(data[status_info[0][1]:status_info[0][2]]), "big")
+
+
+class ServerHealth:
+    """Latency, error and circuit-breaker state of one timestamp server"""
+
+    def __init__(self, url):
+        self.url = url
+        self.latency = None
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.state = CIRCUIT_CLOSED
+        self.open_until = 0.0
+        self.cooldown = 0.0
+        self.last_error = None
+
+    @property
+    def error_rate(self):
+        total = self.successes + self.failures
+        return self.failures / total if total else 0.0
+
+    def score(self):
+        """Lower is better: expected latency, inflated by errors and load"""
+        latency = self.latency if self.latency is not None else 0.0
+        return ((latency + 0.1) * (1 + 4 * self.error_rate) * (1 + self.in_flight)
+                + FAILURE_PENALTY * self.consecutive_failures)
+
+    def describe(self):
+        latency = f"{self.latency:.2f}s" if self.latency is not None else "n/a"
+        return (f"{self.url}: {self.state}, latency {latency}, "
+                f"{self.successes} ok / {self.failures} failed")
+
+
+class TimestampServerPool:
+    """Chooses timestamp servers by health, with failover and circuit breaking
+
+    Args:
+        urls: Timestamp server URLs in order of preference
+        failure_threshold: Consecutive failures that open a server's circuit
+        cooldown: Seconds an opened circuit stays open before a trial call
+        clock: Time source (time.monotonic), replaceable in tests
+    """
+
+    def __init__(self, urls, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN,
+                 clock=time.monotonic):
+        urls = [url for url in dict.fromkeys(url.strip() for url in urls) if url]
+        if not urls:
+            raise ValueError("at least one timestamp server is required")
+        self.servers = [ServerHealth(url) for url in urls]
+        self._by_url = {server.url: server for server in self.servers}
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    @property
+    def urls(self):
+        return [server.url for server in self.servers]
+
+    def acquire(self, exclude=()):
+        """Pick the healthiest server for one call and mark it in flight
+
+        Servers in exclude (e.g. ones that just failed for this call) are only
+        used if nothing else is left. If every circuit is open, the server
+        whose cooldown ends first is tried anyway, since signing without a
+        timestamp is not an option. Every acquire() must be followed by
+        record_success() or record_failure().
+        """
+        with self._lock:
+            now = self.clock()
+            candidates = []
+            for position, server in enumerate(self.servers):
+                if server.state == CIRCUIT_OPEN and now >= server.open_until:
+                    server.state = CIRCUIT_HALF_OPEN
+                if server.state == CIRCUIT_OPEN:
+                    continue
+                if server.state == CIRCUIT_HALF_OPEN and server.in_flight:
+                    continue  # only one trial call at a time
+                candidates.append((server.url in exclude, server.score(), position, server))
+            if candidates:
+                server = min(candidates, key=lambda candidate: candidate[:3])[3]
+            else:
+                server = min(self.servers, key=lambda server: (server.url in exclude, server.open_until))
+            server.in_flight += 1
+            return server.url
+
+    def record_success(self, url, latency):
+        """Record a successful call that took latency seconds"""
+        with self._lock:
+            server = self._by_url.get(url)
+            if server is None:
+                return
+            server.in_flight = max(0, server.in_flight - 1)
+            server.successes += 1
+            server.consecutive_failures = 0
+            server.latency = latency if server.latency is None else (
+                EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * server.latency)
+            server.state = CIRCUIT_CLOSED
+            server.cooldown = 0.0
+            server.last_error = None
+
+    def record_failure(self, url, error=None, latency=None):
+        """Record a failed call; may open the server's circuit
+
+        Returns:
+            bool: True if the circuit was opened by this failure
+        """
+        with self._lock:
+            server = self._by_url.get(url)
+            if server is None:
+                return False
+            server.in_flight = max(0, server.in_flight - 1)
+            server.failures += 1
+            server.consecutive_failures += 1
+            server.last_error = error
+            if latency is not None:
+                server.latency = latency if server.latency is None else (
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * server.latency)
+            if server.state == CIRCUIT_HALF_OPEN or server.consecutive_failures >= self.failure_threshold:
+                if server.state == CIRCUIT_HALF_OPEN:
+                    server.cooldown = min(max(server.cooldown, self.base_cooldown) * 2, MAX_COOLDOWN)
+                else:
+                    server.cooldown = self.base_cooldown
+                server.state = CIRCUIT_OPEN
+                server.open_until = self.clock() + server.cooldown
+                return True
+            return False
+
+    def release(self, url):
+        """Give a server back without recording a result (e.g. signing failed for other reasons)"""
+        with self._lock:
+            server = self._by_url.get(url)
+            if server is not None:
+                server.in_flight = max(0, server.in_flight - 1)
+
+    def probe(self, url, timeout=DEFAULT_PROBE_TIMEOUT):
+        """Send a TimeStampReq to one server and record the outcome
+
+        Returns:
+            tuple: (ok, message)
+        """
+        with self._lock:
+            server = self._by_url.get(url)
+            if server is not None:
+                server.in_flight += 1
+        request = urllib.request.Request(
+            url,
+            data=build_timestamp_request(hashlib.sha256(os.urandom(16)).digest(),
+                                         nonce=int.from_bytes(os.urandom(8), "big")),
+            headers={"Content-Type": "application/timestamp-query"}
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                body = response.read()
+            status = parse_timestamp_status(body)
+            if status not in (0, 1):
+                raise ValueError(f"timestamp request rejected (status {status})")
+        except (OSError, ValueError) as e:
+            if isinstance(e, urllib.error.HTTPError):
+                message = f"HTTP {e.code} {e.reason}"
+            elif isinstance(e, urllib.error.URLError):
+                message = str(e.reason)
+            else:
+                message = str(e)
+            self.record_failure(url, error=message)
+            return False, message
+        latency = time.perf_counter() - started
+        self.record_success(url, latency)
+        return True, f"{latency * 1000:.0f} ms"
+
+    def summary_lines(self):
+        """One status line per server for the end-of-run summary"""
+        with self._lock:
+            return [server.describe() for server in self.servers]
@@ -0,0 +1,205 @@
+"""
+Discovery of the installed signtool binaries
+
+signtool.exe ships with every Windows SDK, in one folder per SDK version and
+architecture:
+
+    Windows Kits\\10\\bin\\10.0.22621.0\\x64\\signtool.exe
+    Windows Kits\\10\\bin\\x64\\signtool.exe          (early Windows 10 SDKs)
+    Windows Kits\\8.1\\bin\\x64\\signtool.exe
+
+ToolchainResolver lists these folders once, sorts the installations by SDK
+version (newest first) and by how well the architecture fits the machine,
+and keeps the result in memory and in a small JSON cache file. The cache is
+reused as long as the modification times of the Kits and bin folders are
+unchanged, i.e. until an SDK is installed or removed.
+"""
+
+import json
+import os
+import platform
+import threading
+
+
+TOOLCHAIN_CACHE_FILE_NAME = "certum_signer_toolchain.json"
+SIGNTOOL_NAME = "signtool.exe"
+KIT_VERSIONS = ("10", "8.1")
+ARCHITECTURES = ("x64", "x86", "arm64", "arm")
+
+# Best architecture first, by the machine's architecture
+_ARCH_PREFERENCE = {
+    "x64": ("x64", "x86"),
+    "arm64": ("arm64", "x64", "x86"),
+    "x86": ("x86",),
+}
+
+
+def default_kits_roots():
+    """The Windows Kits folders under Program Files"""
+    roots = []
+    for variable, fallback in (("ProgramFiles(x86)", r"C:\Program Files (x86)"),
+                               ("ProgramFiles", r"C:\Program Files")):
+        root = os.path.join(os.environ.get(variable, fallback), "Windows Kits")
+        if root not in roots:
+            roots.append(root)
+    return roots
+
+
+def machine_architecture():
+    """Architecture of this machine in SDK folder naming (x64, x86, arm64)"""
+    machine = platform.machine().lower()
+    if machine in ("amd64", "x86_64"):
+        return "x64"
+    if machine in ("arm64", "aarch64"):
+        return "arm64"
+    return "x86"
+
+
+def _parse_version(name):
+    """(10, 0, 22621, 0) for "10.0.22621.0", None if name is not a version"""
+    parts = name.split(".")
+    if not all(part.isdigit() for part in parts):
+        return None
+    return tuple(int(part) for part in parts)
+
+
+def _subdirectories(path):
+    try:
+        with os.scandir(path) as entries:
+            return [entry.name for entry in entries if entry.is_dir()]
+    except OSError:
+        return []
+
+
+class SigntoolInstall:
+    """One signtool.exe with its SDK version and architecture"""
+
+    def __init__(self, path, version, arch):
+        self.path = path
+        self.version = tuple(version)
+        self.arch = arch
+
+    @property
+    def version_text(self):
+        return ".".join(str(part) for part in self.version)
+
+    def to_dict(self):
+        return {"path": self.path, "version": list(self.version), "arch": self.arch}
+
+    def __repr__(self):
+        return f"SigntoolInstall({self.path!r}, {self.version_text}, {self.arch})"
+
+
+def discover_signtools(kits_roots):
+    """Find all signtool installations below the given Windows Kits folders
+
+    Returns:
+        list: SigntoolInstall, unsorted
+    """
+    installs = []
+    for root in kits_roots:
+        for kit in KIT_VERSIONS:
+            bin_dir = os.path.join(root, kit, "bin")
+            kit_version = _parse_version(kit)
+            for name in _subdirectories(bin_dir):
+                if name.lower() in ARCHITECTURES:
+                    candidates = [(os.path.join(bin_dir, name), kit_version, name.lower())]
+                else:
+                    version = _parse_version(name)
+                    if version is None:
+                        continue
+                    version_dir = os.path.join(bin_dir, name)
+                    candidates = [(os.path.join(version_dir, arch), version, arch.lower())
+                                  for arch in _subdirectories(version_dir) if arch.lower() in ARCHITECTURES]
+                for folder, version, arch in candidates:
+                    path = os.path.join(folder, SIGNTOOL_NAME)
+                    if os.path.isfile(path):
+                        installs.append(SigntoolInstall(path, version, arch))
+    return installs
+
+
+class ToolchainResolver:
+    """Cached, version-aware lookup of signtool.exe
+
+    Args:
+        cache_file: JSON file for the discovered installations (None = only
+            cache in memory)
+        kits_roots: Windows Kits folders to search (default: Program Files)
+        arch: Preferred architecture (default: the machine's)
+    """
+
+    def __init__(self, cache_file=None, kits_roots=None, arch=None):
+        self.cache_file = cache_file
+        self.kits_roots = list(kits_roots) if kits_roots is not None else default_kits_roots()
+        self.arch = arch or machine_architecture()
+        self._installs = None
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _directory_stamp(self):
+        """Modification times of the folders that change when an SDK is (un)installed"""
+        stamp = {}
+        for root in self.kits_roots:
+            for path in [root] + [os.path.join(root, kit, "bin") for kit in KIT_VERSIONS]:
+                try:
+                    stamp[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    stamp[path] = None
+        return stamp
+
+    def _sort_key(self, install):
+        preference = _ARCH_PREFERENCE.get(self.arch, (self.arch,))
+        arch_rank = preference.index(install.arch) if install.arch in preference else len(preference)
+        # Pad "10" (unversioned Windows 10 SDK folder) to 10.0.0.0, so it sorts below 10.0.x
+        version = (tuple(install.version) + (0, 0, 0, 0))[:4]
+        # Installations this machine cannot run go last, whatever their version
+        return (arch_rank == len(preference), tuple(-part for part in version), arch_rank)
+
+    def _load_cache(self, stamp):
+        if not self.cache_file:
+            return None
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("roots") != self.kits_roots or data.get("stamp") != stamp:
+                return None
+            return [SigntoolInstall(item["path"], item["version"], item["arch"]) for item in data["installs"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_cache(self, stamp, installs):
+        if not self.cache_file:
+            return
+        data = {"roots": self.kits_roots, "stamp": stamp, "installs": [install.to_dict() for install in installs]}
+        temp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_file, self.cache_file)
+        except OSError:
+            pass  # the cache only saves time
+
+    def installations(self, refresh=False):
+        """All signtool installations, best first
+
+        Discovery runs once per resolver; the cache file is used while the
+        Kits folders are unchanged. refresh=True checks the folders again.
+        """
+        with self._lock:
+            if self._installs is not None and not refresh:
+                return list(self._installs)
+            stamp = self._directory_stamp()
+            if self._installs is not None and stamp == self._stamp:
+                return list(self._installs)
+            installs = self._load_cache(stamp)
+            if installs is None or not all(os.path.isfile(install.path) for install in installs):
+                installs = discover_signtools(self.kits_roots)
+                self._save_cache(stamp, installs)
+            self._installs = sorted(installs, key=self._sort_key)
+            self._stamp = stamp
+            return list(self._installs)
+
+    def best(self, refresh=False):
+        """Path of the newest signtool.exe for this machine, or None"""
+        installs = self.installations(refresh=refresh)
+        return installs[0].path if installs else None
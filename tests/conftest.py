@@ -0,0 +1,18 @@
+"""
+Shared fixtures for CertumSigner tests
+"""
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path to allow importing src module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tests.fake_signtool import write_launcher
+
+
+@pytest.fixture
+def fake_signtool(tmp_path):
+    """Path to an executable launcher for tests/fake_signtool.py"""
+    return write_launcher(str(tmp_path))
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Fake signtool for tests
+
+Mimics the parts of signtool.exe that CertumSigner uses, so the signing logic
+can be exercised on any platform without the Windows SDK or SimplySign:
+
+    fake_signtool.py sign [options] <file> [<file> ...]
+    fake_signtool.py sign /dg <dir> | /ds | /di <dir> [options] <file> [...]
+    fake_signtool.py timestamp /tr <url> [options] <file> [<file> ...]
+    fake_signtool.py verify [options] <file>
+
+"Signing" a PE image embeds a fake Authenticode signature the way signtool
+does (a WIN_CERTIFICATE in the certificate table, see tests/pe_samples.py),
+so the in-process check of src/pe_reader.py sees a signature that matches
+the file; any other file gets a marker appended. "Verifying" checks for
+either. Files whose
+name contains "fail" cannot be signed, "locked" files fail as if another
+process held them open, and "flaky" files fail once with a lost SimplySign
+session before they can be signed. The digest workflow writes <name>.dig
+(/dg), signs it into <name>.dig.signed (/ds) and embeds the marker once that
+file exists (/di); "timestamp" only contacts the TSA. Behaviour can be tuned via environment
+variables:
+
+    FAKE_SIGNTOOL_DELAY   seconds to sleep per signed file (default 0)
+    FAKE_SIGNTOOL_STARTUP seconds to sleep once per call, like signtool
+                          loading the SimplySign CSP (default 0)
+    FAKE_SIGNTOOL_VERIFY_DELAY  seconds to sleep per verified file (default 0)
+    FAKE_SIGNTOOL_FAIL_RATE  probability (0..1) that signing a file fails
+                          with a lost SimplySign session (default 0)
+    FAKE_SIGNTOOL_OUTPUT  "verbose" (default: a line per file) or "quiet"
+                          (only the totals, as with signtool /q)
+    FAKE_SIGNTOOL_CHAIN_LINES  lines of certificate chain details that
+                          "verify" prints per file, like signtool /v (default 0)
+    FAKE_SIGNTOOL_TSA     if set, every sign call first POSTs a timestamp
+                          request to the /tr URL (see tests/stub_tsa.py) and
+                          fails like signtool if the server does not answer
+
+write_launcher() creates an executable "signtool" that runs this script.
+"""
+
+import hashlib
+import os
+import random
+import stat
+import struct
+import sys
+import time
+import urllib.request
+
+# Run as a script, the repository root is not on the path
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from src import pe_reader
+from tests.pe_samples import security_dir_offset, sign_pe
+
+SIGNATURE_MARKER = b"\0FAKE-AUTHENTICODE-SIGNATURE"
+# TimeStampReq for an all-zero SHA-256 digest
+TIMESTAMP_QUERY = bytes.fromhex("30390201013031300d060960864801650304020105000420") + bytes(32) + bytes.fromhex("0101ff")
+
+# Options that take a value, so their argument is not mistaken for a file
+OPTIONS_WITH_VALUE = {"/tr", "/td", "/fd", "/t", "/sha1", "/n", "/f", "/p", "/d", "/du",
+                      "/dg", "/di", "/dlib", "/dmdf", "/ac", "/c", "/i", "/r", "/s", "/u"}
+
+
+def split_args(args):
+    files = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.lower() in OPTIONS_WITH_VALUE:
+            i += 2
+            continue
+        # POSIX absolute paths also start with "/", so only existing paths count as files
+        if not arg.startswith("/") or os.path.exists(arg):
+            files.append(arg)
+        i += 1
+    return files
+
+
+def option_value(args, option):
+    for i, arg in enumerate(args[:-1]):
+        if arg.lower() == option:
+            return args[i + 1]
+    return None
+
+
+def write_launcher(directory):
+    """Write an executable launcher for this script into directory and return its path"""
+    script = os.path.abspath(__file__)
+    if os.name == "nt":
+        launcher = os.path.join(directory, "signtool.bat")
+        with open(launcher, "w") as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\r\n')
+    else:
+        launcher = os.path.join(directory, "signtool")
+        with open(launcher, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(launcher, os.stat(launcher).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return launcher
+
+
+def env_float(name):
+    return float(os.environ.get(name, "0") or 0)
+
+
+def timestamp(url):
+    request = urllib.request.Request(url, data=TIMESTAMP_QUERY,
+                                     headers={"Content-Type": "application/timestamp-query"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+# Statuses of files that are well-formed PE images
+PE_STATUSES = (pe_reader.STATUS_UNSIGNED, pe_reader.STATUS_SIGNED, pe_reader.STATUS_STALE)
+
+
+def is_signed(path):
+    """Check for a signature as apply_signature() leaves it"""
+    status = pe_reader.check_signature(path)[0]
+    if status in PE_STATUSES:
+        return status == pe_reader.STATUS_SIGNED
+    with open(path, "rb") as f:
+        return f.read().endswith(SIGNATURE_MARKER)
+
+
+def apply_signature(path):
+    """Embed a signature into a PE image (replacing an old one), else append the marker"""
+    if pe_reader.check_signature(path)[0] not in PE_STATUSES:
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.endswith(SIGNATURE_MARKER):
+            with open(path, "ab") as f:
+                f.write(SIGNATURE_MARKER)
+        return
+    with open(path, "rb") as f:
+        image = bytearray(f.read())
+    directory = security_dir_offset(image)
+    offset, size = struct.unpack_from("<II", image, directory)
+    if size:
+        del image[offset:offset + size]
+        struct.pack_into("<II", image, directory, 0, 0)
+    with open(path, "wb") as f:
+        f.write(sign_pe(bytes(image)))
+
+
+def sign(files, timestamp_url=None):
+    delay = env_float("FAKE_SIGNTOOL_DELAY")
+    fail_rate = env_float("FAKE_SIGNTOOL_FAIL_RATE")
+    quiet = os.environ.get("FAKE_SIGNTOOL_OUTPUT") == "quiet"
+    if timestamp_url and os.environ.get("FAKE_SIGNTOOL_TSA") and not timestamp(timestamp_url):
+        return timestamp_error(files)
+    signed = errors = 0
+    for path in files:
+        time.sleep(delay)
+        name = os.path.basename(path).lower()
+        if "locked" in name:
+            print("SignTool Error: The process cannot access the file because it is being used by another process.",
+                  file=sys.stderr)
+            print(f"SignTool Error: An error occurred while attempting to sign: {path}", file=sys.stderr)
+            errors += 1
+            continue
+        flaky = "flaky" in name and not os.path.exists(path + ".flaky")
+        if flaky or random.random() < fail_rate:
+            if flaky:
+                open(path + ".flaky", "w").close()
+            print("SignTool Error: The smart card cannot be accessed because of other connections outstanding.",
+                  file=sys.stderr)
+            print(f"SignTool Error: An error occurred while attempting to sign: {path}", file=sys.stderr)
+            errors += 1
+            continue
+        if "fail" in name:
+            print(f"SignTool Error: An unexpected internal error has occurred.", file=sys.stderr)
+            print(f"SignTool Error: An error occurred while attempting to sign: {path}", file=sys.stderr)
+            errors += 1
+            continue
+        apply_signature(path)
+        if not quiet:
+            print("Done Adding Additional Store")
+            print(f"Successfully signed: {path}")
+            print()
+        signed += 1
+    if quiet and not errors:
+        return 0
+    print(f"Number of files successfully Signed: {signed}")
+    print("Number of warnings: 0")
+    print(f"Number of errors: {errors}")
+    return 1 if errors else 0
+
+
+def timestamp_error(files):
+    print("SignTool Error: The specified timestamp server either could not be reached or", file=sys.stderr)
+    print("returned an invalid response.", file=sys.stderr)
+    for path in files:
+        print(f"SignTool Error: An error occurred while attempting to sign: {path}", file=sys.stderr)
+    print(f"Number of errors: {len(files)}")
+    return 1
+
+
+def generate_digests(files, digest_dir):
+    for path in files:
+        if "fail" in os.path.basename(path).lower():
+            print(f"SignTool Error: An error occurred while attempting to sign: {path}", file=sys.stderr)
+            return 1
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with open(os.path.join(digest_dir, os.path.basename(path) + ".dig"), "w") as f:
+            f.write(digest)
+        with open(os.path.join(digest_dir, os.path.basename(path) + ".p7u"), "w") as f:
+            f.write("unsigned")
+        print(f"Successfully generated digest: {path}")
+    return 0
+
+
+def sign_digests(files):
+    for path in files:
+        with open(path) as f:
+            digest = f.read()
+        with open(path + ".signed", "w") as f:
+            f.write("signed:" + digest)
+        print(f"Successfully signed: {path}")
+    return 0
+
+
+def ingest_signatures(files, digest_dir):
+    errors = 0
+    for path in files:
+        if not os.path.exists(os.path.join(digest_dir, os.path.basename(path) + ".dig.signed")):
+            print(f"SignTool Error: Signed digest not found for: {path}", file=sys.stderr)
+            errors += 1
+            continue
+        apply_signature(path)
+        print(f"Successfully signed: {path}")
+    return 1 if errors else 0
+
+
+def timestamp_files(files, timestamp_url):
+    if os.environ.get("FAKE_SIGNTOOL_TSA") and not timestamp(timestamp_url):
+        return timestamp_error(files)
+    for path in files:
+        print(f"Successfully timestamped: {path}")
+    return 0
+
+
+def verify(files):
+    delay = env_float("FAKE_SIGNTOOL_VERIFY_DELAY")
+    chain_lines = int(env_float("FAKE_SIGNTOOL_CHAIN_LINES"))
+    errors = 0
+    for path in files:
+        time.sleep(delay)
+        print(f"Verifying: {path}")
+        for i in range(chain_lines):
+            print(f"    Issued to: Certum Code Signing 2021 CA ({i})")
+        if is_signed(path):
+            print(f"Successfully verified: {path}")
+        else:
+            print(f"SignTool Error: No signature found.", file=sys.stderr)
+            errors += 1
+    return 1 if errors else 0
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ("sign", "timestamp", "verify"):
+        print("SignTool Error: A required parameter is missing.", file=sys.stderr)
+        return 1
+    time.sleep(env_float("FAKE_SIGNTOOL_STARTUP"))
+    args = argv[2:]
+    files = split_args(args)
+    if argv[1] == "timestamp":
+        return timestamp_files(files, option_value(args, "/tr"))
+    if argv[1] == "sign":
+        if option_value(args, "/dg"):
+            return generate_digests(files, option_value(args, "/dg"))
+        if "/ds" in args:
+            return sign_digests(files)
+        if option_value(args, "/di"):
+            return ingest_signatures(files, option_value(args, "/di"))
+        return sign(files, option_value(args, "/tr"))
+    return verify(files)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,142 @@
+"""
+Builders for synthetic PE files with (fake) Authenticode signatures
+
+The signatures have the structure signtool produces - PKCS#7 SignedData with
+SpcIndirectDataContent, a certificate and a SignerInfo - but no real
+cryptography, which is all the in-process reader looks at.
+"""
+import hashlib
+import struct
+
+SECTION_ALIGNMENT = 0x200
+
+
+def der(tag, content):
+    length = len(content)
+    if length < 0x80:
+        header = bytes([tag, length])
+    else:
+        size = (length.bit_length() + 7) // 8
+        header = bytes([tag, 0x80 | size]) + length.to_bytes(size, "big")
+    return header + content
+
+
+def seq(*items):
+    return der(0x30, b"".join(items))
+
+
+def der_set(*items):
+    return der(0x31, b"".join(items))
+
+
+def oid(dotted):
+    parts = [int(part) for part in dotted.split(".")]
+    body = bytes([parts[0] * 40 + parts[1]])
+    for part in parts[2:]:
+        chunk = [part & 0x7F]
+        part >>= 7
+        while part:
+            chunk.insert(0, 0x80 | (part & 0x7F))
+            part >>= 7
+        body += bytes(chunk)
+    return der(0x06, body)
+
+
+def integer(value):
+    return der(0x02, value.to_bytes((value.bit_length() + 8) // 8, "big"))
+
+
+def name(common_name):
+    return seq(der_set(seq(oid("2.5.4.3"), der(0x0C, common_name.encode()))))
+
+
+def algorithm(dotted):
+    return seq(oid(dotted), der(0x05, b""))
+
+
+SHA256 = "2.16.840.1.101.3.4.2.1"
+
+
+def build_pe(payload=b"\x90" * 64, pe32_plus=True):
+    """Build a minimal unsigned PE image with one section"""
+    optional_size = 240 if pe32_plus else 224
+    dos = bytearray(0x40)
+    dos[0:2] = b"MZ"
+    struct.pack_into("<I", dos, 0x3C, 0x40)
+
+    coff = b"PE\0\0" + struct.pack("<HHIIIHH", 0x8664 if pe32_plus else 0x14C, 1, 0, 0, 0,
+                                   optional_size, 0x22)
+    optional = bytearray(optional_size)
+    struct.pack_into("<H", optional, 0, 0x20B if pe32_plus else 0x10B)
+    struct.pack_into("<I", optional, 60, SECTION_ALIGNMENT)  # SizeOfHeaders
+    struct.pack_into("<I", optional, 108 if pe32_plus else 92, 16)  # NumberOfRvaAndSizes
+
+    raw = payload.ljust(SECTION_ALIGNMENT, b"\0")
+    section = struct.pack("<8sIIIIIIHHI", b".text", len(payload), 0x1000, len(raw),
+                          SECTION_ALIGNMENT, 0, 0, 0, 0, 0x60000020)
+    headers = (bytes(dos) + coff + bytes(optional) + section).ljust(SECTION_ALIGNMENT, b"\0")
+    return headers + raw
+
+
+def security_dir_offset(image):
+    pe_offset = struct.unpack_from("<I", image, 0x3C)[0]
+    magic = struct.unpack_from("<H", image, pe_offset + 24)[0]
+    return pe_offset + 24 + (112 if magic == 0x20B else 96) + 4 * 8
+
+
+def checksum_offset(image):
+    return struct.unpack_from("<I", image, 0x3C)[0] + 24 + 64
+
+
+def image_digest(image, algorithm_name="sha256"):
+    """Authenticode digest of an unsigned image"""
+    secdir = security_dir_offset(image)
+    checksum = checksum_offset(image)
+    digest = hashlib.new(algorithm_name)
+    digest.update(image[:checksum])
+    digest.update(image[checksum + 4:secdir])
+    digest.update(image[secdir + 8:])
+    return digest.digest()
+
+
+def build_signed_data(digest, signer="Test Signer", timestamp=True, serial=0x1234):
+    indirect = seq(
+        seq(oid("1.3.6.1.4.1.311.2.1.15"), seq()),
+        seq(algorithm(SHA256), der(0x04, digest)),
+    )
+    certificate = seq(
+        seq(der(0xA0, integer(2)), integer(serial), algorithm("1.2.840.113549.1.1.11"),
+            name("Certum Code Signing CA"), seq(), name(signer), seq()),
+        algorithm("1.2.840.113549.1.1.11"),
+        der(0x03, b"\0"),
+    )
+    unauthenticated = b""
+    if timestamp:
+        unauthenticated = der(0xA1, seq(oid("1.3.6.1.4.1.311.3.3.1"), der_set(seq())))
+    signer_info = seq(
+        integer(1),
+        seq(name("Certum Code Signing CA"), integer(serial)),
+        algorithm(SHA256),
+        algorithm("1.2.840.113549.1.1.1"),
+        der(0x04, b"signature"),
+        unauthenticated,
+    )
+    signed_data = seq(
+        integer(1),
+        der_set(algorithm(SHA256)),
+        seq(oid("1.3.6.1.4.1.311.2.1.4"), der(0xA0, indirect)),
+        der(0xA0, certificate),
+        der_set(signer_info),
+    )
+    return seq(oid("1.2.840.113549.1.7.2"), der(0xA0, signed_data))
+
+
+def sign_pe(image, **kwargs):
+    """Append a WIN_CERTIFICATE with a fake Authenticode signature"""
+    image = bytearray(image)
+    image += b"\0" * (-len(image) % 8)
+    blob = build_signed_data(image_digest(bytes(image)), **kwargs)
+    certificate = struct.pack("<IHH", 8 + len(blob), 0x0200, 0x0002) + blob
+    certificate += b"\0" * (-len(certificate) % 8)
+    struct.pack_into("<II", image, security_dir_offset(image), len(image), len(certificate))
+    return bytes(image) + certificate
@@ -0,0 +1,62 @@
+"""
+Stub RFC 3161 timestamp server for tests
+
+Answers every POST with a minimal TimeStampResp whose PKIStatus is "granted"
+(no token - the pool and the fake signtool only check the status). Delay and
+failures can be switched per instance:
+
+    with StubTSA(delay=0.2) as tsa:
+        tsa.url            # http://127.0.0.1:<port>/
+        tsa.fail = True    # answer with HTTP 503 from now on
+        tsa.requests       # number of requests received
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# TimeStampResp { PKIStatusInfo { status granted(0) } }
+GRANTED_RESPONSE = bytes.fromhex("30053003020100")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        tsa = self.server.tsa
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with tsa.lock:
+            tsa.requests += 1
+        time.sleep(tsa.delay)
+        if tsa.fail:
+            self.send_error(503, "Service Unavailable")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/timestamp-reply")
+        self.send_header("Content-Length", str(len(GRANTED_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(GRANTED_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubTSA:
+    """Local timestamp server running in a background thread"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.tsa = self
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
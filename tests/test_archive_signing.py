@@ -0,0 +1,128 @@
+"""
+Tests for signing inside ZIP packages (member extraction, raw-copy rewrite)
+"""
+import os
+import zipfile
+
+import pytest
+
+from src import signing_engine
+from src.archive_signing import ArchiveError, extract_members, list_signable_members, rewrite_archive
+from tests.fake_signtool import SIGNATURE_MARKER
+from tests.test_signing_engine import make_engine
+
+
+def make_package(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+        archive.comment = b"package comment"
+    return str(path)
+
+
+def raw_entry(path, name):
+    """Compressed bytes of a member as stored in the archive"""
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name)
+    with open(path, "rb") as f:
+        f.seek(info.header_offset + 26)
+        name_length, extra_length = int.from_bytes(f.read(2), "little"), int.from_bytes(f.read(2), "little")
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        return f.read(info.compress_size)
+
+
+def test_rewrite_replaces_members_and_copies_the_rest_verbatim(tmp_path):
+    package = make_package(tmp_path / "tool.nupkg", {
+        "lib/net8.0/Tool.dll": b"MZ" + b"tool" * 1000,
+        "content/readme.txt": b"read me " * 2000,
+        "tools/setup.exe": b"MZ" + b"setup" * 100,
+    })
+    with zipfile.ZipFile(package, "a") as archive:
+        # Written as a stream: sizes in a data descriptor behind the data
+        with archive.open("tools/stream.bin", "w") as member:
+            member.write(b"streamed " * 500)
+    unchanged = raw_entry(package, "content/readme.txt")
+
+    names = list_signable_members(package, signing_engine.is_signable)
+    assert names == ["lib/net8.0/Tool.dll", "tools/setup.exe"]
+    extracted = extract_members(package, names, str(tmp_path / "members"), workers=2)
+    for path in extracted.values():
+        with open(path, "ab") as f:
+            f.write(b"-signed")
+
+    assert rewrite_archive(package, extracted) == (2, 2)
+    with zipfile.ZipFile(package) as archive:
+        assert archive.testzip() is None
+        assert archive.comment == b"package comment"
+        assert archive.read("lib/net8.0/Tool.dll").endswith(b"-signed")
+        assert archive.read("tools/stream.bin") == b"streamed " * 500
+        assert [info.filename for info in archive.infolist()] == [
+            "lib/net8.0/Tool.dll", "content/readme.txt", "tools/setup.exe", "tools/stream.bin"]
+    assert raw_entry(package, "content/readme.txt") == unchanged
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_signed_packages_and_non_archives_are_refused(tmp_path):
+    signed = make_package(tmp_path / "signed.nupkg", {"lib/a.dll": b"MZ", ".signature.p7s": b"sig"})
+    with pytest.raises(ArchiveError, match="package is signed"):
+        list_signable_members(signed, signing_engine.is_signable)
+
+    broken = tmp_path / "broken.zip"
+    broken.write_bytes(b"PK\x03\x04 not really a zip")
+    with pytest.raises(ArchiveError):
+        list_signable_members(str(broken), signing_engine.is_signable)
+
+
+def test_engine_signs_inside_archives(tmp_path, fake_signtool):
+    good = make_package(tmp_path / "good.zip", {"bin/app.exe": b"MZapp", "bin/core.dll": b"MZcore",
+                                                "docs/manual.txt": b"manual"})
+    bad = make_package(tmp_path / "bad.vsix", {"ext.dll": b"MZext", "fail.dll": b"MZfail"})
+    bad_before = open(bad, "rb").read()
+    empty = make_package(tmp_path / "docs.zip", {"index.html": b"<html>"})
+    engine = make_engine(fake_signtool, 2, str(tmp_path / "cache.json"))
+    engine.settings["sign_archives"] = True
+    reported = []
+    engine.status_callback = lambda file_paths, status: reported.extend((path, status) for path in file_paths)
+
+    files = signing_engine.find_signable_files(str(tmp_path), settings=engine.settings)
+    assert sorted(os.path.basename(path) for path in files) == ["bad.vsix", "docs.zip", "good.zip"]
+    summary = engine.sign_files(files)
+
+    assert sorted(summary.results) == [(bad, "failed"), (empty, "skipped"), (good, "verified")]
+    with zipfile.ZipFile(good) as archive:
+        assert archive.read("bin/app.exe") == b"MZapp" + SIGNATURE_MARKER
+        assert archive.read("bin/core.dll") == b"MZcore" + SIGNATURE_MARKER
+        assert archive.read("docs/manual.txt") == b"manual"
+    assert open(bad, "rb").read() == bad_before
+    # Only the archives themselves are reported, never the extracted members
+    assert {path for path, status in reported} == {good, bad, empty}
+    assert (good, "signing") in reported
+    assert engine._archive_dir is None
+
+
+def test_corrupt_members_fail_only_their_archive(tmp_path, fake_signtool):
+    good = make_package(tmp_path / "good.zip", {"bin/app.exe": b"MZapp"})
+    damaged = make_package(tmp_path / "damaged.zip", {"lib/a.dll": b"MZ" + bytes(range(256)) * 64})
+    with zipfile.ZipFile(damaged) as archive:
+        info = archive.getinfo("lib/a.dll")
+    data = bytearray(open(damaged, "rb").read())
+    start = info.header_offset + 30 + len(info.filename)
+    data[start:start + 16] = b"\xff" * 16
+    open(damaged, "wb").write(bytes(data))
+    # Compression method 9 (Deflate64), which zipfile cannot read
+    unsupported = make_package(tmp_path / "deflate64.nupkg", {"lib/b.dll": b"MZb"})
+    data = bytearray(open(unsupported, "rb").read())
+    for signature, offset in ((b"PK\x03\x04", 8), (b"PK\x01\x02", 10)):
+        position = data.index(signature) + offset
+        data[position:position + 2] = (9).to_bytes(2, "little")
+    open(unsupported, "wb").write(bytes(data))
+    before = {path: open(path, "rb").read() for path in (damaged, unsupported)}
+
+    engine = make_engine(fake_signtool, 2, str(tmp_path / "cache.json"))
+    engine.settings["sign_archives"] = True
+    summary = engine.sign_files([good, damaged, unsupported])
+
+    assert sorted(summary.results) == [(damaged, "failed"), (unsupported, "failed"), (good, "verified")]
+    for path, content in before.items():
+        assert open(path, "rb").read() == content
+    assert any(message.startswith(f"✗ Cannot read archive {damaged}") for message in engine.logged)
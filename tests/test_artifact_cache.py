@@ -0,0 +1,65 @@
+"""
+Tests for the persistent signed-artifact cache
+"""
+import os
+import time
+
+from src.artifact_cache import ArtifactCache
+
+
+def test_verified_file_is_up_to_date_until_content_changes(tmp_path):
+    index = tmp_path / "cache.json"
+    target = tmp_path / "app.dll"
+    target.write_bytes(b"MZ signed")
+
+    cache = ArtifactCache(index)
+    assert not cache.is_up_to_date(target)
+    cache.record(target, verified=True)
+    cache.save()
+
+    cache = ArtifactCache(index)
+    assert cache.is_up_to_date(target)
+
+    # Touched but identical content still counts as signed
+    stat = target.stat()
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    assert cache.is_up_to_date(target)
+
+    target.write_bytes(b"MZ rebuilt")
+    assert not cache.is_up_to_date(target)
+
+
+def test_failed_files_are_forgotten(tmp_path):
+    target = tmp_path / "app.exe"
+    target.write_bytes(b"MZ")
+    cache = ArtifactCache(tmp_path / "cache.json")
+    cache.record(target, verified=True)
+    cache.record(target, verified=False)
+    assert len(cache) == 0
+
+
+def test_compact_drops_missing_expired_and_surplus_entries(tmp_path):
+    cache = ArtifactCache(tmp_path / "cache.json", max_entries=2, max_age_days=1)
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"f{i}.dll"
+        path.write_bytes(b"MZ")
+        cache.record(path, verified=True)
+        paths.append(str(path))
+
+    os.remove(paths[0])
+    cache.entries[paths[1]]["last_seen"] = time.time() - 2 * 86400
+    cache.entries[paths[2]]["last_seen"] = time.time() - 60
+
+    assert cache.compact() == 2
+    assert sorted(cache.entries) == sorted(paths[2:])
+
+    cache.max_entries = 1
+    assert cache.compact() == 1
+    assert list(cache.entries) == [paths[3]]
+
+
+def test_corrupt_index_starts_empty(tmp_path):
+    index = tmp_path / "cache.json"
+    index.write_text("{not json")
+    assert len(ArtifactCache(index)) == 0
@@ -0,0 +1,38 @@
+"""
+Tests for the benchmark harness (a tiny run, so the harness keeps working)
+"""
+from benchmarks import bench_signing
+from src import pe_reader
+
+
+def test_small_benchmark_run_reports_all_phases():
+    args = bench_signing.build_parser().parse_args(
+        ["--files", "12", "--size", "256", "--batch-size", "4", "--log-lines", "200", "--output", "quiet"])
+    result = bench_signing.run_benchmark(args)
+
+    assert result["scan"]["files"] == 12
+    assert result["log"]["lines"] == 200
+    sign = result["sign"]
+    assert (sign["files"], sign["verified"], sign["failed"]) == (12, 12, 0)
+    assert sign["tsa_requests"] == 3
+    assert 0 < sign["latency_p50"] <= sign["latency_p99"]
+    assert sign["stages"]["verify"]["count"] == 12
+    assert "Sign:  12 files" in bench_signing.format_result(result)
+
+
+def test_compare_flags_throughput_regressions():
+    baseline = {"scan": {"files_per_second": 1000.0}, "log": {"lines_per_second": 500.0},
+                "sign": {"files_per_second": 10.0}}
+    result = {"scan": {"files_per_second": 950.0}, "log": {"lines_per_second": 200.0},
+              "sign": {"files_per_second": 12.0}}
+
+    assert bench_signing.compare(result, baseline, 0.25) == ["log lines_per_second: 200 vs. 500 (-60%)"]
+    assert bench_signing.percentile([3, 1, 2, 4], 0.5) == 2
+    assert bench_signing.percentile([], 0.99) == 0.0
+
+
+def test_tree_holds_unsigned_pe_images(tmp_path):
+    paths = bench_signing.make_tree(str(tmp_path), 3, size=2048)
+
+    assert [pe_reader.check_signature(path)[0] for path in paths] == [pe_reader.STATUS_UNSIGNED] * 3
+    assert len({open(path, "rb").read() for path in paths}) == 3
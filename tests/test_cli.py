@@ -0,0 +1,99 @@
+"""
+Tests for the headless command-line interface
+"""
+import json
+import os
+import subprocess
+import sys
+
+from src import cli
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def make_tree(tmp_path):
+    dist = tmp_path / "dist"
+    (dist / "sub").mkdir(parents=True)
+    for name in ["app.exe", "core.dll", "sub/plugin.dll", "readme.txt"]:
+        (dist / name).write_bytes(b"MZ")
+    return dist
+
+
+def cli_args(tmp_path, fake_signtool, *args):
+    return list(args) + ["--settings", str(tmp_path / "settings.json"),
+                         "--log-file", str(tmp_path / "signer.log"),
+                         "--signtool", fake_signtool]
+
+
+def test_sign_recursive_prints_json_summary(tmp_path, fake_signtool, capsys):
+    dist = make_tree(tmp_path)
+    exit_code = cli.main(cli_args(tmp_path, fake_signtool, "sign", "--recursive", str(dist), "--jobs", "2"))
+    summary = json.loads(capsys.readouterr().out)
+
+    assert exit_code == cli.EXIT_OK
+    assert summary["command"] == "sign"
+    assert summary["verified"] == 3
+    assert summary["failed"] == 0
+    assert {os.path.basename(entry["path"]) for entry in summary["files"]} == {"app.exe", "core.dll", "plugin.dll"}
+    assert "=== Signing Complete ===" in (tmp_path / "signer.log").read_text(encoding="utf-8")
+
+    # Second run: everything unchanged, served from the signing cache
+    exit_code = cli.main(cli_args(tmp_path, fake_signtool, "sign", "-r", str(dist)))
+    assert json.loads(capsys.readouterr().out)["skipped"] == 3
+
+
+def test_failures_and_usage_errors_set_exit_code(tmp_path, fake_signtool, capsys):
+    failing = tmp_path / "fail.dll"
+    failing.write_bytes(b"MZ")
+    assert cli.main(cli_args(tmp_path, fake_signtool, "sign", str(failing))) == cli.EXIT_FAILED
+    assert json.loads(capsys.readouterr().out)["failed"] == 1
+
+    assert cli.main(cli_args(tmp_path, fake_signtool, "verify", str(tmp_path / "missing.exe"))) == cli.EXIT_USAGE
+
+
+def test_verify_without_signing(tmp_path, fake_signtool, capsys):
+    dist = make_tree(tmp_path)
+    assert cli.main(cli_args(tmp_path, fake_signtool, "verify", str(dist))) == cli.EXIT_FAILED
+    summary = json.loads(capsys.readouterr().out)
+    # Without --recursive only the top-level folder is scanned
+    assert summary["total"] == 2
+    assert summary["failed"] == 2
+
+
+def test_resume_without_interrupted_run_is_a_usage_error(tmp_path, fake_signtool, capsys):
+    dist = make_tree(tmp_path)
+    assert cli.main(cli_args(tmp_path, fake_signtool, "sign", "-r", str(dist))) == cli.EXIT_OK
+    capsys.readouterr()
+
+    # The sign run finished, so its journal has nothing left to resume
+    assert cli.main(cli_args(tmp_path, fake_signtool, "resume")) == cli.EXIT_USAGE
+    assert "no interrupted run" in capsys.readouterr().err
+
+
+def test_check_reports_problems_without_signing(tmp_path, fake_signtool, capsys):
+    dist = make_tree(tmp_path)
+    (dist / "broken.dll").write_bytes(b"")
+    exit_code = cli.main(cli_args(tmp_path, fake_signtool, "check", "-r", str(dist)))
+    report = json.loads(capsys.readouterr().out)
+
+    assert exit_code == cli.EXIT_FAILED
+    assert report["total"] == 4
+    assert report["tool_error"] is None
+    assert [(os.path.basename(entry["path"]), entry["problem"]) for entry in report["problems"]] == [
+        ("broken.dll", "file is empty")]
+    assert (dist / "app.exe").read_bytes() == b"MZ"
+
+
+def test_cli_run_does_not_import_tkinter_or_the_service(tmp_path, fake_signtool):
+    dist = make_tree(tmp_path)
+    code = (
+        "import sys\n"
+        "from src.certum_signer import main\n"
+        f"exit_code = main({cli_args(tmp_path, fake_signtool, 'sign', '-r', str(dist))!r})\n"
+        "assert 'tkinter' not in sys.modules, 'GUI stack was imported'\n"
+        "assert 'http.server' not in sys.modules, 'signing service was imported'\n"
+        "sys.exit(exit_code)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)["verified"] == 3
@@ -0,0 +1,79 @@
+"""
+Tests for the ordered file registry behind the file list
+"""
+from src import file_registry
+from src.file_registry import FileRegistry, STATUS_PENDING, STATUS_SIGNING, STATUS_VERIFIED, STATUS_FAILED
+
+
+def test_paths_stay_sorted_and_indexed():
+    registry = FileRegistry()
+    assert registry.add("c.dll")
+    assert registry.add_many(["a.exe", "d.sys", "c.dll"]) == 2
+    assert not registry.add("a.exe")
+    assert registry.paths() == ["a.exe", "c.dll", "d.sys"]
+    assert registry.index("c.dll") == 1
+    assert registry.index("b.dll") == -1
+
+    # Bulk add merges a large batch into the existing order
+    bulk = [f"lib{i:04}.dll" for i in range(file_registry._BULK_THRESHOLD * 3)]
+    assert registry.add_many(reversed(bulk)) == len(bulk)
+    assert registry.paths() == sorted(bulk + ["a.exe", "c.dll", "d.sys"])
+    # Small batches, as the folder scanner delivers them, are merged the same way
+    for start in range(0, 20, 4):
+        assert registry.add_many([f"z{i:02}.dll" for i in range(start + 3, start - 1, -1)]) == 4
+    assert registry.paths()[-20:] == [f"z{i:02}.dll" for i in range(20)]
+    registry.remove_many([f"z{i:02}.dll" for i in range(20)])
+
+    assert registry.remove("c.dll")
+    assert registry.remove_many(bulk[:100] + ["missing.dll"]) == 100
+    assert registry.paths() == ["a.exe", "d.sys"] + bulk[100:]
+    assert registry.rows(0, 2) == [("a.exe", STATUS_PENDING), ("d.sys", STATUS_PENDING)]
+
+
+def test_status_updates_keep_counts_and_bump_version():
+    registry = FileRegistry()
+    registry.add_many(["a.exe", "b.dll", "c.dll"])
+    version = registry.version
+
+    registry.set_status_many(["a.exe", "b.dll"], STATUS_SIGNING)
+    registry.set_status("a.exe", STATUS_VERIFIED)
+    registry.set_status("b.dll", STATUS_FAILED)
+    registry.set_status("unknown.dll", STATUS_FAILED)
+
+    assert registry.version > version
+    assert registry.status("a.exe") == STATUS_VERIFIED
+    assert registry.counts() == {STATUS_VERIFIED: 1, STATUS_FAILED: 1, STATUS_PENDING: 1}
+
+    version = registry.version
+    registry.set_status("a.exe", STATUS_VERIFIED)
+    assert registry.version == version
+
+    registry.remove("b.dll")
+    assert registry.counts() == {STATUS_VERIFIED: 1, STATUS_PENDING: 1}
+    registry.reset_status()
+    assert registry.counts() == {STATUS_PENDING: 2}
+
+
+def test_chunked_order_matches_a_sorted_list(monkeypatch):
+    import random
+    # Tiny chunks, so splits, merges and the cumulative index are all exercised
+    monkeypatch.setattr(file_registry, "_CHUNK_SIZE", 4)
+    rng = random.Random(7)
+    registry = FileRegistry()
+    expected = set()
+    for step in range(3000):
+        path = f"f{rng.randrange(400):03}.dll"
+        if rng.random() < 0.55:
+            assert registry.add(path) == (path not in expected)
+            expected.add(path)
+        else:
+            assert registry.remove(path) == (path in expected)
+            expected.discard(path)
+        if step % 50 == 0:
+            ordered = sorted(expected)
+            assert registry.paths() == ordered and len(registry) == len(ordered)
+            start = rng.randrange(len(ordered) + 1)
+            assert [path for path, status in registry.rows(start, start + 7)] == ordered[start:start + 7]
+            for row, path in enumerate(ordered):
+                assert registry.index(path) == row
+    assert registry.index("missing.dll") == -1
@@ -0,0 +1,63 @@
+"""
+Tests for the parallel folder scanner
+"""
+import threading
+
+from src.folder_scanner import FolderScanner, ScanRules
+from src.signing_engine import SIGNABLE_EXTENSIONS, find_signable_files
+
+
+def make_tree(root, names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"MZ")
+
+
+def rel_paths(root, paths):
+    return sorted(str(path)[len(str(root)) + 1:].replace("\\", "/") for path in paths)
+
+
+def test_rules_depth_and_case_insensitive_suffixes(tmp_path):
+    make_tree(tmp_path, ["App.EXE", "readme.txt", "bin/core.dll", "bin/x64/driver.sys",
+                         "obj/temp.dll", "bin/app.vshost.exe", "tools/setup.msi"])
+
+    scanner = FolderScanner(ScanRules(SIGNABLE_EXTENSIONS))
+    assert rel_paths(tmp_path, scanner.scan_all(tmp_path)) == [
+        "App.EXE", "bin/app.vshost.exe", "bin/core.dll", "bin/x64/driver.sys", "obj/temp.dll", "tools/setup.msi"]
+
+    rules = ScanRules(SIGNABLE_EXTENSIONS, exclude=["obj", "*.vshost.exe"], max_depth=1)
+    assert rel_paths(tmp_path, FolderScanner(rules).scan_all(tmp_path)) == [
+        "App.EXE", "bin/core.dll", "tools/setup.msi"]
+
+    # As with fnmatch, "*" also matches "/"
+    rules = ScanRules(SIGNABLE_EXTENSIONS, include=["bin/*", "*.msi"])
+    assert rel_paths(tmp_path, FolderScanner(rules).scan_all(tmp_path)) == [
+        "bin/app.vshost.exe", "bin/core.dll", "bin/x64/driver.sys", "tools/setup.msi"]
+
+    assert rel_paths(tmp_path, find_signable_files(tmp_path, recursive=False)) == ["App.EXE"]
+
+
+def test_results_are_streamed_in_batches(tmp_path):
+    make_tree(tmp_path, [f"dir{i}/lib{j}.dll" for i in range(20) for j in range(10)])
+
+    scanner = FolderScanner(ScanRules([".dll"]), workers=4, batch_size=16)
+    batches = list(scanner.scan(tmp_path))
+
+    assert len(batches) > 1
+    assert all(0 < len(batch) <= 16 for batch in batches)
+    assert len({path for batch in batches for path in batch}) == 200
+    assert scanner.errors == []
+
+
+def test_cancel_stops_the_scan(tmp_path):
+    make_tree(tmp_path, [f"dir{i}/lib.dll" for i in range(50)])
+    cancel = threading.Event()
+
+    scanner = FolderScanner(ScanRules([".dll"]), workers=1, batch_size=1)
+    found = []
+    for batch in scanner.scan(tmp_path, cancel_event=cancel):
+        found.extend(batch)
+        cancel.set()
+
+    assert 0 < len(found) < 50
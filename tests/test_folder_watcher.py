@@ -0,0 +1,92 @@
+"""
+Tests for the watch-folder mode
+"""
+import os
+import threading
+
+from src.folder_scanner import FolderScanner, ScanRules
+from src.folder_watcher import FolderWatcher
+from src.signing_engine import SIGNABLE_EXTENSIONS
+from tests.test_signing_engine import make_engine
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_files_are_reported_once_they_settle(tmp_path):
+    (tmp_path / "old.dll").write_bytes(b"MZ")
+    clock = _Clock()
+    watcher = FolderWatcher(tmp_path, FolderScanner(ScanRules(SIGNABLE_EXTENSIONS)), settle=3,
+                            use_inotify=False, clock=clock)
+    assert watcher.poll() == []  # files from before the watch are left alone
+
+    artifact = tmp_path / "sub" / "app.exe"
+    artifact.parent.mkdir()
+    artifact.write_bytes(b"MZ")
+    (tmp_path / "notes.txt").write_bytes(b"x")
+    assert watcher.poll() == []
+    assert watcher.pending == 1
+
+    # Still being written: the settle time starts over
+    clock.now = 2
+    artifact.write_bytes(b"MZ" + bytes(100))
+    assert watcher.poll() == []
+    clock.now = 4
+    assert watcher.poll() == []
+    clock.now = 5
+    assert watcher.poll() == [str(artifact)]
+    assert watcher.poll() == []
+
+    # Signing rewrites the file; acknowledged changes are not reported again
+    artifact.write_bytes(b"MZ" + bytes(200))
+    watcher.acknowledge([str(artifact)])
+    clock.now = 10
+    assert watcher.poll() == []
+
+    # A rebuild is
+    artifact.write_bytes(b"MZ" + bytes(300))
+    os.utime(artifact, ns=(0, 10 ** 9))
+    watcher.poll()
+    clock.now = 20
+    assert watcher.poll() == [str(artifact)]
+
+
+def test_existing_files_can_be_included(tmp_path):
+    (tmp_path / "old.dll").write_bytes(b"MZ")
+    watcher = FolderWatcher(tmp_path, FolderScanner(ScanRules(SIGNABLE_EXTENSIONS)), settle=0,
+                            include_existing=True, use_inotify=False)
+    assert watcher.poll() == [str(tmp_path / "old.dll")]
+
+
+def test_engine_signs_files_landing_in_watched_folder(tmp_path, fake_signtool):
+    out = tmp_path / "out"
+    out.mkdir()
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    # Include existing files, so it does not matter whether the first scan runs before the write
+    engine.settings.update({"watch_interval": 0.1, "watch_settle": 0.2, "watch_include_existing": True})
+
+    stop_event = threading.Event()
+    added = []
+
+    def on_files(files):
+        added.extend(files)
+        stop_event.set()
+
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(
+        summary=engine.watch_folder(str(out), stop_event, files_callback=on_files)))
+    thread.start()
+    try:
+        (out / "app.exe").write_bytes(b"MZ" + bytes(64))
+        thread.join(20)
+    finally:
+        stop_event.set()
+        thread.join()
+
+    assert added == [str(out / "app.exe")]
+    assert result["summary"].verified == 1
@@ -0,0 +1,67 @@
+"""
+Tests for local staging of files from network shares
+"""
+import os
+
+import pytest
+
+from src.local_staging import LocalStaging, StagingError, is_network_path
+from tests.test_signing_engine import make_engine
+
+
+@pytest.mark.skipif(os.name == "nt", reason="uses POSIX mount points")
+def test_network_paths_are_detected_from_mounts():
+    mounts = [("/mnt/builds/share", "cifs"), ("/mnt", "ext4"), ("/", "ext4")]
+    assert is_network_path("/mnt/builds/share/app.exe", mounts)
+    assert not is_network_path("/mnt/builds/shared/app.exe", mounts)
+    assert not is_network_path("/home/build/app.exe", mounts)
+
+
+def test_write_back_is_atomic_and_refuses_changed_originals(tmp_path):
+    share = tmp_path / "share"
+    share.mkdir()
+    (share / "a.dll").write_bytes(b"MZ a")
+    (share / "b.dll").write_bytes(b"MZ b")
+    staging = LocalStaging(tmp_path / "local")
+    staged, errors = staging.stage([str(share / "a.dll"), str(share / "b.dll"), str(share / "missing.dll")])
+    assert [os.path.basename(staged_file.local) for staged_file in staged] == ["a.dll", "b.dll"]
+    assert [os.path.basename(path) for path, error in errors] == ["missing.dll"]
+
+    for staged_file in staged:
+        with open(staged_file.local, 'ab') as f:
+            f.write(b" signed")
+    staging.write_back(staged[0])
+    assert (share / "a.dll").read_bytes() == b"MZ a signed"
+
+    # Rebuilt on the share while the copy was signed: keep the new build
+    (share / "b.dll").write_bytes(b"MZ b, rebuilt")
+    with pytest.raises(StagingError):
+        staging.write_back(staged[1])
+    assert (share / "b.dll").read_bytes() == b"MZ b, rebuilt"
+    assert sorted(os.listdir(share)) == ["a.dll", "b.dll"]
+
+    staging.cleanup()
+    assert not os.path.exists(staging.directory)
+
+
+def test_staged_files_are_signed_locally_and_written_back(tmp_path, fake_signtool):
+    share = tmp_path / "share"
+    share.mkdir()
+    files = []
+    for name in ("app.exe", "core.dll", "fail.dll"):
+        (share / name).write_bytes(b"MZ " + name.encode())
+        files.append(str(share / name))
+    statuses = []
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    engine.status_callback = lambda paths, status: statuses.extend((path, status) for path in paths)
+    engine.settings.update({"staging_mode": "always", "staging_dir": str(tmp_path / "local")})
+
+    summary = engine.sign_files(files)
+
+    assert dict(summary.results) == {files[0]: "verified", files[1]: "verified", files[2]: "failed"}
+    assert set(path for path, status in statuses) == set(files)
+    assert (share / "app.exe").read_bytes() != b"MZ app.exe"
+    assert (share / "fail.dll").read_bytes() == b"MZ fail.dll"
+    assert engine.artifact_cache.is_up_to_date(files[0])
+    assert os.listdir(tmp_path / "local") == []
+    assert sorted(os.listdir(share)) == ["app.exe", "core.dll", "fail.dll"]
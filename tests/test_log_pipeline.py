@@ -0,0 +1,125 @@
+"""
+Tests for the asynchronous logging pipeline
+"""
+import gzip
+import os
+import threading
+import time
+
+from src import log_rotation
+from src.log_pipeline import AsyncLogger
+from src.log_rotation import LogRotation, rotated_files
+
+
+def test_lines_are_written_in_order_and_blocks_stay_together(tmp_path):
+    log_file = tmp_path / "certum_signer.log"
+    logger = AsyncLogger(log_file, ui_enabled=False)
+
+    def worker(n):
+        for i in range(50):
+            logger.log_block([(f"file{n} line{j} #{i}", False) for j in range(3)])
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.close()
+
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 4 * 50 * 3
+    for start in range(0, len(lines), 3):
+        block = [line.split("] ", 1)[1] for line in lines[start:start + 3]]
+        prefix = block[0].split(" ")[0]
+        assert [line.split(" ")[1] for line in block] == ["line0", "line1", "line2"]
+        assert all(line.startswith(prefix) for line in block)
+
+
+def test_ui_queue_is_drained_in_batches(tmp_path):
+    logger = AsyncLogger(tmp_path / "log.txt")
+    for i in range(30):
+        logger.log(f"message {i}", error=(i == 7))
+    first = logger.drain_ui(max_records=10)
+    rest = logger.drain_ui()
+    logger.close()
+
+    assert len(first) == 10
+    assert len(first) + len(rest) == 30
+    assert first[7][1] is True
+    assert first[0][0].endswith("message 0")
+
+
+def test_switching_log_file(tmp_path):
+    logger = AsyncLogger(tmp_path / "a.log", ui_enabled=False)
+    logger.log("first")
+    logger.flush()
+    logger.set_log_file(tmp_path / "b.log")
+    logger.log("second")
+    logger.close()
+
+    assert "first" in (tmp_path / "a.log").read_text()
+    assert "second" in (tmp_path / "b.log").read_text()
+
+
+def test_log_is_rotated_compressed_and_pruned(tmp_path):
+    log_file = tmp_path / "certum_signer.log"
+    rotation = LogRotation(max_bytes=2000, daily=False, keep=2)
+    logger = AsyncLogger(log_file, ui_enabled=False, rotation=rotation)
+    for i in range(200):
+        logger.log(f"line {i:04d} " + "x" * 40)
+        if i % 10 == 9:
+            # One write per flush, so the writer checks the size often
+            logger.flush()
+    logger.close()
+
+    rotated = rotated_files(log_file)
+    assert len(rotated) == 2 and all(path.endswith(".log.gz") for path in rotated)
+    assert os.path.getsize(log_file) <= 2000
+    newest = gzip.open(rotated[0], "rt", encoding="utf-8").read().splitlines()
+    current = log_file.read_text(encoding="utf-8").splitlines()
+    # Nothing lost between the newest rotated file and the current one
+    assert int(newest[-1].split()[3]) + 1 == int(current[0].split()[3])
+    assert current[-1].split()[3] == "0199"
+
+
+def test_daily_rotation_and_age_limit(tmp_path):
+    log_file = tmp_path / "certum_signer.log"
+    log_file.write_text("yesterday\n")
+    yesterday = time.time() - 86400
+    os.utime(log_file, (yesterday, yesterday))
+    old = tmp_path / "certum_signer.20200101-000000.log.gz"
+    old.write_bytes(gzip.compress(b"old\n"))
+    os.utime(old, (yesterday - 40 * 86400,) * 2)
+
+    logger = AsyncLogger(log_file, ui_enabled=False, rotation=LogRotation(max_age_days=30, compress=False))
+    logger.log("today")
+    logger.close()
+
+    rotated = rotated_files(log_file)
+    assert len(rotated) == 1 and open(rotated[0]).read() == "yesterday\n"
+    assert "today" in log_file.read_text()
+
+
+def test_rotation_never_waits_for_compression(tmp_path, monkeypatch):
+    release = threading.Event()
+    compress = log_rotation._compress
+
+    def slow_compress(path):
+        release.wait(10)
+        compress(path)
+
+    monkeypatch.setattr(log_rotation, "_compress", slow_compress)
+    log_file = tmp_path / "certum_signer.log"
+    rotation = LogRotation(daily=False, keep=5)
+    for text in ("first\n", "second\n"):
+        log_file.write_text(text)
+        started = time.perf_counter()
+        rotation.rotate(log_file)
+        # The second rotation comes while the first file is still being compressed
+        assert time.perf_counter() - started < 1
+
+    assert not rotation.wait(0.05)
+    release.set()
+    assert rotation.wait(10)
+    rotated = rotated_files(log_file)
+    assert [gzip.open(path, "rt").read() for path in rotated] == ["second\n", "first\n"]
@@ -0,0 +1,52 @@
+"""
+Tests for the bounded capture of signtool output
+"""
+import re
+import subprocess
+import sys
+
+import pytest
+
+from src.output_capture import run_captured
+from tests.test_signing_engine import make_engine
+
+
+def test_long_output_keeps_head_tail_and_result_lines():
+    code = ("import sys\n"
+            "for i in range(50000):\n"
+            "    print(f'Successfully signed: f{i}' if i % 10000 == 5 else f'detail {i}')\n"
+            "print('SignTool Error: boom', file=sys.stderr)\n"
+            "sys.exit(2)\n")
+    result = run_captured([sys.executable, "-c", code], keep=re.compile("Successfully signed"),
+                          head_lines=2, tail_lines=2)
+
+    assert result.returncode == 2
+    assert result.stdout.splitlines() == [
+        "detail 0", "detail 1",
+        "Successfully signed: f5", "Successfully signed: f10005", "Successfully signed: f20005",
+        "Successfully signed: f30005", "Successfully signed: f40005",
+        "... 49991 lines omitted ...", "detail 49998", "detail 49999"]
+    assert result.stderr == "SignTool Error: boom\n"
+    assert result.omitted == 49991
+
+    with pytest.raises(subprocess.TimeoutExpired) as error:
+        run_captured([sys.executable, "-c", "import time; print('started', flush=True); time.sleep(30)"],
+                     timeout=0.5)
+    assert error.value.output == "started\n"
+
+
+def test_verbose_verify_output_stays_bounded_in_the_log(tmp_path, fake_signtool, monkeypatch):
+    monkeypatch.setenv("FAKE_SIGNTOOL_CHAIN_LINES", "3000")
+    files = []
+    for i in range(3):
+        path = tmp_path / f"app{i}.dll"
+        path.write_bytes(b"MZ" + bytes(i))
+        files.append(str(path))
+    engine = make_engine(fake_signtool, 2, str(tmp_path / "cache.json"))
+    engine.settings["output_keep_lines"] = 10
+
+    summary = engine.sign_files(files)
+
+    assert summary.verified == 3
+    assert sum(1 for line in engine.logged if "Issued to:" in line) == 3 * 8
+    assert sum(1 for line in engine.logged if "2992 lines omitted" in line) == 3
@@ -0,0 +1,61 @@
+"""
+Tests for the in-process Authenticode reader
+"""
+import struct
+
+from src import pe_reader
+from tests.pe_samples import build_pe, checksum_offset, sign_pe
+
+
+def test_unsigned_pe(tmp_path):
+    path = tmp_path / "app.exe"
+    path.write_bytes(build_pe())
+    status, info = pe_reader.check_signature(path)
+    assert status == pe_reader.STATUS_UNSIGNED
+    assert not info.is_signed
+
+
+def test_signed_pe_reports_signer_digest_and_timestamp(tmp_path):
+    for pe32_plus in (True, False):
+        path = tmp_path / "app.dll"
+        path.write_bytes(sign_pe(build_pe(pe32_plus=pe32_plus), signer="Example Sp. z o.o."))
+        status, info = pe_reader.check_signature(path)
+        assert status == pe_reader.STATUS_SIGNED
+        assert info.certificate_count == 1
+        assert info.primary.signer == "Example Sp. z o.o."
+        assert info.primary.digest_algorithm == "sha256"
+        assert info.primary.has_timestamp
+
+
+def test_checksum_update_keeps_signature_intact(tmp_path):
+    image = bytearray(sign_pe(build_pe(), timestamp=False))
+    struct.pack_into("<I", image, checksum_offset(image), 0xDEADBEEF)
+    path = tmp_path / "app.dll"
+    path.write_bytes(bytes(image))
+    status, info = pe_reader.check_signature(path)
+    assert status == pe_reader.STATUS_SIGNED
+    assert not info.primary.has_timestamp
+
+
+def test_modified_content_is_stale(tmp_path):
+    image = bytearray(sign_pe(build_pe()))
+    image[0x210] ^= 0xFF  # patch a byte in the .text section
+    path = tmp_path / "app.exe"
+    path.write_bytes(bytes(image))
+    status, info = pe_reader.check_signature(path)
+    assert status == pe_reader.STATUS_STALE
+    assert "STALE" in info.describe()
+
+
+def test_non_pe_and_malformed_files(tmp_path):
+    msi = tmp_path / "setup.msi"
+    msi.write_bytes(bytes.fromhex("D0CF11E0A1B11AE1") + bytes(512))
+    assert pe_reader.check_signature(msi) == (pe_reader.STATUS_NOT_PE, None)
+
+    empty = tmp_path / "empty.dll"
+    empty.write_bytes(b"")
+    assert pe_reader.check_signature(empty) == (pe_reader.STATUS_NOT_PE, None)
+
+    truncated = tmp_path / "truncated.dll"
+    truncated.write_bytes(sign_pe(build_pe())[:-40])
+    assert pe_reader.check_signature(truncated)[0] == pe_reader.STATUS_INVALID
@@ -0,0 +1,77 @@
+"""
+Tests for the two-stage sign/verify pipeline
+"""
+import threading
+import time
+
+import pytest
+
+from src.pipeline import PipelineError, SignVerifyPipeline
+
+
+def test_all_results_are_collected():
+    def sign(batch):
+        to_verify = [path for path in batch if not path.startswith("bad")]
+        failed = [(path, False) for path in batch if path.startswith("bad")]
+        return to_verify, failed
+
+    pipeline = SignVerifyPipeline(sign, lambda path: (path, True), sign_workers=3, verify_workers=2)
+    results = pipeline.run([["a", "b"], ["bad1"], ["c"], ["d", "bad2"]])
+
+    assert sorted(results) == [("a", True), ("b", True), ("bad1", False), ("bad2", False),
+                               ("c", True), ("d", True)]
+    assert pipeline.sign_stats.items == 6
+    assert pipeline.verify_stats.items == 4
+
+
+def test_full_queue_blocks_signers():
+    in_flight = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def verify(path):
+        time.sleep(0.02)
+        with lock:
+            in_flight.remove(path)
+        return path, True
+
+    def sign(batch):
+        with lock:
+            in_flight.extend(batch)
+            peak[0] = max(peak[0], len(in_flight))
+        return batch, []
+
+    pipeline = SignVerifyPipeline(sign, verify, sign_workers=4, verify_workers=1, queue_size=2)
+    results = pipeline.run([[f"f{i}"] for i in range(20)])
+
+    assert len(results) == 20
+    # queue (2) + one file being verified + one file per blocked signer
+    assert peak[0] <= 2 + 1 + 4
+    assert pipeline.sign_stats.waiting > 0
+    assert pipeline.verify_stats.busy >= 20 * 0.02
+    assert "Verify stage: 1 workers, 20 items" in pipeline.summary_lines()[1]
+
+
+def test_errors_are_raised_after_shutdown():
+    def sign(batch):
+        if batch == ["boom"]:
+            raise RuntimeError("signtool exploded")
+        return batch, []
+
+    pipeline = SignVerifyPipeline(sign, lambda path: (path, True), sign_workers=2, verify_workers=2)
+    with pytest.raises(RuntimeError, match="exploded"):
+        pipeline.run([["a"], ["boom"], ["b"]])
+
+
+def test_completed_results_survive_errors():
+    def verify(path):
+        if path == "crash":
+            raise OSError("verify crashed")
+        return path, True
+
+    pipeline = SignVerifyPipeline(lambda batch: (batch, []), verify, sign_workers=2, verify_workers=2)
+    with pytest.raises(PipelineError) as caught:
+        pipeline.run([["a", "crash"], ["b"], ["c"]])
+
+    assert sorted(caught.value.results) == [("a", True), ("b", True), ("c", True)]
+    assert [str(error) for error in caught.value.errors] == ["verify crashed"]
@@ -0,0 +1,69 @@
+"""
+Tests for failure classification, retry backoff and adaptive timeouts
+"""
+from src.retry_policy import (
+    AdaptiveTimeout, RetryPolicy, classify_failure, FAILURE_PERMANENT, FAILURE_TRANSIENT
+)
+from tests.test_signing_engine import make_engine
+
+
+def test_failures_are_classified_from_signtool_output():
+    assert classify_failure(None, "", timed_out=True) == (FAILURE_TRANSIENT, "timeout")
+    assert classify_failure(1, "SignTool Error: The specified timestamp server either could not be reached")[0] \
+        == FAILURE_TRANSIENT
+    assert classify_failure(1, "SignTool Error: The smart card cannot be accessed")[0] == FAILURE_TRANSIENT
+    assert classify_failure(1, "SignTool Error: 429 Too Many Requests") == (FAILURE_TRANSIENT, "rate limited")
+    assert classify_failure(1, "SignTool Error: No certificates were found that met all the given criteria.") \
+        == (FAILURE_PERMANENT, "no signing certificate")
+    assert classify_failure(1, "SignTool Error: This file format cannot be signed because it is not recognized.") \
+        == (FAILURE_PERMANENT, "file format not signable")
+    # A locked file stays a permanent failure even if a network error is reported as well
+    assert classify_failure(1, "being used by another process\nThe RPC server is unavailable") \
+        == (FAILURE_PERMANENT, "file locked")
+    assert classify_failure(1, "SignTool Error: something new") == (FAILURE_PERMANENT, "signtool exit code 1")
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    low = RetryPolicy(max_attempts=3, base_delay=2, max_delay=5, rng=lambda: 0.0)
+    high = RetryPolicy(max_attempts=3, base_delay=2, max_delay=5, rng=lambda: 0.999)
+    assert [low.delay(attempt) for attempt in (1, 2, 3)] == [1.0, 2.0, 2.5]
+    assert 1.99 < high.delay(1) <= 2.0
+    assert high.delay(5) <= 5.0
+
+    assert low.should_retry(2, FAILURE_TRANSIENT)
+    assert not low.should_retry(3, FAILURE_TRANSIENT)
+    assert not low.should_retry(1, FAILURE_PERMANENT)
+
+
+def test_timeouts_follow_observed_latency_and_size():
+    timeouts = AdaptiveTimeout(default=120, minimum=5, maximum=600, multiplier=3, min_samples=5)
+    assert timeouts.timeout(files=2) == 240
+
+    for duration in [1.0, 1.2, 0.8, 1.1, 2.0]:
+        timeouts.record(duration, size=10_000_000)
+    assert timeouts.timeout() == 6.0
+    assert timeouts.timeout(files=4) == 24.0
+    # A large file gets time for its size on top, at the slowest observed throughput
+    assert timeouts.timeout(size=50_000_000) == 6.0 + 10.0
+    # Derived timeouts are clamped
+    assert timeouts.timeout(files=1000) == 600
+    fast = AdaptiveTimeout(default=120, minimum=5, maximum=600, min_samples=1)
+    fast.record(0.01)
+    assert fast.timeout() == 5
+
+
+def test_transient_failures_are_retried_and_permanent_ones_are_not(tmp_path, fake_signtool):
+    files = []
+    for name in ["app.dll", "flaky.dll", "locked.dll"]:
+        path = tmp_path / name
+        path.write_bytes(b"MZ")
+        files.append(str(path))
+
+    engine = make_engine(fake_signtool, max_workers=3, cache_file=tmp_path / "cache.json")
+    engine.settings.update({"retry_base_delay": 0.01, "retry_max_delay": 0.05})
+    summary = engine.sign_files(files)
+
+    assert dict(summary.results) == {files[0]: "verified", files[1]: "verified", files[2]: "failed"}
+    assert any(message.startswith("Transient failure (SimplySign session), retrying") for message in engine.logged)
+    assert "  Permanent failure (file locked), not retrying" in engine.logged
+    assert len([message for message in engine.logged if message.startswith("Command:")]) == 4
@@ -0,0 +1,75 @@
+"""
+Tests for the run journal and resuming interrupted runs
+"""
+import os
+
+from src.run_journal import (
+    RunJournal, find_interrupted_run, list_journals, load_journal, prune_journals
+)
+from tests.test_signing_engine import make_engine
+
+
+def test_journal_replay_ignores_truncated_line(tmp_path):
+    journal = RunJournal.create(tmp_path)
+    journal.start(["a.exe", "b.exe", "c.exe", "d.exe"])
+    journal.record(["a.exe", "b.exe"], "signing")
+    journal.record(["a.exe"], "signed")
+    journal.record(["a.exe"], "verified")
+    journal.record(["b.exe"], "failed")
+    journal.close()
+    # A crash in the middle of a write leaves half a line behind
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"event": "state", "file": "c.ex')
+
+    state = find_interrupted_run(tmp_path)
+    assert state is not None and not state.complete
+    assert state.states == {"a.exe": "verified", "b.exe": "failed", "c.exe": "queued", "d.exe": "queued"}
+    assert state.unfinished() == ["c.exe", "d.exe"]
+    assert state.unfinished(retry_failed=True) == ["b.exe", "c.exe", "d.exe"]
+    assert set(state.durations()) == {"a.exe", "b.exe"}
+
+
+def test_finished_runs_are_not_resumed_and_old_journals_pruned(tmp_path):
+    for i in range(4):
+        journal = RunJournal(tmp_path / f"run-2024010{i}-000000-1.jsonl")
+        journal.start(["a.exe"])
+        journal.finish(total=1)
+        journal.close()
+
+    assert find_interrupted_run(tmp_path) is None
+    prune_journals(tmp_path, keep=2)
+    assert [os.path.basename(path) for path in list_journals(tmp_path)] == [
+        "run-20240102-000000-1.jsonl", "run-20240103-000000-1.jsonl"]
+
+
+def test_resume_only_signs_unfinished_files(tmp_path, fake_signtool):
+    files = {}
+    for name in ("done", "signed", "queued", "failed"):
+        path = tmp_path / f"{name}.dll"
+        path.write_bytes(b"MZ" + bytes(64))
+        files[name] = str(path)
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    # Signed before the interruption, but not verified yet
+    engine.sign_files([files["signed"]])
+    del engine.logged[:]
+
+    journal = RunJournal.create(tmp_path / "runs")
+    journal.start(sorted(files.values()))
+    journal.record([files["done"]], "verified")
+    journal.record([files["signed"]], "signed")
+    journal.record([files["failed"]], "failed")
+    journal.close()
+
+    engine.journal_dir = str(tmp_path / "runs")
+    summary = engine.resume_run(load_journal(journal.path))
+
+    processed = [message[len("Processing: "):] for message in engine.logged if message.startswith("Processing: ")]
+    assert processed == [files["queued"]]
+    assert (summary.total, summary.verified, summary.failed) == (4, 3, 1)
+    assert dict(summary.results)[files["signed"]] == "verified"
+    assert dict(summary.results)[files["done"]] == "verified"
+
+    state = load_journal(journal.path)
+    assert state.complete
+    assert state.unfinished() == []
+    assert len(list_journals(tmp_path / "runs")) == 1
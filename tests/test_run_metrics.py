@@ -0,0 +1,76 @@
+"""
+Tests for the run metrics (histograms, JSON report, Prometheus textfile)
+"""
+import json
+
+from src.run_metrics import Histogram, RunMetrics
+from tests.test_signing_engine import make_engine
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in [0.5, 0.5, 1.5, 3.0, 10.0]:
+        histogram.observe(value)
+
+    data = histogram.to_dict()
+    assert data["count"] == 5
+    assert data["sum"] == 15.5
+    assert data["buckets"] == [[1.0, 2], [2.0, 3], [4.0, 4], ["+Inf", 5]]
+    assert 1.0 <= histogram.quantile(0.5) <= 2.0
+    assert histogram.quantile(1.0) == 10.0
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_report_aggregates_spans_per_file_and_stage(tmp_path):
+    now = [100.0]
+    metrics = RunMetrics(clock=lambda: now[0])
+    metrics.observe("sign", 2.0, ["a.exe", "b.dll"], size=3000)
+    metrics.observe("verify", 0.5, ["a.exe"], size=1000)
+    metrics.observe("verify", 1.5, ["b.dll"])
+    metrics.count("sign_retries")
+    now[0] = 104.0
+    metrics.finish([("a.exe", "verified"), ("b.dll", "failed")])
+
+    report = metrics.to_dict()
+    assert report["duration_seconds"] == 4.0
+    assert report["statuses"] == {"verified": 1, "failed": 1}
+    assert report["counters"] == {"sign_retries": 1}
+    assert report["throughput"] == {"files_per_second": 0.25, "bytes_per_second": 750.0}
+    assert report["stages"]["verify"]["count"] == 2
+    assert report["stages"]["sign"]["bytes"] == 3000
+    assert report["files"]["a.exe"] == {"sign": 2.0, "verify": 0.5}
+
+    metrics.write_json(str(tmp_path / "report.json"))
+    metrics.write_prometheus(str(tmp_path / "signer.prom"))
+    assert json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))["files"]["b.dll"]["verify"] == 1.5
+    prom = (tmp_path / "signer.prom").read_text(encoding="utf-8")
+    assert 'certum_signer_stage_seconds_bucket{stage="verify",le="+Inf"} 2' in prom
+    assert 'certum_signer_stage_seconds_count{stage="sign"} 1' in prom
+    assert 'certum_signer_files{status="failed"} 1' in prom
+    assert "certum_signer_last_run_timestamp_seconds 104.0" in prom
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["report.json", "signer.prom"]
+
+
+def test_engine_records_and_exports_run_metrics(tmp_path, fake_signtool):
+    files = []
+    for name in ["app.exe", "flaky.dll"]:
+        path = tmp_path / name
+        path.write_bytes(b"MZ" + name.encode())
+        files.append(str(path))
+    engine = make_engine(fake_signtool, 2, str(tmp_path / "cache.json"))
+    engine.settings.update({"retry_base_delay": 0, "metrics_json": str(tmp_path / "out" / "run.json"),
+                            "metrics_prometheus": str(tmp_path / "out" / "run.prom")})
+
+    summary = engine.sign_files(files)
+
+    assert summary.verified == 2
+    report = json.loads((tmp_path / "out" / "run.json").read_text(encoding="utf-8"))
+    assert report["statuses"] == {"verified": 2}
+    assert report["counters"]["sign_retries"] == 1
+    assert report["stages"]["sign"]["count"] == 3
+    assert report["stages"]["verify"]["count"] == 2
+    for file_path in files:
+        assert {"sign", "verify", "sign_queue_wait", "verify_queue_wait"} <= set(report["files"][file_path])
+    assert "certum_signer_events{event=\"sign_retries\"} 1" in (tmp_path / "out" / "run.prom").read_text()
+    assert summary.metrics is engine.metrics
+    assert "Timings per stage:" in engine.logged
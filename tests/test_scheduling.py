@@ -0,0 +1,123 @@
+"""
+Tests for size-aware ordering and the rate limiter of sign calls
+"""
+import threading
+import time
+
+from src.scheduling import LatencyHistory, RateLimiter, order_files, PRIOR_OVERHEAD, PRIOR_SECONDS_PER_MIB
+from tests.test_signing_engine import make_engine
+
+
+def make_file(folder, name, size):
+    path = folder / name
+    path.write_bytes(b"MZ" + bytes(size))
+    return str(path)
+
+
+def test_history_learns_per_type_and_orders_the_run(tmp_path):
+    cache_file = tmp_path / "latency.json"
+    history = LatencyHistory(cache_file)
+    mib = 1024 * 1024
+    for size in (1, 2, 4, 8):
+        history.record("setup.msi", 10 + 2 * size, size * mib)
+        history.record("core.dll", 1.0, size * mib)
+    assert abs(history.estimate("big.msi", 10 * mib) - 30) < 0.01
+    assert abs(history.estimate("big.dll", 10 * mib) - 1) < 0.01
+    history.save()
+
+    # An unknown type falls back to the model over all types
+    reloaded = LatencyHistory(cache_file)
+    assert reloaded.estimate("tool.exe", 0) > 1
+    assert abs(reloaded.estimate("big.msi", 10 * mib) - 30) < 0.01
+
+    small_msi = make_file(tmp_path, "small.msi", 10)
+    big_dll = make_file(tmp_path, "big.dll", 100000)
+    tiny_dll = make_file(tmp_path, "tiny.dll", 10)
+    ordered, estimate = order_files([tiny_dll, big_dll, small_msi], "largest", reloaded)
+    # The small MSI is slower to sign than any DLL
+    assert ordered == [small_msi, big_dll, tiny_dll]
+    assert 11 < estimate < 13
+    assert order_files([tiny_dll, big_dll, small_msi], "smallest", reloaded)[0] == [tiny_dll, big_dll, small_msi]
+    assert order_files([small_msi, tiny_dll, big_dll], "name")[0] == [big_dll, small_msi, tiny_dll]
+
+
+
+def test_call_of_files_estimated_at_zero_is_split_evenly(tmp_path, fake_signtool):
+    history = LatencyHistory()
+    mib = 1024 * 1024
+    # Seconds proportional to size: the fitted overhead is 0
+    for i in range(4):
+        history.record("a.dll", 10 * (i + 1), size=(i + 1) * 10 * mib)
+    assert history.estimate("x.sys", 0) == 0
+
+    history.record_call(["x.sys", "y.sys"], 1.0, sizes=[0, 0])
+    weight, sum_x, sum_y = history._sums[".sys"][:3]
+    assert abs(sum_y / weight - 0.5) < 1e-9
+
+    # A broken history never fails the sign call that feeds it
+    path = make_file(tmp_path, "app.dll", 10)
+    engine = make_engine(fake_signtool, 1, str(tmp_path / "cache.json"))
+
+    def broken(*args, **kwargs):
+        raise ZeroDivisionError("division by zero")
+
+    engine.latency_history.record_call = broken
+    summary = engine.sign_files([path])
+    assert summary.results == [(path, "verified")]
+    assert any(message.endswith("Latency history not updated: division by zero") for message in engine.logged)
+
+def test_rate_limiter_spaces_calls_and_caps_sessions():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(calls_per_minute=60, burst=2, clock=lambda: now[0], sleep=sleep)
+    assert [limiter.acquire() for _ in range(4)] == [0.0, 0.0, 1.0, 1.0]
+    now[0] += 10
+    # The bucket refills up to the burst only
+    assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, 1.0]
+    assert limiter.describe() == "60 calls/min (burst 2)"
+    assert not RateLimiter().enabled
+
+    sessions = RateLimiter(max_sessions=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def call():
+        sessions.acquire()
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+        sessions.release()
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2 and sessions.calls == 6
+
+
+def test_engine_signs_largest_first_within_the_rate_limit(tmp_path, fake_signtool):
+    files = [make_file(tmp_path, f"app{size}.dll", size) for size in (10, 5000, 300, 80000)]
+    engine = make_engine(fake_signtool, 1, str(tmp_path / "cache.json"))
+    engine.settings.update({"rate_limit_per_minute": 120, "rate_limit_burst": 1, "max_sign_sessions": 1})
+
+    summary = engine.sign_files(files)
+
+    assert summary.verified == 4
+    processed = [message[len("Processing: "):] for message in engine.logged if message.startswith("Processing: ")]
+    assert processed == [files[3], files[1], files[2], files[0]]
+    # One call every 0.5s: the calls after the first wait for a token
+    assert summary.metrics.to_dict()["counters"]["rate_limited_calls"] >= 2
+    assert summary.metrics.to_dict()["stages"]["rate_limit_wait"]["count"] == 4
+    assert any(message.startswith("Sign calls limited to 120 calls/min") for message in engine.logged)
+    # The calls taught the history how long DLLs take
+    assert engine.latency_history.model(files[0]) != (PRIOR_OVERHEAD, PRIOR_SECONDS_PER_MIB)
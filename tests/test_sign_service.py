@@ -0,0 +1,136 @@
+"""
+Tests for the signing service (fair queue, rounds, HTTP API with local clients)
+"""
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src import cli
+from src.sign_service import FairQueue, SigningService, submit_job
+from tests.fake_signtool import SIGNATURE_MARKER
+from tests.test_signing_engine import make_engine
+
+
+def make_files(folder, names):
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name in names:
+        path = folder / name
+        path.write_bytes(b"MZ" + str(path).encode())
+        paths.append(str(path))
+    return paths
+
+
+def test_fair_queue_takes_one_item_per_client_in_turn():
+    queue = FairQueue()
+    queue.put("big", [f"big{i}" for i in range(5)])
+    queue.put("small", ["small0", "small1"])
+    queue.put("other", ["other0"])
+
+    assert queue.take(4) == ["big0", "small0", "other0", "big1"]
+    # "small" is next in line, "other" has nothing left
+    assert queue.take(10) == ["small1", "big2", "big3", "big4"]
+    assert queue.take(10, timeout=0.01) == []
+
+
+def test_rounds_merge_jobs_and_report_files_to_every_job(tmp_path, fake_signtool):
+    shared, a_only = make_files(tmp_path / "a", ["shared.dll", "a.exe"])
+    b_files = make_files(tmp_path / "b", ["b.exe", "fail.dll"])
+    engine = make_engine(fake_signtool, 2, str(tmp_path / "cache.json"))
+    service = SigningService(engine, round_files=10)
+
+    job_a = service.submit("agent-a", [shared, a_only])
+    job_b = service.submit("agent-b", b_files + [shared])
+    service.run_round(service.queue.take(10))
+
+    assert service.rounds == 1
+    assert job_a.to_dict()["state"] == "done"
+    assert job_a.results == {shared: "verified", a_only: "verified"}
+    assert job_b.results == {b_files[0]: "verified", b_files[1]: "failed", shared: "verified"}
+    # Shared file signed once for both jobs
+    assert open(shared, "rb").read().count(SIGNATURE_MARKER) == 1
+    assert sum(1 for line in engine.logged if line.startswith("Processing: ")) == 4
+    assert [event["status"] for event in job_a.events if event["path"] == shared] == ["signing", "signed", "verified"]
+
+
+def test_http_clients_stream_results(tmp_path, fake_signtool):
+    engine = make_engine(fake_signtool, 2, str(tmp_path / "cache.json"))
+    service = SigningService(engine, round_files=3, gather=0.2, token="secret")
+    url = service.start("127.0.0.1", 0)
+    try:
+        results = {}
+
+        def client(name):
+            files = make_files(tmp_path / name, [f"{name}{i}.dll" for i in range(3)])
+            events = []
+            results[name] = (submit_job(url, files, name, token="secret", on_event=events.append), events)
+
+        threads = [threading.Thread(target=client, args=(name,)) for name in ("one", "two")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+
+        for name in ("one", "two"):
+            job, events = results[name]
+            assert (job["state"], job["verified"], job["failed"]) == ("done", 3, 0)
+            assert sorted(event["path"] for event in events if event["final"]) == \
+                [str(tmp_path / name / f"{name}{i}.dll") for i in range(3)]
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url + "/status")
+        assert error.value.code == 401
+        request = urllib.request.Request(url + "/status", headers={"Authorization": "Bearer secret"})
+        with urllib.request.urlopen(request) as response:
+            assert json.loads(response.read())["queued_files"] == 0
+    finally:
+        service.stop(timeout=10)
+
+
+def test_submit_command_against_running_service(tmp_path, fake_signtool, capsys):
+    engine = make_engine(fake_signtool, 2, str(tmp_path / "cache.json"))
+    service = SigningService(engine, gather=0)
+    url = service.start("127.0.0.1", 0)
+    try:
+        dist = tmp_path / "dist"
+        make_files(dist, ["app.exe", "core.dll"])
+        exit_code = cli.main(["submit", "-r", str(dist), "--server", url, "--client", "ci",
+                              "--settings", str(tmp_path / "settings.json")])
+    finally:
+        service.stop(timeout=10)
+
+    summary = json.loads(capsys.readouterr().out)
+    assert exit_code == cli.EXIT_OK
+    assert (summary["command"], summary["client"], summary["verified"]) == ("submit", "ci", 2)
+    assert {os.path.basename(entry["path"]) for entry in summary["files"]} == {"app.exe", "core.dll"}
+
+
+def test_service_refuses_open_binds_and_paths_outside_the_allowed_roots(tmp_path, fake_signtool):
+    engine = make_engine(fake_signtool, 2, str(tmp_path / "cache.json"))
+    with pytest.raises(ValueError, match="without a token"):
+        SigningService(engine).start("0.0.0.0", 0)
+
+    allowed = tmp_path / "dist"
+    inside = make_files(allowed, ["app.exe"])
+    outside = make_files(tmp_path / "secret", ["other.dll"])
+    # A link inside the allowed folder that points outside of it
+    link = allowed / "escape.dll"
+    os.symlink(outside[0], link)
+
+    service = SigningService(engine, gather=0, token="secret", allowed_roots=[str(allowed)])
+    url = service.start("127.0.0.1", 0)
+    try:
+        for files in (outside, [str(link)], inside + outside):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                submit_job(url, files, "agent", token="secret")
+            assert error.value.code == 403
+        job = submit_job(url, inside, "agent", token="secret")
+    finally:
+        service.stop(timeout=10)
+
+    assert job["verified"] == 1
+    assert not open(outside[0], "rb").read().endswith(SIGNATURE_MARKER)
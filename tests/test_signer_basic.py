@@ -23,3 +23,27 @@ def test_certum_signer_module_exists():
     """Test that the certum_signer.py file exists in src/"""
     src_path = os.path.join(os.path.dirname(__file__), "..", "src", "certum_signer.py")
     assert os.path.exists(src_path), "certum_signer.py should exist in src/"
+
+
+def test_sign_thread_finishes_even_if_signing_raises():
+    """A crash in the engine must not leave the buttons disabled"""
+    pytest.importorskip("tkinter")
+    from types import SimpleNamespace
+    from src.gui import CertumSignerApp
+
+    def crash(files):
+        raise RuntimeError("engine crashed")
+
+    scheduled = []
+    logged = []
+    app = SimpleNamespace(
+        engine=SimpleNamespace(sign_files=crash),
+        file_registry=SimpleNamespace(paths=lambda: ["app.dll"]),
+        root=SimpleNamespace(after=lambda delay, callback: scheduled.append(callback)),
+        log_message=lambda message, error=False: logged.append(message),
+        _signing_finished=object(),
+    )
+    CertumSignerApp._sign_files_thread(app)
+
+    assert app._signing_finished in scheduled
+    assert logged == ["✗ Signing stopped with an error: engine crashed"]
@@ -0,0 +1,288 @@
+"""
+Tests for the signing engine (worker pool, batch mode, cache, pre-scan)
+"""
+import os
+import threading
+
+from src import signing_engine
+from src.artifact_cache import ArtifactCache
+from src.file_registry import FileRegistry
+
+
+class _RecordingLogger:
+    """Stands in for AsyncLogger and keeps the messages in order"""
+
+    def __init__(self):
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def log(self, message, error=False):
+        self.log_block([(message, error)])
+
+    def log_block(self, entries):
+        with self._lock:
+            self.messages.extend(message for message, error in entries)
+
+
+def make_engine(signtool, max_workers, cache_file):
+    """Create a SigningEngine that records its log messages"""
+    settings = signing_engine.default_settings()
+    # The test files share placeholder content; deduplication has its own test
+    settings.update({"signing_command": signtool, "timestamp_server": "http://localhost",
+                     "max_workers": max_workers, "dedup_identical": False})
+    engine = signing_engine.SigningEngine(settings, _RecordingLogger(), ArtifactCache(cache_file))
+    engine.logged = engine.logger.messages
+    return engine
+
+
+def test_files_are_signed_in_parallel_with_grouped_logs(tmp_path, fake_signtool):
+    files = []
+    for i in range(6):
+        path = tmp_path / f"app{i}.dll"
+        path.write_bytes(b"MZ" + bytes(64))
+        files.append(str(path))
+    failing = tmp_path / "fail.dll"
+    failing.write_bytes(b"MZ")
+    files.append(str(failing))
+
+    engine = make_engine(fake_signtool, max_workers=3, cache_file=tmp_path / "cache.json")
+    engine.sign_files(files)
+
+    assert "Successfully signed and verified: 6" in engine.logged
+    assert "Failed or unverified: 1" in engine.logged
+
+    # Each file's block starts with "Processing:" and is not interrupted by another file
+    current = None
+    seen = set()
+    for message in engine.logged:
+        if message.startswith("Processing: "):
+            current = message[len("Processing: "):]
+            assert current not in seen
+            seen.add(current)
+        elif current and "Verify command:" in message:
+            assert message.endswith(current)
+    assert seen == set(files)
+
+
+def test_status_callback_reports_every_file(tmp_path, fake_signtool):
+    files = []
+    for name in ["app.dll", "fail.dll"]:
+        path = tmp_path / name
+        path.write_bytes(b"MZ")
+        files.append(str(path))
+
+    registry = FileRegistry()
+    registry.add_many(files)
+    history = []
+
+    def on_status(paths, status):
+        history.extend((path, status) for path in paths)
+        registry.set_status_many(paths, status)
+
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    engine.status_callback = on_status
+    engine.sign_files(files)
+
+    assert [status for path, status in history if path == files[0]] == ["signing", "signed", "verified"]
+    assert [status for path, status in history if path == files[1]] == ["signing", "failed"]
+    assert registry.counts() == {"verified": 1, "failed": 1}
+
+
+def test_max_workers_setting_is_clamped(tmp_path):
+    engine = make_engine("signtool", max_workers="nonsense", cache_file=tmp_path / "cache.json")
+    assert engine.get_max_workers() == signing_engine.DEFAULT_MAX_WORKERS
+    engine.settings["max_workers"] = 1000
+    assert engine.get_max_workers() == signing_engine.MAX_WORKERS_LIMIT
+    engine.settings["max_workers"] = 0
+    assert engine.get_max_workers() == 1
+
+
+def test_make_batches_respects_size_and_command_length():
+    files = [f"C:\\build\\file{i:02d}.dll" for i in range(10)]
+    assert [len(b) for b in signing_engine.make_batches(files, 4, 0, 10000)] == [4, 4, 2]
+
+    per_file = len(files[0]) + 3
+    batches = signing_engine.make_batches(files, 100, 50, 50 + 3 * per_file)
+    assert [len(b) for b in batches] == [3, 3, 3, 1]
+    assert sum(batches, []) == files
+
+
+def test_parse_sign_output_maps_lines_to_files():
+    files = [r"C:\out\a.exe", r"C:\out\b.dll", r"C:\out\c.dll"]
+    output = "\n".join([
+        "Done Adding Additional Store",
+        r"Successfully signed: C:\out\a.exe",
+        r"SignTool Error: An error occurred while attempting to sign: C:\out\b.dll",
+        "Number of errors: 1",
+    ])
+    signed, failed = signing_engine.parse_sign_output(output, files)
+    assert signed == {files[0]}
+    assert failed == {files[1]}
+
+
+def test_batch_mode_retries_failed_files_individually(tmp_path, fake_signtool):
+    files = []
+    for name in ["a.dll", "b.dll", "fail.dll", "c.exe", "d.exe"]:
+        path = tmp_path / name
+        path.write_bytes(b"MZ")
+        files.append(str(path))
+
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    engine.settings["batch_size"] = 3
+    engine.sign_files(files)
+
+    assert any("2 signtool calls" in message for message in engine.logged)
+    assert "Retrying 1 file(s) of the batch individually..." in engine.logged
+    assert f"Processing: {tmp_path / 'fail.dll'}" in engine.logged
+    assert "Successfully signed and verified: 4" in engine.logged
+    assert "Failed or unverified: 1" in engine.logged
+
+
+def test_unchanged_signed_files_are_skipped(tmp_path, fake_signtool):
+    files = []
+    for name in ["a.dll", "b.dll", "c.exe"]:
+        path = tmp_path / name
+        path.write_bytes(b"MZ")
+        files.append(str(path))
+    cache_file = tmp_path / "cache.json"
+
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=cache_file)
+    engine.sign_files(files)
+    assert "Successfully signed and verified: 3" in engine.logged
+
+    (tmp_path / "b.dll").write_bytes(b"MZ rebuilt")
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=cache_file)
+    engine.sign_files(files)
+    assert "Successfully signed and verified: 1" in engine.logged
+    assert "Skipped (unchanged or already signed): 2" in engine.logged
+    assert f"Processing: {tmp_path / 'b.dll'}" in engine.logged
+
+
+def test_quick_verification_and_presign_scan_use_embedded_signature(tmp_path, fake_signtool):
+    from tests.pe_samples import build_pe, sign_pe
+
+    signed = tmp_path / "vcruntime.dll"
+    signed.write_bytes(sign_pe(build_pe()))
+    unsigned = tmp_path / "app.exe"
+    unsigned.write_bytes(build_pe())
+
+    files = [str(signed), str(unsigned)]
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    assert engine._has_intact_signature(str(signed))
+    assert not engine._has_intact_signature(str(unsigned))
+
+    engine.settings["verify_mode"] = "quick"
+    assert engine._verify_signature(str(signed), log=lambda *a, **k: None)[0]
+    assert not engine._verify_signature(str(unsigned), log=lambda *a, **k: None)[0]
+
+    engine.settings["skip_already_signed"] = True
+    summary = engine.sign_files(files)
+    assert "Skipping 1 files that already carry an intact Authenticode signature" in engine.logged
+    assert f"Processing: {signed}" not in engine.logged
+    # The fake signtool embeds a signature into PE images, which the quick check accepts
+    assert dict(summary.results)[str(unsigned)] == "verified"
+    assert "Embedded signature: signed by Test Signer (sha256, timestamped)" in engine.logged
+
+
+def test_digest_mode_hashes_locally_and_signs_only_digests(tmp_path, fake_signtool):
+    files = []
+    for folder in ["x86", "x64"]:
+        (tmp_path / folder).mkdir()
+        for name in ["setup.msi", "core.dll", "fail.dll"]:
+            path = tmp_path / folder / name
+            header = bytes.fromhex("D0CF11E0A1B11AE1") if name.endswith(".msi") else b"MZ"
+            path.write_bytes(header + bytes(256))
+            files.append(str(path))
+
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    engine.settings.update({"sign_mode": "digest", "batch_size": 3})
+    summary = engine.sign_files(files)
+
+    assert summary.verified == 4
+    assert summary.failed == 2
+    commands = [message for message in engine.logged if message.startswith("Command:")]
+    # Per batch: one remote /ds call for all digests, one timestamp call; "fail" files fall back to sign
+    assert len([command for command in commands if " /ds " in command]) == 2
+    assert len([command for command in commands if " timestamp " in command]) == 2
+    assert all(command.endswith(".dig") for command in commands if " /ds " in command)
+    assert "Generating digests: 2 of 3 file(s) done" in engine.logged
+    assert len([message for message in engine.logged if message.startswith("Signed via digest: ")]) == 4
+
+
+def test_identical_files_are_signed_once_and_copied(tmp_path, fake_signtool):
+    runtime = []
+    for package in ("a", "b", "c"):
+        path = tmp_path / package / "vcruntime140.dll"
+        path.parent.mkdir()
+        path.write_bytes(b"MZ runtime")
+        runtime.append(str(path))
+    app = tmp_path / "a" / "app.exe"
+    app.write_bytes(b"MZ app")
+    failing = [str(tmp_path / name) for name in ("fail1.dll", "fail2.dll")]
+    for file_path in failing:
+        with open(file_path, 'wb') as f:
+            f.write(b"MZ broken")
+
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    engine.settings["dedup_identical"] = True
+    summary = engine.sign_files(runtime + [str(app)] + failing)
+
+    processed = [message for message in engine.logged if message.startswith("Processing: ")]
+    assert len(processed) == 3  # one runtime copy, app.exe and one broken file
+    results = dict(summary.results)
+    assert [results[file_path] for file_path in runtime] == ["verified"] * 3
+    assert [results[file_path] for file_path in failing] == ["failed"] * 2
+    signed_runtime = (tmp_path / "a" / "vcruntime140.dll").read_bytes()
+    assert signed_runtime != b"MZ runtime"
+    assert all(open(file_path, 'rb').read() == signed_runtime for file_path in runtime)
+    assert not [name for name in os.listdir(tmp_path / "b") if name.endswith(".tmp")]
+
+
+def test_preflight_rejects_bad_files_before_signing(tmp_path, fake_signtool):
+    good = tmp_path / "app.exe"
+    good.write_bytes(b"MZ app")
+    empty = tmp_path / "empty.dll"
+    empty.write_bytes(b"")
+    renamed = tmp_path / "readme.dll"
+    renamed.write_bytes(b"just text")
+    read_only = tmp_path / "locked_down.exe"
+    read_only.write_bytes(b"MZ ro")
+    read_only.chmod(0o444)
+    missing = tmp_path / "gone.exe"
+
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    summary = engine.sign_files([str(path) for path in (good, empty, renamed, read_only, missing)])
+
+    assert dict(summary.results) == {str(good): "verified", str(empty): "failed", str(renamed): "failed",
+                                     str(read_only): "failed", str(missing): "failed"}
+    assert [message for message in engine.logged if message.startswith("Processing: ")] == [f"Processing: {good}"]
+    problems = "\n".join(engine.logged)
+    for problem in ("file is empty", "not a valid PE file", "file is read-only", "file not found"):
+        assert problem in problems
+
+    # Without a signing tool nothing is attempted at all
+    engine = make_engine(str(tmp_path / "no-such-signtool"), max_workers=2, cache_file=tmp_path / "cache2.json")
+    summary = engine.sign_files([str(good)])
+    assert summary.failed == 1
+    assert not [message for message in engine.logged if message.startswith("Processing: ")]
+
+
+def test_a_crashing_verify_fails_only_its_file(tmp_path, fake_signtool):
+    files = []
+    for name in ["app.dll", "crash.dll", "core.dll"]:
+        path = tmp_path / name
+        path.write_bytes(b"MZ")
+        files.append(str(path))
+    engine = make_engine(fake_signtool, max_workers=2, cache_file=tmp_path / "cache.json")
+    verify_signature = engine._verify_signature
+
+    def crashing_verify(file_path, log=None):
+        if file_path.endswith("crash.dll"):
+            raise RuntimeError("verify crashed")
+        return verify_signature(file_path, log=log)
+
+    engine._verify_signature = crashing_verify
+    summary = engine.sign_files(files)
+
+    assert sorted(summary.results) == [(files[0], "verified"), (files[2], "verified"), (files[1], "failed")]
+    assert "✗ Signing pipeline failed: verify crashed" in engine.logged
@@ -0,0 +1,144 @@
+"""
+Tests for the timestamp server pool (health tracking, failover, circuit breaker)
+"""
+from src.timestamp_pool import (
+    TimestampServerPool, CIRCUIT_CLOSED, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN, parse_timestamp_status
+)
+from tests.stub_tsa import StubTSA, GRANTED_RESPONSE
+from tests.test_signing_engine import make_engine
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fastest_healthy_server_is_preferred_and_load_is_spread():
+    pool = TimestampServerPool(["http://a", "http://b", "http://a"])
+    assert pool.urls == ["http://a", "http://b"]
+
+    # Unknown servers: configuration order wins
+    assert pool.acquire() == "http://a"
+    pool.record_success("http://a", 2.0)
+    assert pool.acquire() == "http://b"
+    pool.record_success("http://b", 0.2)
+
+    assert pool.acquire() == "http://b"
+    # With one call in flight on b, b is still cheaper than the slow a
+    assert pool.acquire() == "http://b"
+    # ... and excluded servers are only used as a last resort
+    assert pool.acquire(exclude=["http://b"]) == "http://a"
+
+
+def test_circuit_opens_after_repeated_failures_and_recovers():
+    clock = FakeClock()
+    pool = TimestampServerPool(["http://a", "http://b"], failure_threshold=2, cooldown=10, clock=clock)
+    a = pool.servers[0]
+
+    pool.acquire()
+    assert not pool.record_failure("http://a")
+    pool.acquire()
+    assert pool.record_failure("http://a")
+    assert a.state == CIRCUIT_OPEN
+
+    assert pool.acquire() == "http://b"
+    pool.record_success("http://b", 5.0)
+
+    # After the cooldown a single trial call goes to a
+    clock.now += 10
+    assert pool.acquire(exclude=["http://b"]) == "http://a"
+    assert a.state == CIRCUIT_HALF_OPEN
+    assert pool.acquire() == "http://b"
+    pool.release("http://b")
+
+    # A failed trial opens the circuit for twice as long
+    assert pool.record_failure("http://a")
+    assert a.open_until == clock.now + 20
+    clock.now += 20
+    assert pool.acquire(exclude=["http://b"]) == "http://a"
+    pool.record_success("http://a", 0.1)
+    assert a.state == CIRCUIT_CLOSED
+    assert a.consecutive_failures == 0
+
+    # Every circuit open: the one that reopens first is still tried
+    for url in pool.urls:
+        for _ in range(2):
+            pool.acquire()
+            pool.record_failure(url)
+    assert pool.acquire() == "http://a"
+
+
+def test_probe_against_stub_tsa():
+    assert parse_timestamp_status(GRANTED_RESPONSE) == 0
+
+    with StubTSA() as good, StubTSA(fail=True) as bad:
+        pool = TimestampServerPool([bad.url, good.url], failure_threshold=1)
+        assert pool.probe(good.url)[0]
+        ok, message = pool.probe(bad.url)
+        assert not ok and "503" in message
+        assert good.requests == 1 and bad.requests == 1
+
+        assert pool.servers[0].state == CIRCUIT_OPEN
+        assert pool.acquire() == good.url
+
+
+def test_signing_fails_over_to_a_healthy_timestamp_server(tmp_path, fake_signtool, monkeypatch):
+    monkeypatch.setenv("FAKE_SIGNTOOL_TSA", "1")
+    files = []
+    for i in range(6):
+        path = tmp_path / f"app{i}.dll"
+        path.write_bytes(b"MZ")
+        files.append(str(path))
+
+    with StubTSA(fail=True) as bad, StubTSA() as good:
+        engine = make_engine(fake_signtool, max_workers=1, cache_file=tmp_path / "cache.json")
+        engine.settings.update({"timestamp_servers": [bad.url, good.url], "timestamp_probe": False,
+                                "timestamp_failure_threshold": 2})
+        summary = engine.sign_files(files)
+
+        assert summary.verified == 6
+        # One failed call moves the traffic to the healthy server; no file waits on the bad one again
+        assert bad.requests == 1
+        assert good.requests == 6
+        assert any(message.startswith(f"Timestamp server {bad.url}: closed") and "1 failed" in message
+                   for message in engine.logged)
+
+
+def test_a_timeout_is_retried_without_failover_or_penalty(tmp_path, fake_signtool, monkeypatch):
+    monkeypatch.setenv("FAKE_SIGNTOOL_DELAY", "5")
+    path = tmp_path / "slow.dll"
+    path.write_bytes(b"MZ")
+
+    engine = make_engine(fake_signtool, max_workers=1, cache_file=tmp_path / "cache.json")
+    engine.settings.update({"timestamp_servers": ["http://tsa-a", "http://tsa-b"], "timestamp_probe": False,
+                            "sign_timeout": 1, "adaptive_timeouts": False,
+                            "retry_attempts": 2, "retry_base_delay": 0})
+    summary = engine.sign_files([str(path)])
+
+    assert summary.results == [(str(path), "failed")]
+    # One call per retry attempt, never one per server
+    assert engine.logged.count("Executing signtool...") == 2
+    assert not any("retrying with another server" in message for message in engine.logged)
+    pool = engine.get_timestamp_pool()
+    assert [server.failures for server in pool.servers] == [0, 0]
+    assert [server.in_flight for server in pool.servers] == [0, 0]
+
+
+def test_failovers_and_retries_share_one_attempt_budget(tmp_path, fake_signtool, monkeypatch):
+    monkeypatch.setenv("FAKE_SIGNTOOL_TSA", "1")
+    path = tmp_path / "app.dll"
+    path.write_bytes(b"MZ")
+
+    with StubTSA(fail=True) as a, StubTSA(fail=True) as b, StubTSA(fail=True) as c:
+        engine = make_engine(fake_signtool, max_workers=1, cache_file=tmp_path / "cache.json")
+        engine.settings.update({"timestamp_servers": [a.url, b.url, c.url], "timestamp_probe": False,
+                                "timestamp_failure_threshold": 100, "retry_attempts": 3, "retry_base_delay": 0})
+        summary = engine.sign_files([str(path)])
+
+        assert summary.results == [(str(path), "failed")]
+        # At most retry_attempts signtool calls, not retry_attempts per server
+        assert engine.logged.count("Executing signtool...") == 3
+        assert a.requests + b.requests + c.requests == 3
@@ -0,0 +1,88 @@
+"""
+Tests for the signtool toolchain resolver (with a fake Windows Kits tree)
+"""
+import os
+
+from src import signing_engine
+from src.toolchain import ToolchainResolver, discover_signtools
+from tests.test_signing_engine import make_engine
+
+SDK_LAYOUT = [
+    "10/bin/10.0.17763.0/x86",
+    "10/bin/10.0.22621.0/x86",
+    "10/bin/10.0.22621.0/arm64",
+    "10/bin/10.0.19041.0/x64",
+    "10/bin/x64",
+    "8.1/bin/x64",
+]
+
+
+def make_kits(root, layout=SDK_LAYOUT):
+    for folder in layout:
+        os.makedirs(root / folder, exist_ok=True)
+        (root / folder / "signtool.exe").write_bytes(b"MZ")
+    # Not an SDK: no signtool.exe, or not a version folder
+    os.makedirs(root / "10" / "bin" / "10.0.26100.0" / "x64", exist_ok=True)
+    os.makedirs(root / "10" / "bin" / "misc", exist_ok=True)
+
+
+def short(path, root):
+    return os.path.relpath(os.path.dirname(path), root).replace("\\", "/")
+
+
+def test_installations_are_sorted_by_version_and_architecture(tmp_path):
+    make_kits(tmp_path)
+    resolver = ToolchainResolver(kits_roots=[str(tmp_path)], arch="x64")
+
+    assert [short(install.path, tmp_path) for install in resolver.installations()] == [
+        "10/bin/10.0.22621.0/x86",
+        "10/bin/10.0.19041.0/x64",
+        "10/bin/10.0.17763.0/x86",
+        "10/bin/x64",
+        "8.1/bin/x64",
+        "10/bin/10.0.22621.0/arm64",  # cannot run on x64
+    ]
+    arm = ToolchainResolver(kits_roots=[str(tmp_path)], arch="arm64")
+    assert short(arm.best(), tmp_path) == "10/bin/10.0.22621.0/arm64"
+    assert ToolchainResolver(kits_roots=[str(tmp_path / "missing")]).best() is None
+
+
+def test_cache_is_reused_until_an_sdk_is_installed(tmp_path, monkeypatch):
+    kits = tmp_path / "Windows Kits"
+    make_kits(kits)
+    cache_file = str(tmp_path / "toolchain.json")
+    assert short(ToolchainResolver(cache_file, [str(kits)], arch="x64").best(), kits) == "10/bin/10.0.22621.0/x86"
+
+    scans = []
+    monkeypatch.setattr("src.toolchain.discover_signtools", lambda roots: scans.append(roots) or discover_signtools(roots))
+    resolver = ToolchainResolver(cache_file, [str(kits)], arch="x64")
+    assert short(resolver.best(), kits) == "10/bin/10.0.22621.0/x86"
+    assert scans == []
+
+    make_kits(kits, ["10/bin/10.0.26100.0/x64"])
+    os.utime(kits / "10" / "bin", ns=(0, 10 ** 9))
+    assert short(resolver.best(), kits) == "10/bin/10.0.22621.0/x86"  # memoized until refreshed
+    assert short(resolver.best(refresh=True), kits) == "10/bin/10.0.26100.0/x64"
+    assert len(scans) == 1
+
+
+def test_engine_uses_sdk_signtool_when_not_on_path(tmp_path, fake_signtool, monkeypatch):
+    kits = tmp_path / "kits"
+    make_kits(kits)
+    monkeypatch.setenv("PATH", str(tmp_path / "empty"))
+    engine = make_engine("signtool", max_workers=1, cache_file=tmp_path / "cache.json")
+    engine.toolchain = ToolchainResolver(kits_roots=[str(kits)], arch="x64")
+    sdk_signtool = str(kits / "10" / "bin" / "10.0.22621.0" / "x86" / "signtool.exe")
+
+    assert engine.get_signing_tool() == sdk_signtool
+    assert engine._build_sign_command("app.exe")[0] == sdk_signtool
+
+    # SimplySignDesktop cannot verify; verification falls back to the SDK signtool
+    engine.settings["signing_command"] = r"C:\Program Files\Certum\SimplySignDesktop.exe"
+    assert engine.get_verify_tool() == sdk_signtool
+
+    # A configured path is taken as it is
+    engine.settings["signing_command"] = fake_signtool
+    assert engine.get_signing_tool() == engine.get_verify_tool() == fake_signtool
+    assert signing_engine.create_toolchain_resolver(tmp_path / "settings.json").cache_file == \
+        tmp_path / "certum_signer_toolchain.json"